@@ -0,0 +1,170 @@
+"""Canonical forms of answers, so equivalent answer sets share cache entries and prompts"""
+import re
+from fractions import Fraction
+from typing import Iterable, List, Optional, Tuple
+
+from question_schema import UNKNOWN_TYPE, Question, split_path
+from values_merger import CannotCoerce, coerce_answer, find_question, index_questions, split_image_reference
+
+_NUMBER_WORDS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
+    'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20,
+    'thirty': 30, 'forty': 40, 'fifty': 50, 'hundred': 100,
+}
+# "three", "three replicas", "twenty-five pods"
+_NUMBER_WORDS_RE = re.compile(r'^\s*([a-z]+)(?:[\s-]([a-z]+))?(?:\s+[a-z]+)?\s*$')
+
+# Memory units people type, as (system, bytes): 'i' units are binary (Ki, Mi, ...), 'd' units
+# decimal like Kubernetes' own k/M/G/T (so "512 MB" is 512M, not 512Mi), '' plain bytes
+_BINARY_UNITS = [('Ti', 1024 ** 4), ('Gi', 1024 ** 3), ('Mi', 1024 ** 2), ('Ki', 1024)]
+_DECIMAL_UNITS = [('T', 1000 ** 4), ('G', 1000 ** 3), ('M', 1000 ** 2), ('k', 1000)]
+_MEMORY_UNITS = {
+    '': ('', 1), 'b': ('', 1), 'byte': ('', 1), 'bytes': ('', 1),
+    # Single-letter suffixes are case-sensitive: Kubernetes reads a lowercase 'm' as milli
+    'k': ('d', 1000), 'M': ('d', 1000 ** 2), 'G': ('d', 1000 ** 3), 'T': ('d', 1000 ** 4),
+    'kb': ('d', 1000), 'kilobytes': ('d', 1000), 'mb': ('d', 1000 ** 2), 'megabytes': ('d', 1000 ** 2),
+    'gb': ('d', 1000 ** 3), 'gigabytes': ('d', 1000 ** 3), 'tb': ('d', 1000 ** 4), 'terabytes': ('d', 1000 ** 4),
+    'ki': ('i', 1024), 'kib': ('i', 1024), 'mi': ('i', 1024 ** 2), 'mib': ('i', 1024 ** 2),
+    'gi': ('i', 1024 ** 3), 'gib': ('i', 1024 ** 3), 'ti': ('i', 1024 ** 4), 'tib': ('i', 1024 ** 4),
+}
+_CPU_UNITS = {'': 1000, 'core': 1000, 'cores': 1000, 'cpu': 1000, 'cpus': 1000, 'vcpu': 1000, 'vcpus': 1000,
+              'm': 1, 'millicore': 1, 'millicores': 1, 'millicpu': 1, 'millicpus': 1}
+_QUANTITY_RE = re.compile(r'^(\d+(?:\.\d+)?|\.\d+)\s*([A-Za-z]*)$')
+
+# Kinds inferred from the question text when it does not map to one known path. Image
+# references are never guessed from wording: pull policies, tags and pull secrets mention
+# "image" too, and canonicalizing them would change what the chart deploys.
+_TEXT_KINDS = [
+    ('boolean', re.compile(r'^(?:do|does|should|would|will|is|are|can|enable|disable)\b')),
+    ('integer', re.compile(r'\bhow many\b|\bnumber of\b')),
+    ('memory', re.compile(r'\bmemory\b')),
+    ('cpu', re.compile(r'\bcpu\b')),
+]
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of whitespace and drop matching surrounding quotes"""
+    text = " ".join(str(text).split())
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        text = text[1:-1].strip()
+    return text
+
+
+def answer_kind(question: Optional[Question], question_text: str) -> str:
+    """How to read an answer: the question's values type, refined by its path or text"""
+    if question is not None and len(question.paths) == 1:
+        last = split_path(question.paths[0])[-1].lower()
+        if question.type not in ('string', UNKNOWN_TYPE):
+            return 'image' if question.type == 'object' and last == 'image' else question.type
+        if last in ('memory', 'cpu'):
+            return last
+        if last in ('image', 'repository'):
+            return 'image'
+        if question.type == 'string':
+            return 'string'
+    text = question_text.lower()
+    for kind, pattern in _TEXT_KINDS:
+        if pattern.search(text):
+            return kind
+    return 'string'
+
+
+def canonical_integer(answer: str) -> int:
+    """'3', ' 3 replicas', 'three', 'twenty-five pods' -> int"""
+    try:
+        return coerce_answer(answer, 'integer')
+    except CannotCoerce:
+        pass
+    match = _NUMBER_WORDS_RE.match(answer.lower())
+    if not match or match.group(1) not in _NUMBER_WORDS:
+        raise CannotCoerce(answer)
+    number = _NUMBER_WORDS[match.group(1)]
+    if match.group(2) in _NUMBER_WORDS and number >= 20 and _NUMBER_WORDS[match.group(2)] < 10:
+        number += _NUMBER_WORDS[match.group(2)]
+    return number
+
+
+def canonical_memory(answer: str) -> str:
+    """'0.5Gi', '524288Ki' -> '512Mi'; decimal units ('512 MB', '1G') stay decimal; plain bytes stay bytes"""
+    match = _QUANTITY_RE.match(answer.strip())
+    if not match:
+        raise CannotCoerce(answer)
+    number, unit = match.groups()
+    system, factor = _MEMORY_UNITS.get(unit) or (len(unit) > 1 and _MEMORY_UNITS.get(unit.lower())) or (None, None)
+    if factor is None:
+        raise CannotCoerce(answer)
+    total = Fraction(number) * factor
+    if total.denominator != 1:
+        raise CannotCoerce(answer)
+    # Largest unit of the same system that keeps the number whole; plain bytes stay bytes
+    units = {'i': _BINARY_UNITS, 'd': _DECIMAL_UNITS}.get(system, [])
+    for suffix, size in units:
+        if total % size == 0:
+            return f"{total // size}{suffix}"
+    return str(total.numerator)
+
+
+def canonical_cpu(answer: str) -> str:
+    """'0.5', '500 millicores', '0.5 cores' -> '500m'; whole cores ('1000m', '1 vCPU') -> '1'"""
+    match = _QUANTITY_RE.match(answer.strip())
+    if not match or match.group(2).lower() not in _CPU_UNITS:
+        raise CannotCoerce(answer)
+    millicores = Fraction(match.group(1)) * _CPU_UNITS[match.group(2).lower()]
+    if millicores.denominator != 1:
+        raise CannotCoerce(answer)
+    return str(millicores // 1000) if millicores % 1000 == 0 else f"{millicores}m"
+
+
+def canonical_image(answer: str) -> str:
+    """'docker.io/library/NGINX:1.25' -> 'nginx:1.25' (repositories are lowercase; tags keep their case)"""
+    reference = split_image_reference(answer)
+    if reference is None:
+        raise CannotCoerce(answer)
+    repository, tag = reference
+    # Docker Hub is the default registry and 'library/' its namespace for official images
+    repository = repository.lower()
+    for registry in ('docker.io/', 'index.docker.io/'):
+        if repository.startswith(registry):
+            repository = repository[len(registry):]
+    if repository.startswith('library/') and repository.count('/') == 1:
+        repository = repository[len('library/'):]
+    return f"{repository}:{tag}" if tag else repository
+
+
+def normalize_answer(answer: str, kind: str) -> str:
+    """Canonical text of one answer; answers that do not parse as their kind only lose extra whitespace"""
+    text = normalize_whitespace(answer)
+    try:
+        if kind == 'boolean':
+            return 'true' if coerce_answer(text, 'boolean') else 'false'
+        if kind == 'integer':
+            return str(canonical_integer(text))
+        if kind == 'number':
+            return str(coerce_answer(text, 'number'))
+        if kind == 'memory':
+            return canonical_memory(text)
+        if kind == 'cpu':
+            return canonical_cpu(text)
+        if kind == 'image':
+            return canonical_image(text)
+    except CannotCoerce:
+        pass
+    return text
+
+
+class AnswerNormalizer:
+    """Rewrites QA pairs into a canonical form before merging, caching and prompting"""
+
+    def normalize(self, answers: Iterable[Tuple[str, str]], questions: Iterable[Question]) -> List[Tuple[str, str]]:
+        """
+        Canonical QA pairs: known questions take the chart's own wording (so numbering and
+        help notes copied from the UI do not matter) and answers are read by question type
+        """
+        index = index_questions(questions)
+        normalized: List[Tuple[str, str]] = []
+        for question_text, answer in answers:
+            question = find_question(index, question_text)
+            text = question.text if question is not None else normalize_whitespace(question_text)
+            normalized.append((text, normalize_answer(str(answer), answer_kind(question, text))))
+        return normalized
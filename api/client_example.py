@@ -3,7 +3,7 @@ Example client to test HelmBot API endpoints
 """
 import requests
 import json
-from typing import List, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 class HelmBotClient:
@@ -12,23 +12,82 @@ class HelmBotClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
     
-    def get_questions(self) -> List[str]:
+    def list_charts(self) -> List[str]:
+        """Get identifiers of the charts served by the API"""
+        response = requests.get(f"{self.base_url}/charts")
+        response.raise_for_status()
+        return response.json()["charts"]
+    
+    def get_questions(self, chart: Optional[str] = None) -> List[str]:
         """Get list of questions from the API"""
-        response = requests.get(f"{self.base_url}/questions")
+        params = {"chart": chart} if chart else None
+        response = requests.get(f"{self.base_url}/questions", params=params)
         response.raise_for_status()
         data = response.json()
         return data["questions"]
     
-    def generate_yaml(self, qa_pairs: List[Dict[str, str]]) -> Dict:
+    def get_question_items(self, chart: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get structured questions (id, text, help, paths, type, default) from the API"""
+        params = {"chart": chart} if chart else None
+        response = requests.get(f"{self.base_url}/questions", params=params)
+        response.raise_for_status()
+        return response.json()["items"]
+    
+    def generate_yaml(self, qa_pairs: List[Dict[str, str]], bypass_cache: bool = False,
+                      chart: Optional[str] = None) -> str:
         """Generate YAML from question-answer pairs"""
-        payload = {"qa_pairs": qa_pairs}
+        payload = {"qa_pairs": qa_pairs, "bypass_cache": bypass_cache, "chart": chart}
         response = requests.post(
             f"{self.base_url}/generate-yaml",
             json=payload,
             headers={"Content-Type": "application/json"}
         )
         response.raise_for_status()
-        return response.json()
+        return response.text
+    
+    def stream_yaml(self, qa_pairs: List[Dict[str, str]], bypass_cache: bool = False,
+                    chart: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Stream YAML generation events (token/complete/error) from the API"""
+        payload = {"qa_pairs": qa_pairs, "bypass_cache": bypass_cache, "chart": chart}
+        with requests.post(
+            f"{self.base_url}/generate-yaml/stream",
+            json=payload,
+            headers={"Accept": "text/event-stream"},
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event:
+                    yield event, json.loads(line[len("data: "):])
+    
+    def generate_yaml_batch(self, items: List[Dict[str, Any]], bypass_cache: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Generate YAML for many QA sets in one call, yielding each result as it completes.
+        
+        Each item is {"id": ..., "qa_pairs": [...], "chart": ...}; each result carries the
+        item's id and either "yaml" or "error".
+        """
+        payload = {"items": items, "bypass_cache": bypass_cache}
+        with requests.post(
+            f"{self.base_url}/generate-yaml/batch",
+            json=payload,
+            headers={"Accept": "application/x-ndjson"},
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+    
+    def download_yaml_batch(self, items: List[Dict[str, Any]], bypass_cache: bool = False) -> bytes:
+        """Generate YAML for many QA sets and return them as a zip archive"""
+        payload = {"items": items, "bypass_cache": bypass_cache}
+        response = requests.post(f"{self.base_url}/generate-yaml/batch", params={"format": "zip"}, json=payload)
+        response.raise_for_status()
+        return response.content
 
 
 def main():
@@ -58,11 +117,10 @@ def main():
         
         # Generate YAML
         print("\n🚀 Generating YAML with example answers...")
-        result = client.generate_yaml(example_qa_pairs)
+        yaml_content = client.generate_yaml(example_qa_pairs)
         print("✅ YAML generated successfully!")
-        print(f"📁 Saved to: {result['file_path']}")
         print("\n--- Generated YAML Preview ---")
-        print(result['yaml_content'][:500] + "..." if len(result['yaml_content']) > 500 else result['yaml_content'])
+        print(yaml_content[:500] + "..." if len(yaml_content) > 500 else yaml_content)
         
     except requests.exceptions.ConnectionError:
         print("❌ Failed to connect to API. Make sure the server is running on http://localhost:8000")
@@ -0,0 +1,98 @@
+"""
+Background initialization and readiness of the HelmBot service
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import PREWARM_ON_STARTUP
+from structured_logging import get_logger
+from .service import HelmBotService
+
+logger = get_logger(__name__)
+
+# After a failed start, wait this long before building the service again
+RETRY_INTERVAL_SECONDS = 5.0
+
+
+class ServiceLifecycle:
+    """Builds the service once, off the event loop, so the worker accepts traffic immediately"""
+
+    def __init__(self, factory: Callable[[], Any] = HelmBotService, prewarm: bool = PREWARM_ON_STARTUP):
+        self._factory = factory
+        self.prewarm = prewarm
+        self.service: Optional[Any] = None
+        self._warming: Optional[Any] = None
+        self.error: Optional[BaseException] = None
+        self.startup_seconds: Optional[float] = None
+        self.attempts = 0
+        self._task: Optional[asyncio.Future] = None
+        self._created = time.monotonic()
+        self._failed_at = 0.0
+
+    def start(self) -> Optional[asyncio.Future]:
+        """Begin initialization in the background; a failed start is retried after RETRY_INTERVAL_SECONDS"""
+        if self.service is not None:
+            return self._task
+        if self._task is None or (self._task.done() and time.monotonic() - self._failed_at >= RETRY_INTERVAL_SECONDS):
+            self._task = asyncio.ensure_future(self._initialize())
+            # The failure is kept on self.error; mark the exception retrieved
+            self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._task
+
+    async def _initialize(self) -> Any:
+        self.attempts += 1
+        start = time.perf_counter()
+        try:
+            service = await asyncio.to_thread(self._factory)
+        except Exception as e:
+            self.error = e
+            self._failed_at = time.monotonic()
+            logger.error("❌ HelmBot service failed to start: %s", e)
+            raise
+        if self.prewarm:
+            # Not ready until every chart has questions, so /questions never waits on the model
+            self._warming = service
+            try:
+                await asyncio.to_thread(service.prewarm_questions)
+            except Exception as e:
+                logger.error("❌ Question pre-warming failed; questions will be generated on demand: %s", e)
+        self.service, self.error = service, None
+        self.startup_seconds = time.perf_counter() - start
+        logger.info("✅ HelmBot service ready in %.2fs", self.startup_seconds)
+        return service
+
+    async def get(self) -> Any:
+        """Return the service, waiting for an initialization in progress"""
+        if self.service is not None:
+            return self.service
+        return await asyncio.shield(self.start())
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness details: ready, starting, prewarming, failed or not_started"""
+        if self.service is not None:
+            state = "ready"
+        elif self._warming is not None:
+            state = "prewarming"
+        elif self._task is None:
+            state = "not_started"
+        elif self._task.done():
+            state = "failed"
+        else:
+            state = "starting"
+        return {
+            "status": state,
+            "uptime_seconds": round(time.monotonic() - self._created, 3),
+            "startup_seconds": round(self.startup_seconds, 3) if self.startup_seconds is not None else None,
+            "attempts": self.attempts,
+            "error": f"{type(self.error).__name__}: {self.error}" if self.error is not None else None,
+            **({"prewarm": self._warming.get_prewarm_status()} if self._warming is not None else {}),
+        }
+
+    def uptime(self) -> float:
+        return time.monotonic() - self._created
+
+    def shutdown(self) -> None:
+        """Release the service's resources if it was started"""
+        if self.service is not None:
+            self.service.shutdown()
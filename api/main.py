@@ -1,18 +1,40 @@
 """
 FastAPI main application
 """
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import List, Optional
+import json
+import time
 
 from .models import (
     QuestionResponse, 
+    QuestionItem,
     GenerateYAMLRequest, 
+    BatchGenerateYAMLRequest,
     ErrorResponse,
-    QAItem
+    QAItem,
+    CacheStatsResponse,
+    ValidationStatsResponse,
+    LLMPoolStatsResponse,
+    ChartListResponse
 )
+from .lifecycle import ServiceLifecycle
 from .service import HelmBotService
+from batch_runner import BatchItem, bundle_zip
+from chart_registry import ChartNotFoundError
+from llm_metrics import metrics
+from llm_scheduler import ProviderThrottledError
+from question_manager import QuestionsNotReadyError
+from config import BATCH_MAX_ITEMS, SLOW_REQUEST_SECONDS
+from structured_logging import configure_logging, get_logger, request_scope
+from yaml_validator import InvalidYAMLError
+
+# Every worker process imports this module, so logging is configured here: quiet unless
+# HELMBOT_LOG_LEVEL asks for more, and JSON lines with HELMBOT_LOG_FORMAT=json
+configure_logging('server')
+logger = get_logger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
@@ -30,8 +52,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize service
-helm_service = HelmBotService()
+
+@app.middleware("http")
+async def request_logging(request: Request, call_next):
+    """
+    Give each request an ID (the caller's X-Request-ID, or a new one) that tags its log
+    lines and spans, log its completion, and warn with per-stage timings when it is slow.
+    """
+    with request_scope(request.headers.get("x-request-id")) as trace:
+        start = time.perf_counter()
+        response = await call_next(request)
+        seconds = time.perf_counter() - start
+        response.headers["X-Request-ID"] = trace.request_id
+        fields = {"method": request.method, "path": request.url.path, "status": response.status_code,
+                  "duration_ms": round(seconds * 1000, 2)}
+        if seconds >= SLOW_REQUEST_SECONDS:
+            logger.warning("🐢 %s %s took %.2fs (%s)", request.method, request.url.path, seconds,
+                           trace.span_summary() or "no spans", extra={**fields, "spans": trace.spans})
+        else:
+            logger.info("%s %s %d in %.2f ms", request.method, request.url.path, response.status_code,
+                        fields["duration_ms"], extra=fields)
+    return response
+
+
+# The service is built in the background at startup (or on first use), never at import time
+lifecycle = ServiceLifecycle(HelmBotService)
+
+
+async def get_service() -> HelmBotService:
+    """The initialized service, waiting for startup to finish; 503 if it could not start"""
+    try:
+        return await lifecycle.get()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service is not available: {str(e)}")
+
+
+def _throttled(e: ProviderThrottledError) -> HTTPException:
+    """503 telling the client when to retry a request the provider kept rate limiting"""
+    retry_after = int(e.retry_after or 0) + 1
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(retry_after)})
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start building the service in the background so the worker accepts traffic immediately"""
+    lifecycle.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release service resources"""
+    lifecycle.shutdown()
 
 
 @app.get("/")
@@ -46,20 +117,59 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the worker is up and its event loop is responsive"""
+    return {"status": "alive", "uptime_seconds": round(lifecycle.uptime(), 3)}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once the service is initialized, 503 while it is starting
+    or after a failed start (which is retried in the background).
+    """
+    lifecycle.start()
+    status = lifecycle.status()
+    return JSONResponse(status_code=200 if status["status"] == "ready" else 503, content=status)
+
+
+@app.get("/charts", response_model=ChartListResponse)
+async def list_charts():
+    """
+    List the charts available in the chart registry.
+    
+    Returns:
+        ChartListResponse: Chart identifiers and total count
+    """
+    helm_service = await get_service()
+    charts = helm_service.list_charts()
+    return ChartListResponse(charts=charts, total_charts=len(charts))
+
+
 @app.get("/questions", response_model=QuestionResponse)
-async def get_questions():
+async def get_questions(chart: Optional[str] = Query(None, description="Chart identifier (defaults to the configured chart)")):
     """
     Get list of questions for Helm chart configuration.
     
     Returns:
         QuestionResponse: List of questions and total count
     """
+    helm_service = await get_service()
     try:
-        questions = helm_service.get_questions()
+        questions = await helm_service.aget_question_set(chart)
         return QuestionResponse(
-            questions=questions,
-            total_questions=len(questions)
+            questions=[q.text for q in questions],
+            total_questions=len(questions),
+            items=[QuestionItem(**q.to_dict()) for q in questions]
         )
+    except ChartNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ProviderThrottledError as e:
+        raise _throttled(e)
+    except QuestionsNotReadyError as e:
+        # Cache-only mode: the chart was not pre-warmed (run `helm-bot.py --prewarm`)
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -68,7 +178,7 @@ async def get_questions():
 
 
 @app.post("/generate-yaml")
-async def generate_yaml(request: GenerateYAMLRequest):
+async def generate_yaml(request: GenerateYAMLRequest, background_tasks: BackgroundTasks):
     """
     Generate values.yaml file from question-answer pairs.
     
@@ -76,7 +186,7 @@ async def generate_yaml(request: GenerateYAMLRequest):
         request: GenerateYAMLRequest containing list of question-answer pairs
         
     Returns:
-        GenerateYAMLResponse: Generated YAML content and file path
+        Response: Generated YAML content as a downloadable attachment
     """
     try:
         if not request.qa_pairs:
@@ -87,16 +197,33 @@ async def generate_yaml(request: GenerateYAMLRequest):
         
         # Convert QAItem objects to tuples
         qa_tuples = [(qa.question, qa.answer) for qa in request.qa_pairs]
+        helm_service = await get_service()
         
         # Generate YAML
-        _, file_path = helm_service.generate_yaml(qa_tuples)
+        yaml_content, file_path = await helm_service.agenerate_yaml(
+            qa_tuples, use_cache=not request.bypass_cache, chart_id=request.chart
+        )
+        if file_path:
+            background_tasks.add_task(helm_service.cleanup_generated_files)
         
-        # Return the YAML file for download
-        return FileResponse(
-            path=file_path,
+        # Stream the in-memory YAML back as a download
+        return Response(
+            content=yaml_content,
             media_type="application/x-yaml",
-            filename="generated_values.yaml"
+            headers={"Content-Disposition": 'attachment; filename="generated_values.yaml"'},
+            background=background_tasks
+        )
+    except HTTPException:
+        raise
+    except ChartNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidYAMLError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Model produced invalid YAML after repair attempts: {str(e)}"
         )
+    except ProviderThrottledError as e:
+        raise _throttled(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -104,12 +231,177 @@ async def generate_yaml(request: GenerateYAMLRequest):
         )
 
 
+@app.post("/generate-yaml/stream")
+async def generate_yaml_stream(request: GenerateYAMLRequest):
+    """
+    Stream values.yaml generation as Server-Sent Events.
+    
+    Emits `token` events as the model produces output, then a single `complete`
+    event carrying the validated YAML (or an `error` event if validation fails).
+    A `reset` event means the tokens so far are superseded by the ones that follow.
+    
+    Args:
+        request: GenerateYAMLRequest containing list of question-answer pairs
+        
+    Returns:
+        StreamingResponse: text/event-stream of generation events
+    """
+    if not request.qa_pairs:
+        raise HTTPException(
+            status_code=400,
+            detail="No question-answer pairs provided"
+        )
+    
+    qa_tuples = [(qa.question, qa.answer) for qa in request.qa_pairs]
+    helm_service = await get_service()
+    try:
+        events = helm_service.astream_yaml(
+            qa_tuples, use_cache=not request.bypass_cache, chart_id=request.chart
+        )
+    except ChartNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    async def event_stream():
+        try:
+            async for event, data in events:
+                if event == "token":
+                    payload = {"text": data}
+                elif event == "complete":
+                    payload = {"yaml": data}
+                elif event == "reset":
+                    payload = {}
+                else:
+                    payload = {"detail": data}
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            error = {"detail": f"Failed to generate YAML: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/generate-yaml/batch")
+async def generate_yaml_batch(
+    request: BatchGenerateYAMLRequest,
+    response_format: str = Query("ndjson", alias="format", description="ndjson (streamed) or zip")
+):
+    """
+    Generate values.yaml files for many QA sets, possibly for different charts.
+    
+    Identical sets are generated once and the rest run concurrently at batch priority
+    under the provider rate limits. Per-item failures are reported in that item's
+    result instead of failing the batch.
+    
+    Args:
+        request: BatchGenerateYAMLRequest containing the QA sets
+        response_format: `ndjson` streams one JSON result per line as each item
+            completes; `zip` returns `<id>.yaml` files plus `results.json`
+        
+    Returns:
+        StreamingResponse | Response: application/x-ndjson stream or application/zip
+    """
+    if response_format not in ("ndjson", "zip"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'zip'")
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    
+    items = [
+        BatchItem(item.id if item.id is not None else str(index),
+                  [(qa.question, qa.answer) for qa in item.qa_pairs], item.chart)
+        for index, item in enumerate(request.items)
+    ]
+    if len({item.id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Item ids must be unique")
+    
+    helm_service = await get_service()
+    results = helm_service.astream_batch(items, use_cache=not request.bypass_cache)
+    
+    if response_format == "zip":
+        archive = bundle_zip([result async for result in results])
+        return Response(
+            content=archive,
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="generated_values.zip"'}
+        )
+    
+    async def result_lines():
+        async for result in results:
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(
+        result_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/cache/stats", response_model=CacheStatsResponse)
+async def cache_stats():
+    """
+    Get response cache hit/miss statistics.
+    
+    Returns:
+        CacheStatsResponse: Whether caching is enabled and its counters
+    """
+    helm_service = await get_service()
+    stats = helm_service.get_cache_stats()
+    return CacheStatsResponse(enabled=stats is not None, stats=stats or {})
+
+
+@app.get("/validation/stats", response_model=ValidationStatsResponse)
+async def validation_stats():
+    """
+    Get how often generated YAML passed validation on the first model call.
+    
+    Returns:
+        ValidationStatsResponse: First-pass, repaired and failed generation counts
+    """
+    helm_service = await get_service()
+    return ValidationStatsResponse(stats=helm_service.get_validation_stats())
+
+
+@app.get("/llm/stats", response_model=LLMPoolStatsResponse)
+async def llm_stats():
+    """
+    Get LLM client pool usage, provider rate limiting and failover health: requests in
+    flight, queue wait times, throttled responses, retries, provider latency and failovers.
+    
+    Returns:
+        LLMPoolStatsResponse: Pool, rate-limit and failover statistics
+    """
+    helm_service = await get_service()
+    return LLMPoolStatsResponse(
+        pools=helm_service.get_llm_pool_stats(),
+        rate_limits=helm_service.get_rate_limit_stats(),
+        failover=helm_service.get_failover_stats()
+    )
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Per-call model metrics in the Prometheus text format: calls, prompt/completion
+    tokens, call duration and time-to-first-token by provider, model and call site,
+    plus how generations were served (merged, cache, peer or model).
+    Does not wait for the service to start, so scrapes never block.
+    """
+    return Response(content=metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return {"error": "Endpoint not found", "detail": str(exc)}
+    detail = getattr(exc, "detail", str(exc))
+    return JSONResponse(status_code=404, content={"error": "Not found", "detail": detail})
 
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
-    return {"error": "Internal server error", "detail": str(exc)}
+    detail = getattr(exc, "detail", str(exc))
+    return JSONResponse(status_code=500, content={"error": "Internal server error", "detail": detail})
@@ -1,14 +1,31 @@
 """
 Pydantic models for API requests and responses
 """
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
 
 
+class QuestionItem(BaseModel):
+    """Model for a single structured question"""
+    id: str = Field(..., description="Stable question identifier")
+    text: str = Field(..., description="The question")
+    help: str = Field("", description="What the answer controls")
+    paths: List[str] = Field(default_factory=list, description="values.yaml paths the answer sets")
+    type: str = Field("string", description="Expected answer type ('unknown' when values.yaml does not define the path)")
+    default: Any = Field(None, description="Current value in the chart's values.yaml")
+
+
 class QuestionResponse(BaseModel):
     """Response model for questions endpoint"""
     questions: List[str] = Field(..., description="List of generated questions")
     total_questions: int = Field(..., description="Total number of questions")
+    items: List[QuestionItem] = Field(default_factory=list, description="Structured form of the questions")
+
+
+class ChartListResponse(BaseModel):
+    """Response model for charts endpoint"""
+    charts: List[str] = Field(..., description="Identifiers of available charts")
+    total_charts: int = Field(..., description="Total number of charts")
 
 
 class QAItem(BaseModel):
@@ -20,6 +37,21 @@ class QAItem(BaseModel):
 class GenerateYAMLRequest(BaseModel):
     """Request model for YAML generation"""
     qa_pairs: List[QAItem] = Field(..., description="List of question-answer pairs")
+    bypass_cache: bool = Field(False, description="Skip the response cache and always call the model")
+    chart: Optional[str] = Field(None, description="Chart identifier (defaults to the configured chart)")
+
+
+class BatchItemRequest(BaseModel):
+    """Model for one QA set of a batch generation request"""
+    id: Optional[str] = Field(None, description="Identifier echoed in the result (defaults to the item's position)")
+    qa_pairs: List[QAItem] = Field(..., description="List of question-answer pairs")
+    chart: Optional[str] = Field(None, description="Chart identifier (defaults to the configured chart)")
+
+
+class BatchGenerateYAMLRequest(BaseModel):
+    """Request model for batch YAML generation"""
+    items: List[BatchItemRequest] = Field(..., description="QA sets to generate, possibly for different charts")
+    bypass_cache: bool = Field(False, description="Skip the response cache and always call the model")
 
 
 class GenerateYAMLResponse(BaseModel):
@@ -29,6 +61,24 @@ class GenerateYAMLResponse(BaseModel):
     message: str = Field(..., description="Success message")
 
 
+class CacheStatsResponse(BaseModel):
+    """Response model for cache statistics"""
+    enabled: bool = Field(..., description="Whether the response cache is enabled")
+    stats: Dict[str, Any] = Field(default_factory=dict, description="Hit/miss counters and tier sizes")
+
+
+class ValidationStatsResponse(BaseModel):
+    """Response model for generated YAML validation statistics"""
+    stats: Dict[str, Any] = Field(default_factory=dict, description="First-pass success, repair and failure counters")
+
+
+class LLMPoolStatsResponse(BaseModel):
+    """Response model for LLM client pool statistics"""
+    pools: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="In-flight, queue-wait and client counts per provider/model")
+    rate_limits: Dict[str, Any] = Field(default_factory=dict, description="Admission waits, throttling and retry counters per provider")
+    failover: Dict[str, Any] = Field(default_factory=dict, description="Provider health, latency histograms and failover/hedge counters")
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     error: str = Field(..., description="Error message")
@@ -1,14 +1,33 @@
 """
 API server startup script
 """
-import uvicorn
-from api.main import app
+import argparse
+
+from startup_profiler import ImportProfiler
+
+
+def parse_args(argv=None):
+    from config import PROFILE_STARTUP
+    parser = argparse.ArgumentParser(description="Run the HelmBot API server")
+    parser.add_argument('--profile-startup', action='store_true', default=PROFILE_STARTUP,
+                        help="report per-module import time of the API before serving")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "api.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+    args = parse_args()
+    profiler = ImportProfiler().start() if args.profile_startup else None
+    import uvicorn
+    if profiler:
+        from api.main import app
+        print(profiler.stop().report())
+        # Serve the app object that was profiled; the reloader would import a fresh copy
+        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    else:
+        uvicorn.run(
+            "api.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
@@ -1,71 +1,304 @@
 """
 HelmBot service layer - Business logic for API endpoints
 """
+import asyncio
+import contextvars
+import hashlib
 import os
 import sys
-from typing import List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 # Add parent directory to path to import HelmBot modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import TEMPLATE_DIR, GENERATED_QUESTIONS_FILE
+from config import (
+    API_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY, PERSIST_GENERATED_FILES,
+    GENERATED_OUTPUT_DIR, GENERATED_FILE_TTL_SECONDS, QUESTIONS_CACHE_ONLY
+)
+from batch_runner import BatchItem, BatchRunner
+from chart_registry import ChartRegistry
 from helm_parser import HelmTemplateParser
 from llm_manager import LLMManager
-from question_manager import QuestionManager
+from llm_scheduler import ProviderThrottledError
+from prewarm import QuestionPrewarmer
+from question_manager import QuestionManager, QuestionsNotReadyError
+from question_schema import Question
 from yaml_generator import YAMLGenerator
+from yaml_validator import InvalidYAMLError
 
 
 class HelmBotService:
     """Service class containing business logic for HelmBot API"""
     
-    def __init__(self):
-        """Initialize HelmBot components"""
+    def __init__(self, max_concurrency: int = API_MAX_CONCURRENCY, interactive: bool = False,
+                 questions_cache_only: bool = QUESTIONS_CACHE_ONLY):
+        """
+        Initialize HelmBot components
+        
+        Args:
+            max_concurrency: Size of the worker pool for blocking calls
+            interactive: Prompt for missing provider credentials instead of raising
+                MissingCredentialsError (servers never prompt)
+            questions_cache_only: Never generate questions on the request path; charts
+                without generated questions raise QuestionsNotReadyError
+        """
+        self.registry = ChartRegistry()
         self.parser = HelmTemplateParser()
-        self.llm_manager = LLMManager()
+        self.llm_manager = LLMManager(interactive=interactive)
         self.question_manager = QuestionManager(self.llm_manager, self.parser)
-        self.yaml_generator = YAMLGenerator(self.llm_manager)
+        self.yaml_generator = YAMLGenerator(self.llm_manager, helm_parser=self.parser)
+        self.prewarmer = QuestionPrewarmer(self.question_manager)
+        self.questions_cache_only = questions_cache_only
+        # Blocking LLM calls and file I/O run here so the event loop stays free
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="helmbot-worker"
+        )
+    
+    async def _run_blocking(self, func, *args):
+        """Run a blocking callable on the bounded worker pool (with the caller's context, e.g. LLM priority)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, func, *args))
+    
+    def shutdown(self) -> None:
+        """Release the worker pool"""
+        self._executor.shutdown(wait=False)
+        self.llm_manager.shutdown()
     
-    def get_questions(self) -> List[str]:
+    def list_charts(self) -> List[str]:
+        """
+        List identifiers of all charts known to the registry
+        
+        Returns:
+            List[str]: Chart identifiers
+        """
+        return self.registry.list_charts()
+    
+    def get_questions(self, chart_id: Optional[str] = None) -> List[str]:
         """
         Get list of questions for Helm chart configuration
         
+        Args:
+            chart_id: Chart identifier (defaults to the configured chart)
+            
         Returns:
             List[str]: List of questions
         """
-        try:
-            # Ensure questions exist (will generate if missing)
-            gen_q_path = self.question_manager.ensure_questions_exist()
-            
-            # Read questions from file
-            with open(gen_q_path, 'r', encoding='utf-8') as f:
-                questions = [q.strip() for q in f.readlines() if q.strip()]
+        return [question.text for question in self.get_question_set(chart_id)]
+    
+    def get_question_set(self, chart_id: Optional[str] = None) -> List[Question]:
+        """
+        Get the structured questions for a chart
+        
+        Args:
+            chart_id: Chart identifier (defaults to the configured chart)
             
-            return questions
+        Returns:
+            List[Question]: Questions with help text, values paths, types and defaults
+        """
+        chart = self.registry.get(chart_id)
+        try:
+            # Served from the chart's in-memory copy (generated if missing, unless cache-only)
+            return self.question_manager.load_question_set(chart, generate=not self.questions_cache_only)
+        except (ProviderThrottledError, QuestionsNotReadyError):
+            raise
         except Exception as e:
             raise Exception(f"Failed to get questions: {str(e)}")
     
-    def generate_yaml(self, qa_pairs: List[Tuple[str, str]]) -> Tuple[str, str]:
+    def prewarm_questions(self, chart_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Generate missing or stale questions ahead of the first request
+        
+        Args:
+            chart_ids: Charts to check (defaults to every chart, plus the configured chart)
+            
+        Returns:
+            Dict[str, Any]: Counts of current, generated and failed charts, with per-chart results
+        """
+        return self.prewarmer.run(self.registry, chart_ids)
+    
+    def get_prewarm_status(self) -> Dict[str, Any]:
+        """
+        Get question pre-warming progress
+        
+        Returns:
+            Dict[str, Any]: State (not_started, running or done) and per-status chart counts
+        """
+        return self.prewarmer.status()
+    
+    def generate_yaml(self, qa_pairs: List[Tuple[str, str]], use_cache: bool = True,
+                      persist: bool = PERSIST_GENERATED_FILES,
+                      chart_id: Optional[str] = None) -> Tuple[str, Optional[str]]:
         """
         Generate YAML from question-answer pairs
         
         Args:
             qa_pairs: List of (question, answer) tuples
+            use_cache: Serve identical requests from the response cache
+            persist: Also write a content-addressed copy under GENERATED_OUTPUT_DIR
+            chart_id: Chart identifier (defaults to the configured chart)
             
         Returns:
-            Tuple[str, str]: (yaml_content, file_path)
+            Tuple[str, Optional[str]]: (yaml_content, file_path or None when not persisted)
         """
+        chart = self.registry.get(chart_id)
         try:
             if not qa_pairs:
                 raise ValueError("No question-answer pairs provided")
             
-            # Generate YAML using the existing yaml_generator
-            self.yaml_generator.generate_values_yaml_gpt4(qa_pairs)
+            # Generate YAML in memory; concurrent requests never share a file
+            yaml_content = self.yaml_generator.generate_values_yaml(
+                qa_pairs, use_cache=use_cache, chart=chart
+            )
             
-            # Read the generated YAML content
-            generated_path = os.path.join(TEMPLATE_DIR, "generated_values.yaml")
-            with open(generated_path, 'r', encoding='utf-8') as f:
-                yaml_content = f.read()
+            file_path = None
+            if persist:
+                digest = hashlib.sha256(yaml_content.encode('utf-8')).hexdigest()[:16]
+                file_path = self.yaml_generator.save_values_yaml(
+                    yaml_content,
+                    os.path.join(GENERATED_OUTPUT_DIR, f"{chart.name}-values-{digest}.yaml")
+                )
             
-            return yaml_content, generated_path
+            return yaml_content, file_path
+        except (InvalidYAMLError, ProviderThrottledError):
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate YAML: {str(e)}")
+    
+    def cleanup_generated_files(self, max_age_seconds: float = GENERATED_FILE_TTL_SECONDS) -> int:
+        """
+        Remove persisted YAML files older than max_age_seconds
+        
+        Returns:
+            int: Number of files removed
+        """
+        if not os.path.isdir(GENERATED_OUTPUT_DIR):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for entry in os.scandir(GENERATED_OUTPUT_DIR):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                # Another worker cleaned it up first
+                continue
+        return removed
+    
+    async def aget_questions(self, chart_id: Optional[str] = None) -> List[str]:
+        """Async variant of get_questions that does not block the event loop"""
+        return await self._run_blocking(self.get_questions, chart_id)
+    
+    async def aget_question_set(self, chart_id: Optional[str] = None) -> List[Question]:
+        """Async variant of get_question_set that does not block the event loop"""
+        return await self._run_blocking(self.get_question_set, chart_id)
+    
+    async def agenerate_yaml(self, qa_pairs: List[Tuple[str, str]], use_cache: bool = True,
+                             chart_id: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Async variant of generate_yaml that does not block the event loop"""
+        return await self._run_blocking(
+            partial(self.generate_yaml, qa_pairs, use_cache, chart_id=chart_id)
+        )
+    
+    def astream_yaml(self, qa_pairs: List[Tuple[str, str]], use_cache: bool = True,
+                     chart_id: Optional[str] = None) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream YAML generation events from question-answer pairs
+        
+        Args:
+            qa_pairs: List of (question, answer) tuples
+            use_cache: Serve identical requests from the response cache
+            chart_id: Chart identifier (defaults to the configured chart)
+            
+        Returns:
+            AsyncIterator[Tuple[str, str]]: ("token" | "reset" | "complete" | "error", payload) events
+        """
+        if not qa_pairs:
+            raise ValueError("No question-answer pairs provided")
+        chart = self.registry.get(chart_id)
+        return self.yaml_generator.astream_values_yaml(qa_pairs, use_cache=use_cache, chart=chart,
+                                                     run_blocking=self._run_blocking)
+    
+    def astream_batch(self, items: List[BatchItem], use_cache: bool = True,
+                      max_concurrency: int = BATCH_MAX_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate YAML for many QA sets, possibly for different charts
+        
+        Identical sets are generated once; the rest run concurrently at batch priority
+        under the provider rate limits.
+        
+        Args:
+            items: QA sets to generate, each with its own id and chart
+            use_cache: Serve identical requests from the response cache
+            max_concurrency: Distinct sets generated at once
+            
+        Returns:
+            AsyncIterator[Dict[str, Any]]: One result per item, as each completes
+        """
+        return BatchRunner(self._agenerate_batch_item, max_concurrency).arun(items, use_cache)
+    
+    def generate_batch_item(self, qa_pairs: List[Tuple[str, str]], chart_id: Optional[str] = None,
+                            use_cache: bool = True) -> Tuple[str, str]:
+        """
+        Generate YAML for one batch item
+        
+        Returns:
+            Tuple[str, str]: (yaml_content, source: 'merged', 'cache', 'peer' or 'model')
+        """
+        chart = self.registry.get(chart_id)
+        return self.yaml_generator.generate_values_yaml_with_source(qa_pairs, use_cache=use_cache, chart=chart)
+    
+    async def _agenerate_batch_item(self, qa_pairs: List[Tuple[str, str]], chart_id: Optional[str],
+                                    use_cache: bool) -> Tuple[str, str]:
+        return await self._run_blocking(self.generate_batch_item, qa_pairs, chart_id, use_cache)
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get response cache statistics
+        
+        Returns:
+            Optional[Dict[str, Any]]: Hit/miss counters, or None when caching is disabled
+        """
+        cache = self.yaml_generator.cache
+        return cache.stats() if cache is not None else None
+    
+    def get_validation_stats(self) -> Dict[str, Any]:
+        """
+        Get first-pass validation and repair counters for generated YAML
+        
+        Returns:
+            Dict[str, Any]: Generations, first-pass successes, repairs and failures
+        """
+        return self.yaml_generator.validation.stats()
+    
+    def get_llm_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get LLM client pool statistics
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: In-flight requests, queue waits and client counts per model
+        """
+        return self.llm_manager.get_pool_stats()
+    
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """
+        Get provider rate-limit statistics
+        
+        Returns:
+            Dict[str, Any]: Admission waits, throttled responses, retries and bucket levels per provider
+        """
+        return self.llm_manager.get_scheduler_stats()
+    
+    def get_failover_stats(self) -> Dict[str, Any]:
+        """
+        Get provider failover statistics
+        
+        Returns:
+            Dict[str, Any]: Provider health and latency histograms, plus failover and hedge counters
+        """
+        return self.llm_manager.get_failover_stats()
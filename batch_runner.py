@@ -0,0 +1,245 @@
+"""Concurrent, de-duplicated generation of many values.yaml files at batch priority"""
+import asyncio
+import contextvars
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import BATCH_MAX_CONCURRENCY
+from llm_scheduler import BATCH, llm_priority
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BatchItem:
+    """One QA set of a batch, for one chart"""
+
+    def __init__(self, id: str, qa_pairs: Sequence[Tuple[str, str]], chart: Optional[str] = None):
+        self.id = id
+        self.qa_pairs = [tuple(pair) for pair in qa_pairs]
+        self.chart = chart
+
+    def key(self, use_cache: bool = True) -> str:
+        """Items with the same key produce the same YAML and are generated once"""
+        payload = json.dumps([self.chart, use_cache, self.qa_pairs], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# (qa_pairs, chart, use_cache) -> (YAML content, source: 'merged', 'cache', 'peer' or 'model')
+GenerateFunc = Callable[[List[Tuple[str, str]], Optional[str], bool], Awaitable[Tuple[str, str]]]
+
+
+class BatchRunner:
+    """
+    Generate the YAML for many QA sets concurrently and yield each result as it completes.
+
+    Identical sets (same chart and answers) are generated once and reported for every
+    item that asked for them. Model calls run at BATCH priority, so the provider rate
+    limiter keeps part of each limit free for interactive requests.
+    """
+
+    def __init__(self, generate: GenerateFunc, max_concurrency: int = BATCH_MAX_CONCURRENCY):
+        self._generate = generate
+        self._max_concurrency = max(1, max_concurrency)
+
+    async def _run_group(self, group: List[BatchItem], use_cache: bool, semaphore: asyncio.Semaphore):
+        item = group[0]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                with llm_priority(BATCH):
+                    if not item.qa_pairs:
+                        raise ValueError("No question-answer pairs provided")
+                    yaml_content, source = await self._generate(item.qa_pairs, item.chart, use_cache)
+                return group, (yaml_content, source), None, time.perf_counter() - start
+            except Exception as e:
+                return group, (None, None), e, time.perf_counter() - start
+
+    async def arun(self, items: Sequence[BatchItem], use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one result per item, in completion order"""
+        groups: Dict[str, List[BatchItem]] = {}
+        for item in items:
+            groups.setdefault(item.key(use_cache), []).append(item)
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        tasks = [asyncio.ensure_future(self._run_group(group, use_cache, semaphore)) for group in groups.values()]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                group, output, error, seconds = await completed
+                for item in group:
+                    yield _result(item, group[0], output, error, seconds)
+        finally:
+            # The client went away or the caller stopped early: stop generating
+            for task in tasks:
+                task.cancel()
+
+
+def _result(item: BatchItem, first: BatchItem, output: Tuple[Optional[str], Optional[str]],
+            error: Optional[BaseException], seconds: float) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"id": item.id, "chart": item.chart, "ok": error is None}
+    if error is None:
+        result["yaml"], result["source"] = output
+    else:
+        result["error"] = str(error)
+        result["error_type"] = type(error).__name__
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            result["retry_after"] = retry_after
+    if item is not first:
+        result["duplicate_of"] = first.id
+    result["seconds"] = round(seconds, 3)
+    return result
+
+
+def bundle_zip(results: Sequence[Dict[str, Any]]) -> bytes:
+    """Zip archive with <id>.yaml per generated item and results.json describing every item"""
+    buffer = io.BytesIO()
+    manifest = []
+    names = iter(unique_file_names(result["id"] for result in results if result["ok"]))
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            entry = {key: value for key, value in result.items() if key != "yaml"}
+            if result["ok"]:
+                name = next(names)
+                archive.writestr(name, result["yaml"])
+                entry["file"] = name
+            manifest.append(entry)
+        archive.writestr("results.json", json.dumps(manifest, indent=2))
+    return buffer.getvalue()
+
+
+def safe_file_name(item_id: Any) -> str:
+    """File name stem for an item id that cannot escape the output directory"""
+    return re.sub(r'[^A-Za-z0-9._-]', '_', str(item_id)).strip('.') or "item"
+
+
+def unique_file_names(item_ids: Iterable[Any]) -> List[str]:
+    """'<id>.yaml' per id, in order; ids that sanitize to the same name ('a/b', 'a_b') get a '_' suffix"""
+    names: List[str] = []
+    taken = set()
+    for item_id in item_ids:
+        name = safe_file_name(item_id)
+        while f"{name}.yaml" in taken:
+            name += "_"
+        taken.add(f"{name}.yaml")
+        names.append(f"{name}.yaml")
+    return names
+
+
+def _qa_pairs(record: Dict[str, Any], position: int) -> List[Tuple[str, str]]:
+    pairs = []
+    for pair in record.get("qa_pairs") or []:
+        if isinstance(pair, dict):
+            pairs.append((str(pair.get("question", "")), str(pair.get("answer", ""))))
+        elif isinstance(pair, (list, tuple)) and len(pair) == 2:
+            pairs.append((str(pair[0]), str(pair[1])))
+        else:
+            raise ValueError(f"Record {position}: qa_pairs entries must be {{question, answer}} objects or [question, answer] pairs")
+    return pairs
+
+
+def load_batch_items(text: str) -> List[BatchItem]:
+    """
+    Parse answer sets from JSON or JSONL.
+
+    Accepts one record ({"qa_pairs": [...]}, like api/sampleinput.json), a list of records,
+    a batch request body ({"items": [...]}) or one record per line. Records may carry an
+    "id" (defaults to the record's position) and a "chart".
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data["items"] if "items" in data else [data]
+    if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+        raise ValueError("Batch input must contain JSON objects with qa_pairs")
+
+    items = [
+        BatchItem(str(record["id"]) if record.get("id") is not None else str(position),
+                  _qa_pairs(record, position), record.get("chart"))
+        for position, record in enumerate(data)
+    ]
+    seen = set()
+    for item in items:
+        if item.id in seen:
+            raise ValueError(f"Duplicate record id: {item.id}")
+        seen.add(item.id)
+    return items
+
+
+def summarize(results: Sequence[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    """Batch report: counts, where each YAML came from, latency percentiles and per-item results"""
+    latencies = sorted(result["seconds"] for result in results if "duplicate_of" not in result)
+    sources: Dict[str, int] = {}
+    for result in results:
+        if result["ok"]:
+            source = "duplicate" if "duplicate_of" in result else result.get("source") or "unknown"
+            sources[source] = sources.get(source, 0) + 1
+
+    def percentile(q: float) -> Optional[float]:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+    return {
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "total": len(results),
+        "succeeded": sum(1 for result in results if result["ok"]),
+        "failed": sum(1 for result in results if not result["ok"]),
+        "sources": sources,
+        "seconds": round(seconds, 3),
+        "latency_seconds": {"p50": percentile(0.5), "p95": percentile(0.95), "max": latencies[-1] if latencies else None},
+        "items": [{key: value for key, value in result.items() if key != "yaml"} for result in results],
+    }
+
+
+def run_to_directory(items: Sequence[BatchItem],
+                     generate: Callable[[List[Tuple[str, str]], Optional[str], bool], Tuple[str, str]],
+                     output_dir: str, workers: int = BATCH_MAX_CONCURRENCY,
+                     use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Run a blocking generate function over items on a pool of worker threads, writing
+    <output_dir>/<id>.yaml as each item completes. Returns the summarize() report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # Named up front, in input order, so colliding ids never overwrite each other's files
+    file_names = dict(zip((item.id for item in items), unique_file_names(item.id for item in items)))
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="helmbot-batch")
+
+    async def generate_async(qa_pairs, chart, use_cache):
+        # Worker threads see the caller's context, so model calls keep BATCH priority
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, partial(context.run, generate, qa_pairs, chart, use_cache)
+        )
+
+    async def run():
+        results = []
+        async for result in BatchRunner(generate_async, workers).arun(items, use_cache):
+            if result["ok"]:
+                path = os.path.join(output_dir, file_names[result['id']])
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(result["yaml"])
+                os.replace(tmp_path, path)
+                result["file"] = path
+            logger.log(logging.INFO if result["ok"] else logging.WARNING, "%s %s: %s (%.2fs)",
+                       "✅" if result["ok"] else "❌", result['id'], result.get('file') or result.get('error'),
+                       result['seconds'])
+            results.append(result)
+        return results
+
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown(wait=False)
+    return summarize(results, time.perf_counter() - start)
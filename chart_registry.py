@@ -0,0 +1,293 @@
+"""Registry of Helm charts with lazily loaded, per-chart cached state"""
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import (
+    TEMPLATE_DIR, VALUES_FILE, GENERATED_QUESTIONS_FILE, GENERATED_VALUES_FILE, QUESTIONS_META_FILE,
+    TEMPLATE_INDEX_FILE, CHARTS_DIR, CHART_CACHE_SIZE, CHART_EXTRACT_DIR
+)
+from single_flight import FileLock
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+CHART_MANIFEST = 'Chart.yaml'
+CHART_ARCHIVE_SUFFIX = '.tgz'
+_CHART_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+# Files HelmBot writes into a chart; they survive re-extraction, and their own checks decide staleness
+_CARRIED_OVER_FILES = (GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE)
+
+
+class ChartNotFoundError(KeyError):
+    """Raised when a chart identifier does not resolve to a known chart"""
+
+    def __str__(self):
+        return f"Chart not found: {self.args[0]}"
+
+
+class ChartContext:
+    """Paths and lazily loaded state for a single Helm chart"""
+
+    def __init__(self, name: str, root_dir: str):
+        self.name = name
+        self.root_dir = root_dir
+        self.templates_dir = os.path.join(root_dir, 'templates')
+        self.values_path = os.path.join(root_dir, VALUES_FILE)
+        self.questions_path = os.path.join(root_dir, GENERATED_QUESTIONS_FILE)
+        self.questions_meta_path = os.path.join(root_dir, QUESTIONS_META_FILE)
+        self.generated_values_path = os.path.join(root_dir, GENERATED_VALUES_FILE)
+        # (mtime_ns, size) of the archive a packaged chart was extracted from; None for directories
+        self.archive_signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+        self._memo: Dict[str, Any] = {}
+        self._files: Dict[str, tuple] = {}
+        self._derived: Dict[tuple, tuple] = {}
+        self._checked: Dict[str, float] = {}
+
+    def __repr__(self):
+        return f"ChartContext(name={self.name!r}, root_dir={self.root_dir!r})"
+
+    def memo(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return a cached per-chart value, computing it with loader on first use"""
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = loader()
+            return self._memo[key]
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one cached value (or all of them)"""
+        with self._lock:
+            if key is None:
+                self._memo.clear()
+                self._files.clear()
+                self._derived.clear()
+                self._checked.clear()
+            else:
+                self._memo.pop(key, None)
+                self._checked.pop(key, None)
+
+    def recently_checked(self, key: str, interval: float) -> bool:
+        """Whether key was marked as checked within the last interval seconds"""
+        with self._lock:
+            checked = self._checked.get(key)
+        return checked is not None and time.monotonic() - checked < interval
+
+    def mark_checked(self, key: str) -> None:
+        """Record that key was just validated"""
+        with self._lock:
+            self._checked[key] = time.monotonic()
+
+    def read_file(self, path: str) -> Optional[str]:
+        """Read a chart file, serving it from memory until its mtime or size changes"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._files.pop(path, None)
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        with self._lock:
+            self._files[path] = (signature, content)
+        return content
+
+    def load_files(self, paths: Sequence[str], loader: Callable[..., Any]) -> Any:
+        """
+        Build a value from chart files (loader gets their contents, None when missing),
+        rebuilding it only when one of the files changes.
+        """
+        contents = tuple(self.read_file(path) for path in paths)
+        key = tuple(paths)
+        with self._lock:
+            cached = self._derived.get(key)
+            # read_file hands back the same string object for as long as a file is unchanged
+            if cached is not None and all(a is b for a, b in zip(cached[0], contents)):
+                return cached[1]
+        value = loader(*contents)
+        with self._lock:
+            self._derived[key] = (contents, value)
+        return value
+
+    def base_values(self) -> str:
+        """Base values.yaml content ('' when the chart has none)"""
+        content = self.read_file(self.values_path)
+        if content is None:
+            logger.warning("%s not found. Proceeding with user answers only.", self.values_path)
+            return ''
+        return content
+
+
+_default_chart: Optional[ChartContext] = None
+_default_chart_lock = threading.Lock()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _chart_root(directory: str) -> Optional[str]:
+    """Root of the chart extracted into directory (packaged charts nest it one level down)"""
+    for entry in os.scandir(directory):
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, CHART_MANIFEST)):
+            return entry.path
+    if os.path.exists(os.path.join(directory, CHART_MANIFEST)):
+        return directory
+    return None
+
+
+def default_chart() -> ChartContext:
+    """Chart context for the configured TEMPLATE_DIR (used when no chart is given)"""
+    global _default_chart
+    with _default_chart_lock:
+        if _default_chart is None:
+            _default_chart = ChartContext(os.path.basename(os.path.normpath(TEMPLATE_DIR)), TEMPLATE_DIR)
+        return _default_chart
+
+
+class ChartRegistry:
+    """Discovers charts (directories or packaged .tgz files) and caches their contexts"""
+
+    def __init__(self, charts_dir: str = CHARTS_DIR, cache_size: int = CHART_CACHE_SIZE,
+                 extract_dir: str = CHART_EXTRACT_DIR):
+        self.charts_dir = charts_dir
+        self.cache_size = cache_size
+        self.extract_dir = extract_dir
+        self._contexts: "OrderedDict[str, ChartContext]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def list_charts(self) -> List[str]:
+        """List identifiers of all charts in the charts directory"""
+        if not os.path.isdir(self.charts_dir):
+            return []
+        charts = set()
+        for entry in os.scandir(self.charts_dir):
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, CHART_MANIFEST)):
+                charts.add(entry.name)
+            elif entry.is_file() and entry.name.endswith(CHART_ARCHIVE_SUFFIX):
+                charts.add(entry.name[:-len(CHART_ARCHIVE_SUFFIX)])
+        return sorted(charts)
+
+    def get(self, chart_id: Optional[str] = None) -> ChartContext:
+        """Get the context for chart_id, loading it on first use (None means the default chart)"""
+        if not chart_id:
+            return default_chart()
+        if not _CHART_ID_PATTERN.match(chart_id):
+            raise ChartNotFoundError(chart_id)
+
+        with self._lock:
+            context = self._contexts.pop(chart_id, None)
+            if context is not None and self._is_current(chart_id, context):
+                self._contexts[chart_id] = context
+                return context
+
+            context = self._load(chart_id)
+            self._contexts[chart_id] = context
+            while len(self._contexts) > self.cache_size:
+                self._contexts.popitem(last=False)
+            return context
+
+    def _is_current(self, chart_id: str, context: ChartContext) -> bool:
+        """Whether a cached context still matches its archive (always true for chart directories)"""
+        if context.archive_signature is None:
+            return True
+        archive = os.path.join(self.charts_dir, chart_id) + CHART_ARCHIVE_SUFFIX
+        return _file_signature(archive) == context.archive_signature
+
+    def _load(self, chart_id: str) -> ChartContext:
+        """Resolve a chart identifier to a directory, extracting packaged charts"""
+        chart_dir = os.path.join(self.charts_dir, chart_id)
+        if os.path.exists(os.path.join(chart_dir, CHART_MANIFEST)):
+            if os.path.abspath(chart_dir) == os.path.abspath(TEMPLATE_DIR):
+                return default_chart()
+            return ChartContext(chart_id, chart_dir)
+
+        archive = chart_dir + CHART_ARCHIVE_SUFFIX
+        signature = _file_signature(archive) if os.path.isfile(archive) else None
+        if signature is not None:
+            context = ChartContext(chart_id, self._extract(chart_id, archive, signature))
+            context.archive_signature = signature
+            return context
+
+        raise ChartNotFoundError(chart_id)
+
+    def _extract(self, chart_id: str, archive: str, signature: Tuple[int, int]) -> str:
+        """
+        Extract a packaged chart once (again if the archive changes) and return its root.
+
+        Extraction holds a file lock so that uvicorn workers loading the same chart take turns,
+        and the one that waited reuses the extraction instead of swapping in its own.
+        """
+        target = os.path.join(self.extract_dir, chart_id)
+        marker = os.path.join(target, '.extracted')
+        stamp = f"{signature[0]}:{signature[1]}"
+        with FileLock(target + '.lock'):
+            current = None
+            if os.path.exists(marker):
+                with open(marker, 'r', encoding='utf-8') as f:
+                    current = f.read().strip()
+            if current != stamp:
+                self._swap_in(chart_id, archive, target, stamp)
+            root = _chart_root(target)
+        if root is None:
+            raise ChartNotFoundError(chart_id)
+        return root
+
+    def _swap_in(self, chart_id: str, archive: str, target: str, stamp: str) -> None:
+        """
+        Extract next to the target and swap it in, so files dropped from a new chart version
+        do not linger (and no reader sees a half-extracted chart). Called with the lock held.
+        """
+        staging = tempfile.mkdtemp(prefix=f".{chart_id}.", dir=self.extract_dir)
+        previous = None
+        try:
+            root = os.path.realpath(staging)
+            with tarfile.open(archive, 'r:gz') as tar:
+                members = []
+                for member in tar.getmembers():
+                    member_path = os.path.realpath(os.path.join(root, member.name))
+                    if not (member.isfile() or member.isdir()):
+                        continue
+                    if os.path.commonpath([root, member_path]) != root:
+                        raise ValueError(f"Unsafe path in chart archive {archive}: {member.name}")
+                    members.append(member)
+                tar.extractall(staging, members=members)
+            with open(os.path.join(staging, '.extracted'), 'w', encoding='utf-8') as f:
+                f.write(stamp)
+            if os.path.exists(target):
+                self._carry_over(target, staging)
+                previous = staging + '.old'
+                os.rename(target, previous)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+        logger.info("📦 Extracted chart archive %s to %s", archive, target)
+
+    @staticmethod
+    def _carry_over(old: str, new: str) -> None:
+        """Copy generated questions and the scan index from the previous extraction"""
+        old_root, new_root = _chart_root(old), _chart_root(new)
+        if old_root is None or new_root is None:
+            return
+        for name in _CARRIED_OVER_FILES:
+            source, destination = os.path.join(old_root, name), os.path.join(new_root, name)
+            if os.path.exists(source) and not os.path.exists(destination):
+                shutil.copy2(source, destination)
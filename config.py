@@ -1,12 +1,34 @@
 """Configuration settings for Helm Bot"""
 import os
 
+
+def _env_flag(name, default=False):
+    """Boolean setting from the environment: '1', 'true' or 'yes' (any case) enable it"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+
 # Directory paths
 TEMPLATE_DIR = 'sample_helm'
 TEMPLATES_SUBDIR = os.path.join(TEMPLATE_DIR, 'templates')
 
+# Chart registry settings
+# Directory containing chart directories and/or packaged .tgz charts
+CHARTS_DIR = os.environ.get('HELMBOT_CHARTS_DIR', os.path.dirname(TEMPLATE_DIR) or '.')
+CHART_CACHE_SIZE = 64
+CHART_EXTRACT_DIR = os.environ.get('HELMBOT_CHART_EXTRACT_DIR', os.path.join(CHARTS_DIR, '.helmbot_charts'))
+
+# Template scanning settings
+TEMPLATE_EXTENSIONS = ('.yaml', '.yml', '.tpl')
+TEMPLATE_SCAN_WORKERS = min(8, os.cpu_count() or 1)
+TEMPLATE_SCAN_EXECUTOR = 'thread'  # Options: 'thread', 'process'
+TEMPLATE_INDEX_FILE = '.helmbot_scan_index.json'
+
 # File names
-GENERATED_QUESTIONS_FILE = 'generated_questions.txt'
+GENERATED_QUESTIONS_FILE = 'generated_questions.json'
+QUESTIONS_META_FILE = 'generated_questions.meta.json'
 VALUES_FILE = 'values.yaml'
 GENERATED_VALUES_FILE = 'generated_values.yaml'
 
@@ -28,4 +50,120 @@ DEFAULT_TEMPERATURE = 0.7
 GPT4_TEMPERATURE = 0.3
 
 # Model provider configuration
-PROVIDER = 'anthropic'  # Options: 'openai', 'anthropic', 'bedrock'
+PROVIDER = os.environ.get('HELMBOT_PROVIDER', 'anthropic')  # Options: 'openai', 'anthropic', 'bedrock', 'fake'
+# Directory of mounted secret files (Docker/Kubernetes); API keys are also read from here
+SECRETS_DIR = os.environ.get('HELMBOT_SECRETS_DIR', '/run/secrets')
+
+# Offline 'fake' provider for benchmarks and CI: deterministic answers, no network or API key
+# Latency: 'fixed', 'uniform' (median ± spread) or 'lognormal' (spread is sigma)
+FAKE_LLM_LATENCY_MS = float(os.environ.get('HELMBOT_FAKE_LATENCY_MS', '200'))
+FAKE_LLM_LATENCY_DISTRIBUTION = os.environ.get('HELMBOT_FAKE_LATENCY_DISTRIBUTION', 'lognormal')
+FAKE_LLM_LATENCY_SPREAD = float(os.environ.get('HELMBOT_FAKE_LATENCY_SPREAD', '0.5'))
+# Fraction of calls that fail, and how: 'throttled' (429), 'transient' (502) or 'fatal' (400)
+FAKE_LLM_ERROR_RATE = float(os.environ.get('HELMBOT_FAKE_ERROR_RATE', '0'))
+FAKE_LLM_ERROR_KIND = os.environ.get('HELMBOT_FAKE_ERROR_KIND', 'throttled')
+FAKE_LLM_SEED = int(os.environ.get('HELMBOT_FAKE_SEED', '0'))
+
+# API concurrency settings
+# Maximum number of blocking LLM/file operations run concurrently per API worker
+API_MAX_CONCURRENCY = int(os.environ.get('HELMBOT_MAX_CONCURRENCY', '32'))
+
+# LLM client pool settings
+# Client instances kept per (provider, model, temperature)
+LLM_POOL_SIZE = int(os.environ.get('HELMBOT_LLM_POOL_SIZE', '4'))
+# Maximum concurrent model requests per (provider, model, temperature); extra callers queue
+LLM_MAX_IN_FLIGHT = int(os.environ.get('HELMBOT_LLM_MAX_IN_FLIGHT', '8'))
+# Keep-alive HTTP connections per client instance (0 keeps the SDK defaults)
+LLM_HTTP_POOL_SIZE = int(os.environ.get('HELMBOT_LLM_HTTP_POOL_SIZE', '10'))
+LLM_HTTP_KEEPALIVE_SECONDS = 30
+
+# Provider rate limits applied before each model call (0 disables that limit)
+# Match these to your account's tier; HELMBOT_LLM_RPM / HELMBOT_LLM_TPM override the active provider's entry
+LLM_RATE_LIMITS = {
+    'openai': {'requests_per_minute': 500, 'tokens_per_minute': 30000},
+    'anthropic': {'requests_per_minute': 50, 'tokens_per_minute': 40000},
+    'bedrock': {'requests_per_minute': 100, 'tokens_per_minute': 200000},
+    'fake': {'requests_per_minute': 0, 'tokens_per_minute': 0},
+}
+LLM_REQUESTS_PER_MINUTE_OVERRIDE = os.environ.get('HELMBOT_LLM_RPM')
+LLM_TOKENS_PER_MINUTE_OVERRIDE = os.environ.get('HELMBOT_LLM_TPM')
+# Retries for throttled (429/overloaded) and transient provider errors, with jittered exponential backoff
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE_SECONDS = 1.0
+LLM_BACKOFF_MAX_SECONDS = 30.0
+# Share of each rate limit that batch work leaves free for interactive requests
+LLM_BATCH_RESERVE_RATIO = 0.25
+
+# Provider failover settings
+# Providers tried after PROVIDER when it fails or is unhealthy, e.g. HELMBOT_FAILOVER_PROVIDERS=openai,bedrock
+FAILOVER_PROVIDERS = [name.strip().lower() for name in os.environ.get('HELMBOT_FAILOVER_PROVIDERS', '').split(',') if name.strip()]
+# Model used when a request fails over to each provider
+FAILOVER_MODELS = {
+    'openai': 'gpt-4.1',
+    'anthropic': 'claude-sonnet-4-20250514',
+    'bedrock': 'anthropic.claude-3-5-sonnet-20241022-v2:0',
+    'fake': 'fake-model',
+}
+# Consecutive failures before a provider is moved to the back of the chain, and for how long
+FAILOVER_FAILURE_THRESHOLD = 3
+FAILOVER_COOLDOWN_SECONDS = 30
+# Try healthy providers fastest-first by observed median latency instead of in configured order
+FAILOVER_ORDER_BY_LATENCY = True
+# Also send a call to the next provider when the first has not answered within its p95 latency
+HEDGE_REQUESTS_ENABLED = _env_flag('HELMBOT_HEDGE_REQUESTS')
+# Latency samples a provider needs before its p95 is used to hedge
+HEDGE_MIN_SAMPLES = 20
+
+# Response cache settings for generated values.yaml
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+# SQLite file for the persistent cache tier (None keeps the cache in memory only)
+RESPONSE_CACHE_DB = os.environ.get('HELMBOT_RESPONSE_CACHE_DB') or None
+# Apply answers that map to a known values.yaml path locally instead of asking the model
+DETERMINISTIC_MERGE_ENABLED = _env_flag('HELMBOT_DETERMINISTIC_MERGE', True)
+# Send the model only the values.yaml subtrees the answers touch
+PROMPT_SLIMMING_ENABLED = _env_flag('HELMBOT_PROMPT_SLIMMING', True)
+# Canonicalize answers ("three" -> 3, "Yes" -> true, "0.5Gi" -> 512Mi) before merging, caching and prompting.
+# Memory keeps its unit system: "512 MiB" -> 512Mi but "512 MB" -> 512M (decimal, as Kubernetes reads it)
+ANSWER_NORMALIZATION_ENABLED = _env_flag('HELMBOT_ANSWER_NORMALIZATION', True)
+# Fall back to the full values.yaml when the excerpt would be larger than this fraction of it
+PROMPT_SLIM_MAX_RATIO = 0.8
+# How many times the model may be asked to repair generated YAML that fails validation
+YAML_REPAIR_MAX_ATTEMPTS = 2
+# With the SQLite tier, how long a worker may hold the claim on an identical in-flight generation
+YAML_GENERATION_LEASE_SECONDS = 120
+
+# Generated output settings for the API
+# Generated YAML is returned in memory; set HELMBOT_PERSIST_OUTPUT=1 to also keep per-request copies
+PERSIST_GENERATED_FILES = _env_flag('HELMBOT_PERSIST_OUTPUT')
+GENERATED_OUTPUT_DIR = os.environ.get('HELMBOT_OUTPUT_DIR', os.path.join(TEMPLATE_DIR, 'generated'))
+GENERATED_FILE_TTL_SECONDS = 60 * 60
+# Batch generation: distinct QA sets generated at once per batch, and the most QA sets per batch
+BATCH_MAX_CONCURRENCY = int(os.environ.get('HELMBOT_BATCH_MAX_CONCURRENCY', '8'))
+BATCH_MAX_ITEMS = int(os.environ.get('HELMBOT_BATCH_MAX_ITEMS', '200'))
+# Where `helm-bot.py --batch` writes one values file per record plus batch_report.json
+BATCH_OUTPUT_DIR = os.environ.get('HELMBOT_BATCH_OUTPUT_DIR', 'generated_batch')
+
+# Question cache settings
+# Bump when the question prompt changes so cached questions are regenerated
+QUESTION_PROMPT_VERSION = 2
+# How often (seconds) a chart's templates are re-checked for changed .Values references
+QUESTIONS_CHECK_INTERVAL_SECONDS = 5
+# Pre-warming: generate missing or stale questions for every chart before the API reports ready
+PREWARM_ON_STARTUP = _env_flag('HELMBOT_PREWARM')
+# Charts checked (and generated) at once; model calls still wait for the provider rate limit
+PREWARM_WORKERS = int(os.environ.get('HELMBOT_PREWARM_WORKERS', '4'))
+# Serve /questions only from generated files: a chart without questions returns 503 instead of calling the model
+QUESTIONS_CACHE_ONLY = _env_flag('HELMBOT_QUESTIONS_CACHE_ONLY')
+
+# Report per-module import time when the API server starts (also `python -m api.server --profile-startup`)
+PROFILE_STARTUP = _env_flag('HELMBOT_PROFILE_STARTUP')
+
+# Logging settings
+# Level for HelmBot's own loggers; unset means INFO for the CLI and WARNING (quiet) for the API server
+LOG_LEVEL = os.environ.get('HELMBOT_LOG_LEVEL', '').strip().upper() or None
+# 'text' or 'json' (one object per line with request_id, span and duration fields)
+LOG_FORMAT = os.environ.get('HELMBOT_LOG_FORMAT', 'text').strip().lower()
+# API requests slower than this are logged as warnings with their per-stage span timings
+SLOW_REQUEST_SECONDS = float(os.environ.get('HELMBOT_SLOW_REQUEST_SECONDS', '10'))
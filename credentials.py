@@ -0,0 +1,57 @@
+"""Non-interactive credential resolution from the environment, files and secret mounts"""
+import os
+from typing import Optional
+
+from config import SECRETS_DIR
+
+
+class MissingCredentialsError(RuntimeError):
+    """Raised when a required credential cannot be found and prompting is not allowed"""
+
+    def __init__(self, provider: str, names):
+        names = list(names)
+        super().__init__(
+            f"{provider} credentials not found. Set {' / '.join(names)} in the environment, "
+            f"point {names[0]}_FILE at a file containing it, or mount it as {os.path.join(SECRETS_DIR, names[0])}"
+        )
+        self.provider = provider
+        self.names = names
+
+
+def _read_secret_file(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def resolve_secret(name: str) -> Optional[str]:
+    """
+    Look a credential up without prompting.
+
+    Checked in order: the NAME environment variable, a file named by NAME_FILE, and a
+    NAME (or lowercase name) file in SECRETS_DIR, the Docker/Kubernetes secret mount.
+    Blank values count as missing.
+    """
+    value = os.environ.get(name, '').strip()
+    if value:
+        return value
+    file_path = os.environ.get(f'{name}_FILE', '').strip()
+    if file_path:
+        value = _read_secret_file(file_path)
+        if value:
+            return value
+    for candidate in (name, name.lower()):
+        value = _read_secret_file(os.path.join(SECRETS_DIR, candidate))
+        if value:
+            return value
+    return None
+
+
+def load_secret(name: str) -> Optional[str]:
+    """Resolve a credential and export it so provider SDKs reading the environment find it"""
+    value = resolve_secret(name)
+    if value:
+        os.environ[name] = value
+    return value
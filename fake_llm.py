@@ -0,0 +1,147 @@
+"""Deterministic offline chat model for benchmarks and CI (no network, no API key)"""
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+ERROR_KINDS = {
+    # status code, Retry-After header
+    'throttled': (429, '1'),
+    'transient': (502, None),
+    'fatal': (400, None),
+}
+
+_VARIABLES_RE = re.compile(r'Given the following Helm chart variables: (.*)')
+_VALUES_RE = re.compile(r'Existing values\.yaml:\n(.*?)\n\s*Questions and Answers:', re.S)
+_REPAIR_RE = re.compile(r'without code fences, explanation or extra text\.\n\s*\n(.*)', re.S)
+
+
+class FakeMessage:
+    """Response or stream chunk with the .content attribute chat models return"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class _FakeHTTPResponse:
+    def __init__(self, status_code: int, headers: Dict[str, str]):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class FakeProviderError(Exception):
+    """Injected failure shaped like an SDK status error, so throttling and retries behave as in production"""
+
+    def __init__(self, kind: str):
+        status_code, retry_after = ERROR_KINDS[kind]
+        super().__init__(f"Fake provider injected a {kind} error ({status_code})")
+        self.kind = kind
+        self.status_code = status_code
+        self.response = _FakeHTTPResponse(status_code, {'retry-after': retry_after} if retry_after else {})
+
+
+class LatencyModel:
+    """Samples call latencies around a median: fixed, uniform (median ± spread) or lognormal (sigma = spread)"""
+
+    def __init__(self, median_ms: float = 200.0, distribution: str = 'lognormal', spread: float = 0.5,
+                 seed: Optional[int] = 0):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}. Options: {list(LATENCY_DISTRIBUTIONS)}")
+        self.median = max(0.0, median_ms) / 1000
+        self.distribution = distribution
+        self.spread = max(0.0, spread)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.distribution == 'fixed':
+                return self.median
+            if self.distribution == 'uniform':
+                return max(0.0, self.median * self._random.uniform(1 - self.spread, 1 + self.spread))
+            return self.median * math.exp(self._random.gauss(0.0, self.spread))
+
+    def chance(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+
+def fake_completion(prompt: str) -> str:
+    """
+    Answer HelmBot's own prompts with well-formed output: one question per chart
+    variable, the existing values.yaml for a merge, and the output itself for a repair
+    """
+    match = _VARIABLES_RE.search(prompt)
+    if match:
+        return json.dumps([
+            {"question": f"What should {path} be set to?", "help": f"Sets {path}", "paths": [path]}
+            for path in (name.strip() for name in match.group(1).split(',')) if path
+        ], indent=2)
+    match = _REPAIR_RE.search(prompt)
+    if match:
+        return match.group(1).strip()
+    match = _VALUES_RE.search(prompt)
+    if match:
+        return match.group(1).strip() + "\n"
+    return "OK"
+
+
+def _chunks(text: str, size: int = 16) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class FakeChatModel:
+    """
+    Chat model with invoke, ainvoke and astream that sleeps for a sampled latency and
+    can fail a fraction of calls, instead of calling a provider
+    """
+
+    def __init__(self, model_name: str = 'fake', latency: Optional[LatencyModel] = None,
+                 error_rate: float = 0.0, error_kind: str = 'throttled'):
+        if error_kind not in ERROR_KINDS:
+            raise ValueError(f"Unknown error kind: {error_kind}. Options: {list(ERROR_KINDS)}")
+        self.model_name = model_name
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _start_call(self) -> Tuple[float, bool]:
+        """Count the call and return its sampled latency and whether it fails"""
+        fail = self.error_rate > 0 and self.latency.chance() < self.error_rate
+        with self._lock:
+            self.calls += 1
+            self.errors += int(fail)
+        return self.latency.sample(), fail
+
+    def invoke(self, prompt: Any, **kwargs) -> FakeMessage:
+        delay, fail = self._start_call()
+        time.sleep(delay)
+        if fail:
+            raise FakeProviderError(self.error_kind)
+        return FakeMessage(fake_completion(str(prompt)))
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> FakeMessage:
+        delay, fail = self._start_call()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeProviderError(self.error_kind)
+        return FakeMessage(fake_completion(str(prompt)))
+
+    async def astream(self, prompt: Any, **kwargs) -> AsyncIterator[FakeMessage]:
+        """First chunk after a third of the latency, the rest spread over the remainder"""
+        delay, fail = self._start_call()
+        await asyncio.sleep(delay / 3)
+        if fail:
+            raise FakeProviderError(self.error_kind)
+        chunks = _chunks(fake_completion(str(prompt)))
+        for chunk in chunks:
+            yield FakeMessage(chunk)
+            await asyncio.sleep(delay * 2 / 3 / len(chunks))
@@ -2,28 +2,139 @@
 Helm Bot - Main application entry point
 Dependencies: pip install langchain langchain_community openai
 """
+import argparse
+import json
 import os
-from config import TEMPLATE_DIR, GENERATED_QUESTIONS_FILE
-from helm_parser import HelmTemplateParser
-from llm_manager import LLMManager
-from question_manager import QuestionManager
-from yaml_generator import YAMLGenerator
+import sys
+from startup_profiler import ImportProfiler
 
-def main():
+
+def parse_args(argv=None):
+    from config import BATCH_MAX_CONCURRENCY, BATCH_OUTPUT_DIR, PREWARM_WORKERS
+    parser = argparse.ArgumentParser(description="Generate a Helm values.yaml by answering questions")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="report per-module import time once startup completes")
+    parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'), type=str.upper,
+                        help="progress output level (default: HELMBOT_LOG_LEVEL or INFO); DEBUG adds stage timings")
+    parser.add_argument('--log-format', choices=('text', 'json'),
+                        help="'json' writes one structured object per line (default: HELMBOT_LOG_FORMAT or text)")
+    batch = parser.add_argument_group("batch mode", "generate values files from answer sets without prompting")
+    batch.add_argument('--batch', metavar='FILE',
+                       help="JSON or JSONL file of answer sets ({\"id\", \"chart\", \"qa_pairs\"}); '-' reads stdin")
+    batch.add_argument('--output-dir', default=BATCH_OUTPUT_DIR,
+                       help=f"directory for <id>.yaml files (default: {BATCH_OUTPUT_DIR})")
+    batch.add_argument('--workers', type=int, default=BATCH_MAX_CONCURRENCY,
+                       help=f"answer sets generated at once (default: {BATCH_MAX_CONCURRENCY})")
+    batch.add_argument('--report', metavar='FILE',
+                       help="summary report path (default: <output-dir>/batch_report.json)")
+    batch.add_argument('--no-cache', action='store_true', help="always call the model")
+    prewarm = parser.add_argument_group("pre-warm", "generate missing or stale questions ahead of deployment")
+    prewarm.add_argument('--prewarm', nargs='*', metavar='CHART',
+                         help="check the given charts (default: every chart) and regenerate stale questions")
+    prewarm.add_argument('--prewarm-workers', type=int, default=PREWARM_WORKERS,
+                         help=f"charts checked at once (default: {PREWARM_WORKERS})")
+    return parser.parse_args(argv)
+
+
+def run_batch(args):
+    """Generate one values file per answer set; returns the process exit code"""
+    from batch_runner import load_batch_items, run_to_directory
+    from chart_registry import ChartRegistry
+    from helm_parser import HelmTemplateParser
+    from llm_manager import LLMManager
+    from llm_metrics import metrics
+    from yaml_generator import YAMLGenerator
+
+    if args.batch == '-':
+        items = load_batch_items(sys.stdin.read())
+    else:
+        with open(args.batch, 'r', encoding='utf-8') as f:
+            items = load_batch_items(f.read())
+    print(f"📦 Loaded {len(items)} answer sets")
+
+    registry = ChartRegistry()
+    yaml_generator = YAMLGenerator(LLMManager(interactive=False), helm_parser=HelmTemplateParser())
+
+    def generate(qa_pairs, chart_id, use_cache):
+        return yaml_generator.generate_values_yaml_with_source(qa_pairs, use_cache=use_cache,
+                                                               chart=registry.get(chart_id))
+
+    report = run_to_directory(items, generate, args.output_dir, workers=args.workers, use_cache=not args.no_cache)
+    report['llm'] = metrics.summary()
+    report_path = args.report or os.path.join(args.output_dir, 'batch_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    latency = report['latency_seconds']
+    print(f"\n📊 {report['succeeded']}/{report['total']} succeeded in {report['seconds']:.1f}s "
+          f"(p50 {latency['p50']}s, p95 {latency['p95']}s); sources: {report['sources']}")
+    usage = metrics.summary_text()
+    if usage:
+        print(usage)
+    print(f"💾 Report saved to {report_path}")
+    return 1 if report['failed'] else 0
+
+
+def run_prewarm(args):
+    """Bring every chart's questions up to date; returns the process exit code"""
+    from chart_registry import ChartRegistry
+    from helm_parser import HelmTemplateParser
+    from llm_manager import LLMManager
+    from llm_metrics import metrics
+    from prewarm import QuestionPrewarmer
+    from question_manager import QuestionManager
+
+    question_manager = QuestionManager(LLMManager(interactive=False), HelmTemplateParser())
+    prewarmer = QuestionPrewarmer(question_manager, workers=args.prewarm_workers)
+    report = prewarmer.run(ChartRegistry(), args.prewarm or None)
+
+    print(f"\n📊 {report['total']} charts in {report['seconds']:.1f}s: {report['generated']} generated, "
+          f"{report['current']} already current, {report['failed']} failed")
+    usage = metrics.summary_text()
+    if usage:
+        print(usage)
+    return 1 if report['failed'] else 0
+
+
+def main(argv=None):
     """Main application flow"""
+    argv = sys.argv[1:] if argv is None else argv
+    # Sniffed before parsing, so config and logging setup are part of the profile
+    profiler = ImportProfiler().start() if '--profile-startup' in argv else None
+    args = parse_args(argv)
+    from structured_logging import configure_logging
+    configure_logging('cli', level=args.log_level, fmt=args.log_format)
+    if args.batch or args.prewarm is not None:
+        if profiler:
+            profiler.stop()
+        return run_batch(args) if args.batch else run_prewarm(args)
+
+    # Imported here so --profile-startup can time them; LangChain and the provider
+    # SDKs load only when a model is actually called
+    from helm_parser import HelmTemplateParser
+    from llm_manager import LLMManager
+    from llm_metrics import metrics
+    from question_manager import QuestionManager
+    from yaml_generator import YAMLGenerator
+
     # Initialize components
     parser = HelmTemplateParser()
     llm_manager = LLMManager()
     question_manager = QuestionManager(llm_manager, parser)
-    yaml_generator = YAMLGenerator(llm_manager)
+    yaml_generator = YAMLGenerator(llm_manager, helm_parser=parser)
     
     # Ensure questions exist (will generate if missing)
     gen_q_path = question_manager.ensure_questions_exist()
+    if profiler:
+        print(profiler.stop().report())
     
     # Collect answers and generate YAML
     answers = question_manager.collect_answers(gen_q_path)
     if answers:
         yaml_generator.generate_values_yaml_gpt4(answers)
+    usage = metrics.summary_text()
+    if usage:
+        print(f"\n{usage}")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,37 +1,47 @@
 """Helm template file parser for extracting variables"""
-import os
-import re
-from config import TEMPLATES_SUBDIR
+from chart_registry import default_chart
+from structured_logging import get_logger, span
+from template_analyzer import TemplateAnalyzer
+from template_index import TemplateScanIndex, discover_template_files
+
+logger = get_logger(__name__)
 
 
 class HelmTemplateParser:
-    def __init__(self):
-        self.pattern = re.compile(r'\{\{\s*\.Values\.([a-zA-Z0-9_]+)')
-    
-    def list_template_files(self):
-        """List all template files in the templates directory"""
-        files = [f for f in os.listdir(TEMPLATES_SUBDIR) if f.endswith(('.yaml', '.tpl'))]
-        print(f'📁 Found {len(files)} template files:')
-        for file in files:
-            print(f'   - {file}')
-        print("\n" + "="*50)
+    def list_template_files(self, chart=None):
+        """List template files of the chart and its subcharts, relative to the chart root"""
+        chart = chart or default_chart()
+        files = discover_template_files(chart.root_dir)
+        logger.info('📁 Found %d template files in chart %s', len(files), chart.name)
+        logger.debug('Template files: %s', files)
         return files
     
-    def extract_variables(self, files):
-        """Extract Helm variables from template files"""
-        variables = set()
-        print("🔍 Scanning template files for variables...")
-        for fname in files:
-            file_path = os.path.join(TEMPLATES_SUBDIR, fname)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    found = self.pattern.findall(content)
-                    if found:
-                        print(f'   📄 {fname}: {found}')
-                    variables.update(found)
-            except Exception as e:
-                print(f'   ❌ Error reading {fname}: {e}')
-        print(f'\n✅ Total unique variables found: {len(variables)}')
-        print(f'📋 Variables needed: {sorted(list(variables))}')
+    def get_scan_index(self, chart=None):
+        """Per-chart scan index (kept in memory and persisted next to the chart)"""
+        chart = chart or default_chart()
+        return chart.memo('scan_index', lambda: TemplateScanIndex(chart.root_dir))
+    
+    def analyze_templates(self, files=None, chart=None):
+        """Analyze template files and return the full set of .Values paths they read"""
+        index = self.get_scan_index(chart)
+        with span('scan_templates', logger):
+            analyzer = TemplateAnalyzer()
+            for rel_path, parsed, prefix in index.scan(files):
+                analyzer.add_parsed(rel_path, parsed, prefix)
+        logger.debug('🔍 Scanned template files: %s', index.last_stats)
+        return analyzer.analyze()
+    
+    def extract_variables(self, files=None, chart=None):
+        """Extract Helm variables (dotted .Values paths) from template files"""
+        variables = self.analyze_templates(files, chart).variables
+        logger.info('✅ Total unique variables found: %d', len(variables))
+        logger.debug('📋 Variables needed: %s', sorted(variables))
         return variables
+    
+    def extract_value_tree(self, files=None, chart=None):
+        """Nested dict of every .Values path the templates read"""
+        return self.analyze_templates(files, chart).value_tree()
+    
+    def get_variables(self, chart=None):
+        """Get the chart's current variables (unchanged templates are served from the scan index)"""
+        return self.analyze_templates(chart=chart).variables
@@ -0,0 +1,301 @@
+"""Ordered provider failover with health tracking and hedged requests"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Dict, List, Optional
+
+from llm_scheduler import classify_error
+
+# Upper bounds (seconds) of the latency buckets, 50 ms to about 110 s
+_BUCKETS = [round(0.05 * 1.5 ** i, 3) for i in range(20)]
+# Counts are halved past this many samples so the histogram follows recent latency
+_DECAY_AFTER = 500
+
+
+class LatencyHistogram:
+    """Bucketed latency distribution with decay toward recent samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0.0] * (len(_BUCKETS) + 1)
+        self._total = 0.0
+        self._max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            index = next((i for i, bound in enumerate(_BUCKETS) if seconds <= bound), len(_BUCKETS))
+            self._counts[index] += 1
+            self._total += 1
+            self._max = max(self._max, seconds)
+            if self._total > _DECAY_AFTER:
+                self._counts = [count / 2 for count in self._counts]
+                self._total /= 2
+
+    @property
+    def count(self) -> float:
+        with self._lock:
+            return self._total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (None without samples)"""
+        with self._lock:
+            if not self._total:
+                return None
+            target, seen = q * self._total, 0.0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= target and count:
+                    return _BUCKETS[index] if index < len(_BUCKETS) else self._max
+            return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {f"le_{bound}": round(count, 1) for bound, count in zip(_BUCKETS, self._counts) if count}
+            if self._counts[-1]:
+                buckets["le_inf"] = round(self._counts[-1], 1)
+        return {"samples": round(self.count, 1), "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+                "buckets": buckets}
+
+
+class ProviderHealth:
+    """Latency and failure tracking for one provider; repeated failures take it out of rotation"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latency = LatencyHistogram()
+        self._lock = threading.Lock()
+        self._successes = 0
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._unhealthy_until = 0.0
+        self._last_error: Optional[str] = None
+
+    def record_success(self, seconds: float) -> None:
+        self.latency.observe(seconds)
+        with self._lock:
+            self._successes += 1
+            self._consecutive_failures = 0
+            self._unhealthy_until = 0.0
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"[:200]
+            if self._consecutive_failures >= self.failure_threshold:
+                self._unhealthy_until = time.monotonic() + self.cooldown_seconds
+
+    @property
+    def healthy(self) -> bool:
+        with self._lock:
+            return time.monotonic() >= self._unhealthy_until
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "successes": self._successes,
+                "failures": self._failures,
+                "consecutive_failures": self._consecutive_failures,
+                "unhealthy_for_seconds": round(max(0.0, self._unhealthy_until - time.monotonic()), 3),
+                "last_error": self._last_error,
+            }
+        stats["healthy"] = stats["unhealthy_for_seconds"] == 0
+        stats["latency"] = self.latency.snapshot()
+        return stats
+
+
+class FailoverMember:
+    """One provider's LLM within a failover chain"""
+
+    def __init__(self, name: str, llm: Any, health: ProviderHealth):
+        self.name = name
+        self.llm = llm
+        self.health = health
+
+
+def fails_over(error: BaseException) -> bool:
+    """Whether another provider could answer where this one failed (throttled, timed out or 5xx)"""
+    return classify_error(error) is not None
+
+
+class FailoverLLM:
+    """
+    Sends each call to the best available provider and falls back down the chain when it is
+    throttled, times out or fails with a 5xx. Any other error (a bad request, bad credentials)
+    is raised at once, as the next provider would not do better, and does not count against
+    the provider's health.
+
+    Healthy providers come first, fastest median latency first when order_by_latency is set
+    (configured order otherwise, and for ties). With hedging, a call that has not answered
+    within its provider's p95 latency is also sent to the next provider and the first
+    successful answer wins; async losers are cancelled, threaded ones finish in the background.
+    Streams fail over only before their first chunk and are never hedged.
+    """
+
+    def __init__(self, members: List[FailoverMember], executor: Optional[Executor] = None,
+                 hedge: bool = False, hedge_min_samples: int = 20, order_by_latency: bool = True):
+        self.members = members
+        self._executor = executor
+        self.hedge = hedge and executor is not None
+        self.hedge_min_samples = hedge_min_samples
+        self.order_by_latency = order_by_latency
+        self._lock = threading.Lock()
+        self._counters = {"failovers": 0, "hedges": 0, "hedge_wins": 0}
+
+    def ranked(self) -> List[FailoverMember]:
+        """Chain members in the order they should be tried"""
+        def key(indexed):
+            index, member = indexed
+            median = member.health.latency.quantile(0.5) if self.order_by_latency else None
+            return (not member.health.healthy, median if median is not None else float('inf'), index)
+        return [member for _, member in sorted(enumerate(self.members), key=key)]
+
+    def _hedge_delay(self, member: FailoverMember) -> Optional[float]:
+        if not self.hedge or member.health.latency.count < self.hedge_min_samples:
+            return None
+        return member.health.latency.quantile(0.95)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _submit(self, member: FailoverMember, prompt: Any, kwargs: Dict[str, Any]):
+        """Run a call on the hedge executor with a copy of the caller's context (e.g. LLM priority)"""
+        return self._executor.submit(contextvars.copy_context().run, self._call, member, prompt, kwargs)
+
+    def _call(self, member: FailoverMember, prompt: Any, kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = member.llm.invoke(prompt, **kwargs)
+        except Exception as e:
+            if fails_over(e):
+                member.health.record_failure(e)
+            raise
+        member.health.record_success(time.perf_counter() - start)
+        return result
+
+    async def _acall(self, member: FailoverMember, prompt: Any, kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await member.llm.ainvoke(prompt, **kwargs)
+        except Exception as e:
+            if fails_over(e):
+                member.health.record_failure(e)
+            raise
+        member.health.record_success(time.perf_counter() - start)
+        return result
+
+    def invoke(self, prompt: Any, **kwargs) -> Any:
+        ranked = self.ranked()
+        if self._hedge_delay(ranked[0]) is None or len(ranked) == 1:
+            return self._invoke_in_order(ranked, prompt, kwargs)
+
+        running: Dict[Any, FailoverMember] = {}
+        hedged = set()
+        errors: List[Exception] = []
+        launched = 0
+        while True:
+            if not running:
+                if launched == len(ranked):
+                    raise errors[-1]
+                if launched:
+                    self._count("failovers")
+                running[self._submit(ranked[launched], prompt, kwargs)] = ranked[launched]
+                launched += 1
+            delay = self._hedge_delay(ranked[launched - 1]) if launched < len(ranked) else None
+            done, _ = wait(running, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                self._count("hedges")
+                hedged.add(launched)
+                running[self._submit(ranked[launched], prompt, kwargs)] = ranked[launched]
+                launched += 1
+                continue
+            for future in done:
+                member = running.pop(future)
+                if future.exception() is None:
+                    if ranked.index(member) in hedged:
+                        self._count("hedge_wins")
+                    return future.result()
+                if not fails_over(future.exception()):
+                    raise future.exception()
+                errors.append(future.exception())
+
+    def _invoke_in_order(self, ranked: List[FailoverMember], prompt: Any, kwargs: Dict[str, Any]) -> Any:
+        for index, member in enumerate(ranked):
+            try:
+                return self._call(member, prompt, kwargs)
+            except Exception as e:
+                if index == len(ranked) - 1 or not fails_over(e):
+                    raise
+                self._count("failovers")
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> Any:
+        ranked = self.ranked()
+        running: Dict[asyncio.Future, FailoverMember] = {}
+        hedged = set()
+        errors: List[BaseException] = []
+        launched = 0
+        try:
+            while True:
+                if not running:
+                    if launched == len(ranked):
+                        raise errors[-1]
+                    if launched:
+                        self._count("failovers")
+                    running[asyncio.ensure_future(self._acall(ranked[launched], prompt, kwargs))] = ranked[launched]
+                    launched += 1
+                delay = self._hedge_delay(ranked[launched - 1]) if launched < len(ranked) else None
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._count("hedges")
+                    hedged.add(launched)
+                    running[asyncio.ensure_future(self._acall(ranked[launched], prompt, kwargs))] = ranked[launched]
+                    launched += 1
+                    continue
+                for task in done:
+                    member = running.pop(task)
+                    if task.exception() is None:
+                        if ranked.index(member) in hedged:
+                            self._count("hedge_wins")
+                        return task.result()
+                    if not fails_over(task.exception()):
+                        raise task.exception()
+                    errors.append(task.exception())
+        finally:
+            # Hedged losers are cancelled so they stop holding provider capacity
+            for task in running:
+                task.cancel()
+
+    async def astream(self, prompt: Any, **kwargs):
+        ranked = self.ranked()
+        for index, member in enumerate(ranked):
+            start, started = time.perf_counter(), False
+            try:
+                async for chunk in member.llm.astream(prompt, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if not fails_over(e):
+                    raise
+                member.health.record_failure(e)
+                if started or index == len(ranked) - 1:
+                    raise
+                self._count("failovers")
+                continue
+            member.health.record_success(time.perf_counter() - start)
+            return
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.members[0].llm, name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        stats["order"] = [member.name for member in self.ranked()]
+        return stats
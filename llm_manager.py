@@ -1,8 +1,26 @@
 """LLM manager for handling multiple AI providers (OpenAI, Anthropic, AWS Bedrock) with LangChain"""
 import os
+import sys
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any
-from config import DEFAULT_MODEL, GPT4_MODEL, DEFAULT_TEMPERATURE, GPT4_TEMPERATURE, PROVIDER
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from config import (
+    DEFAULT_MODEL, GPT4_MODEL, DEFAULT_TEMPERATURE, GPT4_TEMPERATURE, PROVIDER,
+    LLM_POOL_SIZE, LLM_MAX_IN_FLIGHT, LLM_HTTP_POOL_SIZE, LLM_HTTP_KEEPALIVE_SECONDS,
+    LLM_RATE_LIMITS, LLM_REQUESTS_PER_MINUTE_OVERRIDE, LLM_TOKENS_PER_MINUTE_OVERRIDE,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, LLM_BATCH_RESERVE_RATIO,
+    FAILOVER_PROVIDERS, FAILOVER_MODELS, FAILOVER_FAILURE_THRESHOLD, FAILOVER_COOLDOWN_SECONDS,
+    FAILOVER_ORDER_BY_LATENCY, HEDGE_REQUESTS_ENABLED, HEDGE_MIN_SAMPLES,
+    FAKE_LLM_LATENCY_MS, FAKE_LLM_LATENCY_DISTRIBUTION, FAKE_LLM_LATENCY_SPREAD,
+    FAKE_LLM_ERROR_RATE, FAKE_LLM_ERROR_KIND, FAKE_LLM_SEED
+)
+from credentials import MissingCredentialsError, load_secret
+from llm_failover import FailoverLLM, FailoverMember, ProviderHealth
+from llm_metrics import InstrumentedLLM
+from llm_pool import LLMClientPool, http_limits
+from llm_scheduler import RateLimitScheduler
+from structured_logging import get_logger
 
 # Import Bedrock region if it's configured
 try:
@@ -10,13 +28,18 @@ try:
 except ImportError:
     BEDROCK_REGION = 'us-east-1'  # Default region
 
+logger = get_logger(__name__)
+
 
 class ModelProvider(ABC):
     """Abstract base class for AI model providers"""
     
     @abstractmethod
-    def setup_api_key(self) -> None:
-        """Setup API key for the provider"""
+    def setup_api_key(self, interactive: bool = True) -> None:
+        """
+        Setup API key for the provider from the environment, a *_FILE path or the secrets
+        directory; prompt for it only when interactive, otherwise raise MissingCredentialsError
+        """
         pass
     
     @abstractmethod
@@ -33,22 +56,40 @@ class ModelProvider(ABC):
 class OpenAIProvider(ModelProvider):
     """OpenAI model provider implementation"""
     
-    def setup_api_key(self) -> None:
+    def setup_api_key(self, interactive: bool = True) -> None:
         """Setup OpenAI API key"""
-        if "OPENAI_API_KEY" not in os.environ or not os.environ["OPENAI_API_KEY"].strip() == "":
+        if not load_secret("OPENAI_API_KEY"):
+            if not interactive:
+                raise MissingCredentialsError(self.get_provider_name(), ["OPENAI_API_KEY"])
             print("🔑 OpenAI API key not found in environment variables.")
             api_key = input("Please enter your OpenAI API key: ").strip()
             if not api_key:
                 raise ValueError("OpenAI API key cannot be empty!")
             os.environ['OPENAI_API_KEY'] = api_key
-            print("✅ OpenAI API key is set successfully!")
+            logger.info("✅ OpenAI API key is set successfully!")
         else:
-            print("✅ OpenAI API key is already set.")
+            logger.info("✅ OpenAI API key is already set.")
     
     def create_llm(self, model_name: str, temperature: float) -> Any:
         """Create OpenAI LLM instance"""
         from langchain_community.chat_models import ChatOpenAI
-        return ChatOpenAI(model=model_name, temperature=temperature)
+        # Retries are left to the rate-limit scheduler so throttled calls are not retried twice
+        llm = ChatOpenAI(model=model_name, temperature=temperature, max_retries=0)
+        limits = http_limits(LLM_HTTP_POOL_SIZE, LLM_HTTP_KEEPALIVE_SECONDS)
+        if limits is not None:
+            # ChatOpenAI hands one http_client to both SDK clients, so build each with its own keep-alive pool
+            import httpx
+            import openai
+            params = {
+                "api_key": llm.openai_api_key,
+                "organization": llm.openai_organization,
+                "base_url": llm.openai_api_base,
+                "timeout": llm.request_timeout,
+                "max_retries": llm.max_retries,
+            }
+            llm.client = openai.OpenAI(http_client=httpx.Client(limits=limits), **params).chat.completions
+            llm.async_client = openai.AsyncOpenAI(http_client=httpx.AsyncClient(limits=limits), **params).chat.completions
+        return llm
     
     def get_provider_name(self) -> str:
         return "OpenAI"
@@ -57,23 +98,35 @@ class OpenAIProvider(ModelProvider):
 class AnthropicProvider(ModelProvider):
     """Anthropic model provider implementation"""
     
-    def setup_api_key(self) -> None:
+    def setup_api_key(self, interactive: bool = True) -> None:
         """Setup Anthropic API key"""
-        if "ANTHROPIC_API_KEY" not in os.environ or not os.environ["ANTHROPIC_API_KEY"].strip() == "":
+        if not load_secret("ANTHROPIC_API_KEY"):
+            if not interactive:
+                raise MissingCredentialsError(self.get_provider_name(), ["ANTHROPIC_API_KEY"])
             print("🔑 Anthropic API key not found in environment variables.")
             print("💡 You can get your API key from: https://console.anthropic.com/")
             api_key = input("Please enter your Anthropic API key: ").strip()
             if not api_key:
                 raise ValueError("Anthropic API key cannot be empty!")
             os.environ['ANTHROPIC_API_KEY'] = api_key
-            print("✅ Anthropic API key is set successfully!")
+            logger.info("✅ Anthropic API key is set successfully!")
         else:
-            print("✅ Anthropic API key is already set.")
+            logger.info("✅ Anthropic API key is already set.")
     
     def create_llm(self, model_name: str, temperature: float) -> Any:
         """Create Anthropic LLM instance"""
         from langchain_anthropic import ChatAnthropic
-        return ChatAnthropic(model=model_name, temperature=temperature)
+        # Retries are left to the rate-limit scheduler so throttled calls are not retried twice
+        llm = ChatAnthropic(model=model_name, temperature=temperature, max_retries=0)
+        limits = http_limits(LLM_HTTP_POOL_SIZE, LLM_HTTP_KEEPALIVE_SECONDS)
+        if limits is not None:
+            # ChatAnthropic builds its SDK clients lazily (cached properties); seed them with sized pools
+            import anthropic
+            import httpx
+            params = llm._client_params
+            llm.__dict__['_client'] = anthropic.Client(http_client=httpx.Client(limits=limits), **params)
+            llm.__dict__['_async_client'] = anthropic.AsyncClient(http_client=httpx.AsyncClient(limits=limits), **params)
+        return llm
     
     def get_provider_name(self) -> str:
         return "Anthropic"
@@ -82,14 +135,20 @@ class AnthropicProvider(ModelProvider):
 class BedrockProvider(ModelProvider):
     """AWS Bedrock model provider implementation"""
     
-    def setup_api_key(self) -> None:
+    def setup_api_key(self, interactive: bool = True) -> None:
         """Setup AWS credentials for Bedrock"""
         # Check for AWS credentials
-        aws_access_key = os.environ.get('AWS_ACCESS_KEY_ID', '').strip()
-        aws_secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY', '').strip()
+        aws_access_key = load_secret('AWS_ACCESS_KEY_ID') or ''
+        aws_secret_key = load_secret('AWS_SECRET_ACCESS_KEY') or ''
+        load_secret('AWS_SESSION_TOKEN')
         aws_region = os.environ.get('AWS_DEFAULT_REGION', BEDROCK_REGION).strip()
         
-        if not aws_access_key or not aws_secret_key:
+        if (not aws_access_key or not aws_secret_key) and not interactive:
+            # Instance profiles, IRSA and shared config files need no keys in the environment
+            if not self._has_default_credentials():
+                raise MissingCredentialsError(self.get_provider_name(), ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"])
+            logger.info("✅ Using AWS credentials from the default credential chain.")
+        elif not aws_access_key or not aws_secret_key:
             print("🔑 AWS credentials not found in environment variables.")
             print("💡 You need AWS Access Key ID and Secret Access Key to use Bedrock.")
             print("💡 You can get these from: https://console.aws.amazon.com/iam/")
@@ -111,22 +170,37 @@ class BedrockProvider(ModelProvider):
                 aws_region = region_input if region_input else BEDROCK_REGION
                 os.environ['AWS_DEFAULT_REGION'] = aws_region
             
-            print("✅ AWS credentials are set successfully!")
+            logger.info("✅ AWS credentials are set successfully!")
         else:
-            print("✅ AWS credentials are already set.")
+            logger.info("✅ AWS credentials are already set.")
             
         # Set the region for Bedrock
         if not os.environ.get('AWS_DEFAULT_REGION'):
             os.environ['AWS_DEFAULT_REGION'] = aws_region or BEDROCK_REGION
     
+    @staticmethod
+    def _has_default_credentials() -> bool:
+        """Whether boto3's default credential chain finds credentials"""
+        try:
+            import boto3
+        except ImportError:
+            return False
+        return boto3.Session().get_credentials() is not None
+    
     def create_llm(self, model_name: str, temperature: float) -> Any:
         """Create AWS Bedrock LLM instance"""
         try:
             from langchain_aws import ChatBedrock
+            from botocore.config import Config
+            # Retries are left to the rate-limit scheduler so throttled calls are not retried twice
+            config = {"retries": {"total_max_attempts": 1}}
+            if LLM_HTTP_POOL_SIZE > 0:
+                config.update(max_pool_connections=LLM_HTTP_POOL_SIZE, tcp_keepalive=True)
             return ChatBedrock(
                 model_id=model_name,
                 model_kwargs={"temperature": temperature},
-                region_name=os.environ.get('AWS_DEFAULT_REGION', BEDROCK_REGION)
+                region_name=os.environ.get('AWS_DEFAULT_REGION', BEDROCK_REGION),
+                config=Config(**config)
             )
         except ImportError:
             raise ImportError("langchain-aws package is required for Bedrock support. "
@@ -136,13 +210,36 @@ class BedrockProvider(ModelProvider):
         return "AWS Bedrock"
 
 
+class FakeProvider(ModelProvider):
+    """Offline provider with deterministic answers and configurable latency and errors (benchmarks, CI)"""
+    
+    def __init__(self):
+        from fake_llm import LatencyModel
+        # One latency stream per provider, so a seeded run is reproducible across its clients
+        self.latency = LatencyModel(FAKE_LLM_LATENCY_MS, FAKE_LLM_LATENCY_DISTRIBUTION,
+                                    FAKE_LLM_LATENCY_SPREAD, FAKE_LLM_SEED)
+    
+    def setup_api_key(self, interactive: bool = True) -> None:
+        """The fake provider needs no credentials"""
+        logger.info("🧪 Using the offline fake provider; no API key needed.")
+    
+    def create_llm(self, model_name: str, temperature: float) -> Any:
+        """Create a fake chat model sharing the provider's latency stream"""
+        from fake_llm import FakeChatModel
+        return FakeChatModel(model_name, self.latency, FAKE_LLM_ERROR_RATE, FAKE_LLM_ERROR_KIND)
+    
+    def get_provider_name(self) -> str:
+        return "Fake"
+
+
 class ModelProviderFactory:
     """Factory class for creating model providers"""
     
     _providers = {
         'openai': OpenAIProvider,
         'anthropic': AnthropicProvider,
-        'bedrock': BedrockProvider
+        'bedrock': BedrockProvider,
+        'fake': FakeProvider
     }
     
     @classmethod
@@ -163,22 +260,98 @@ class ModelProviderFactory:
 class LLMManager:
     """Unified LLM manager that works with multiple AI providers"""
     
-    def __init__(self):
+    def __init__(self, interactive: Optional[bool] = None):
+        """
+        Args:
+            interactive: Prompt for missing credentials (defaults to whether stdin is a terminal);
+                when False, missing credentials raise MissingCredentialsError instead of blocking
+        """
+        if interactive is None:
+            interactive = sys.stdin is not None and sys.stdin.isatty()
         self.provider = ModelProviderFactory.create_provider(PROVIDER)
-        self.provider.setup_api_key()
-        self._llm_cache: Dict[str, Any] = {}
-        print(f"✅ LLM Manager initialized with {self.provider.get_provider_name()} provider!")
+        self.provider.setup_api_key(interactive=interactive)
+        self._primary = PROVIDER.lower()
+        # Ordered provider chain: the configured provider first, then the failover providers
+        self.providers: Dict[str, ModelProvider] = {self._primary: self.provider}
+        for key in FAILOVER_PROVIDERS:
+            if key not in self.providers:
+                provider = ModelProviderFactory.create_provider(key)
+                provider.setup_api_key(interactive=interactive)
+                self.providers[key] = provider
+        self.schedulers = {key: self._create_scheduler(key, provider) for key, provider in self.providers.items()}
+        self.scheduler = self.schedulers[self._primary]
+        self.health = {key: ProviderHealth(provider.get_provider_name(), FAILOVER_FAILURE_THRESHOLD,
+                                           FAILOVER_COOLDOWN_SECONDS)
+                       for key, provider in self.providers.items()}
+        # One instrumented client pool per (provider, model, temperature), shared by all callers
+        self._pools: Dict[Tuple[str, str, float], InstrumentedLLM] = {}
+        self._chains: Dict[Tuple[str, float], FailoverLLM] = {}
+        self._pools_lock = threading.RLock()
+        self._hedge_executor = None
+        if HEDGE_REQUESTS_ENABLED and len(self.providers) > 1:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=LLM_MAX_IN_FLIGHT * len(self.providers),
+                                                      thread_name_prefix="helmbot-hedge")
+        names = " → ".join(provider.get_provider_name() for provider in self.providers.values())
+        logger.info("✅ LLM Manager initialized with %s provider%s!", names, 's' if len(self.providers) > 1 else '')
+    
+    def _create_scheduler(self, provider_key: str, provider: ModelProvider) -> RateLimitScheduler:
+        """Rate limiter and retry policy shared by every model of a provider"""
+        limits = dict(LLM_RATE_LIMITS.get(provider_key, {}))
+        if provider_key == self._primary:
+            if LLM_REQUESTS_PER_MINUTE_OVERRIDE:
+                limits['requests_per_minute'] = float(LLM_REQUESTS_PER_MINUTE_OVERRIDE)
+            if LLM_TOKENS_PER_MINUTE_OVERRIDE:
+                limits['tokens_per_minute'] = float(LLM_TOKENS_PER_MINUTE_OVERRIDE)
+        return RateLimitScheduler(
+            provider.get_provider_name(),
+            requests_per_minute=limits.get('requests_per_minute', 0),
+            tokens_per_minute=limits.get('tokens_per_minute', 0),
+            # In a failover chain the next provider is the retry, so members fail fast
+            max_retries=0 if len(self.providers) > 1 else LLM_MAX_RETRIES,
+            backoff_base=LLM_BACKOFF_BASE_SECONDS,
+            backoff_max=LLM_BACKOFF_MAX_SECONDS,
+            batch_reserve=LLM_BATCH_RESERVE_RATIO
+        )
+    
+    def _get_pool(self, provider_key: str, model_name: str, temperature: float) -> InstrumentedLLM:
+        """Get the client pool for one provider's model (created once), recording per-call metrics"""
+        provider = self.providers[provider_key]
+        pool_key = (provider.get_provider_name(), model_name, temperature)
+        with self._pools_lock:
+            pool = self._pools.get(pool_key)
+            if pool is None:
+                try:
+                    pool = LLMClientPool(lambda: provider.create_llm(model_name, temperature),
+                                         size=LLM_POOL_SIZE, max_in_flight=LLM_MAX_IN_FLIGHT,
+                                         scheduler=self.schedulers[provider_key])
+                except Exception as e:
+                    raise RuntimeError(f"Failed to create LLM instance: {e}")
+                pool = InstrumentedLLM(pool, provider.get_provider_name(), model_name)
+                self._pools[pool_key] = pool
+                logger.info("✅ Created %s LLM pool: %s", provider.get_provider_name(), model_name)
+        return pool
     
     def get_llm(self, model_name: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE) -> Any:
-        """Get LLM instance (cached for performance)"""
-        cache_key = f"{model_name}_{temperature}"
-        if cache_key not in self._llm_cache:
-            try:
-                self._llm_cache[cache_key] = self.provider.create_llm(model_name, temperature)
-                print(f"✅ Created {self.provider.get_provider_name()} LLM instance: {model_name}")
-            except Exception as e:
-                raise RuntimeError(f"Failed to create LLM instance: {e}")
-        return self._llm_cache[cache_key]
+        """
+        Get the LLM for a model: a pool bounded by LLM_MAX_IN_FLIGHT, wrapped in a
+        failover chain when failover providers are configured
+        """
+        primary = self._primary
+        if len(self.providers) == 1:
+            return self._get_pool(primary, model_name, temperature)
+        with self._pools_lock:
+            chain = self._chains.get((model_name, temperature))
+            if chain is None:
+                members = [
+                    FailoverMember(provider.get_provider_name(),
+                                   self._get_pool(key, model_name if key == primary else FAILOVER_MODELS.get(key, model_name), temperature),
+                                   self.health[key])
+                    for key, provider in self.providers.items()
+                ]
+                chain = FailoverLLM(members, executor=self._hedge_executor, hedge=HEDGE_REQUESTS_ENABLED,
+                                    hedge_min_samples=HEDGE_MIN_SAMPLES, order_by_latency=FAILOVER_ORDER_BY_LATENCY)
+                self._chains[(model_name, temperature)] = chain
+        return chain
     
     def get_gpt35_llm(self) -> Any:
         """Get default model LLM instance (maintains backward compatibility)"""
@@ -188,10 +361,38 @@ class LLMManager:
         """Get advanced model LLM instance (maintains backward compatibility)"""
         return self.get_llm(GPT4_MODEL, GPT4_TEMPERATURE)
     
-    def get_provider_info(self) -> Dict[str, str]:
+    def get_provider_info(self) -> Dict[str, Any]:
         """Get information about the current provider"""
         return {
             "provider": self.provider.get_provider_name(),
             "default_model": DEFAULT_MODEL,
-            "advanced_model": GPT4_MODEL
+            "advanced_model": GPT4_MODEL,
+            "failover_providers": [provider.get_provider_name() for provider in list(self.providers.values())[1:]]
         }
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get in-flight, queue-wait and client counts for each LLM pool"""
+        with self._pools_lock:
+            pools = list(self._pools.items())
+        return {f"{provider}/{model}@{temperature}": pool.stats()
+                for (provider, model, temperature), pool in pools}
+    
+    def get_scheduler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get rate-limit admission, throttling and retry counters for each provider"""
+        return {scheduler.provider: scheduler.stats() for scheduler in self.schedulers.values()}
+    
+    def get_failover_stats(self) -> Dict[str, Any]:
+        """Get provider health, latency histograms and failover/hedge counters (empty without failover providers)"""
+        if len(self.providers) == 1:
+            return {}
+        with self._pools_lock:
+            chains = list(self._chains.items())
+        return {
+            "providers": {health.name: health.stats() for health in self.health.values()},
+            "chains": {f"{model}@{temperature}": chain.stats() for (model, temperature), chain in chains},
+        }
+    
+    def shutdown(self) -> None:
+        """Release the hedging worker threads"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
@@ -0,0 +1,284 @@
+"""Token, latency and cache instrumentation for model calls, exported in Prometheus text format"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from prompt_slimmer import estimate_tokens
+
+# Upper bounds (seconds) of the call duration and time-to-first-token histograms
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+_call_site: ContextVar[str] = ContextVar('helmbot_llm_call_site', default='other')
+
+
+@contextmanager
+def llm_call_site(name: str):
+    """Attribute the enclosed model calls to a call site (e.g. 'questions', 'yaml_merge')"""
+    token = _call_site.set(name)
+    try:
+        yield
+    finally:
+        _call_site.reset(token)
+
+
+def current_call_site() -> str:
+    return _call_site.get()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, rows = 0, []
+        for bound, count in zip([*(f"{b:g}" for b in self.buckets), '+Inf'], self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def usage_from_response(response: Any) -> Dict[str, int]:
+    """
+    Token usage reported by the provider: LangChain's usage_metadata, or the raw
+    OpenAI (token_usage) / Anthropic (usage) response metadata. Empty if not reported.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        details = usage.get('input_token_details') or {}
+        return {
+            'prompt': int(usage.get('input_tokens') or 0),
+            'completion': int(usage.get('output_tokens') or 0),
+            'cached_prompt': int(details.get('cache_read') or 0),
+        }
+    metadata = getattr(response, 'response_metadata', None) or {}
+    raw = metadata.get('token_usage') or metadata.get('usage') or {}
+    if not raw:
+        return {}
+    return {
+        'prompt': int(raw.get('prompt_tokens') or raw.get('input_tokens') or 0),
+        'completion': int(raw.get('completion_tokens') or raw.get('output_tokens') or 0),
+        'cached_prompt': int(raw.get('cache_read_input_tokens')
+                             or (raw.get('prompt_tokens_details') or {}).get('cached_tokens') or 0),
+    }
+
+
+def _text(response: Any) -> str:
+    content = getattr(response, 'content', response)
+    if isinstance(content, list):
+        return "".join(block.get('text', '') if isinstance(block, dict) else str(block) for block in content)
+    return content if isinstance(content, str) else ''
+
+
+class LLMMetrics:
+    """Thread-safe registry of per-call model metrics, keyed by provider, model and call site"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str, str, str], int] = {}
+        self._tokens: Dict[Tuple[str, str, str, str], int] = {}
+        self._estimated_calls: Dict[Tuple[str, str, str], int] = {}
+        self._duration: Dict[Tuple[str, str, str], Histogram] = {}
+        self._first_token: Dict[Tuple[str, str, str], Histogram] = {}
+        self._cache: Dict[Tuple[str, str], int] = {}
+
+    def record_call(self, provider: str, model: str, call_site: str, outcome: str, seconds: float,
+                    usage: Optional[Dict[str, int]] = None, estimated: bool = False,
+                    first_token_seconds: Optional[float] = None) -> None:
+        key = (provider, model, call_site)
+        with self._lock:
+            self._calls[key + (outcome,)] = self._calls.get(key + (outcome,), 0) + 1
+            self._duration.setdefault(key, Histogram()).observe(seconds)
+            if first_token_seconds is not None:
+                self._first_token.setdefault(key, Histogram()).observe(first_token_seconds)
+            for kind, count in (usage or {}).items():
+                self._tokens[key + (kind,)] = self._tokens.get(key + (kind,), 0) + count
+            if estimated:
+                self._estimated_calls[key] = self._estimated_calls.get(key, 0) + 1
+
+    def record_cache(self, call_site: str, status: str) -> None:
+        """Count how a generation was served: 'merged' (no model needed), 'cache', 'peer' or 'model'"""
+        with self._lock:
+            self._cache[(call_site, status)] = self._cache.get((call_site, status), 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            for table in (self._calls, self._tokens, self._estimated_calls, self._duration,
+                          self._first_token, self._cache):
+                table.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Per provider/model/call site totals for the CLI and batch reports"""
+        with self._lock:
+            rows: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+            for (provider, model, site, outcome), count in self._calls.items():
+                row = rows.setdefault((provider, model, site), {"calls": 0, "errors": 0})
+                row["calls"] += count
+                if outcome != 'ok':
+                    row["errors"] += count
+            for (provider, model, site, kind), count in self._tokens.items():
+                rows.setdefault((provider, model, site), {"calls": 0, "errors": 0})[f"{kind}_tokens"] = count
+            for key, row in rows.items():
+                duration = self._duration.get(key)
+                row["avg_seconds"] = round(duration.sum / duration.count, 3) if duration and duration.count else None
+                first_token = self._first_token.get(key)
+                if first_token and first_token.count:
+                    row["avg_first_token_seconds"] = round(first_token.sum / first_token.count, 3)
+                if key in self._estimated_calls:
+                    row["estimated_token_calls"] = self._estimated_calls[key]
+            return {
+                "calls": [{"provider": p, "model": m, "call_site": s, **row} for (p, m, s), row in sorted(rows.items())],
+                "cache": {f"{site}:{status}": count for (site, status), count in sorted(self._cache.items())},
+            }
+
+    def summary_text(self) -> str:
+        """Short human-readable summary, empty when no calls were made"""
+        summary = self.summary()
+        if not summary["calls"] and not summary["cache"]:
+            return ""
+        lines = ["📊 LLM usage:"]
+        for row in summary["calls"]:
+            errors = f", {row['errors']} errors" if row['errors'] else ""
+            lines.append(
+                f"  {row['provider']}/{row['model']} [{row['call_site']}]: {row['calls']} calls"
+                f"{errors}, avg {row['avg_seconds']}s, "
+                f"{row.get('prompt_tokens', 0)} prompt + {row.get('completion_tokens', 0)} completion tokens"
+                f"{' (estimated)' if row.get('estimated_token_calls') else ''}"
+            )
+        if summary["cache"]:
+            lines.append("  generations: " + ", ".join(f"{key}={count}" for key, count in summary["cache"].items()))
+        return "\n".join(lines)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            lines += ["# HELP helmbot_llm_calls_total Model calls by outcome (ok, error, cancelled)",
+                      "# TYPE helmbot_llm_calls_total counter"]
+            for (provider, model, site, outcome), count in sorted(self._calls.items()):
+                lines.append(f"helmbot_llm_calls_total{_labels(provider=provider, model=model, call_site=site, outcome=outcome)} {count}")
+            for kind, help_text in (('prompt', "Prompt tokens sent"), ('completion', "Completion tokens received"),
+                                    ('cached_prompt', "Prompt tokens served from the provider's prompt cache")):
+                name = f"helmbot_llm_{kind}_tokens_total"
+                lines += [f"# HELP {name} {help_text} (estimated when the provider reports no usage)",
+                          f"# TYPE {name} counter"]
+                for (provider, model, site, token_kind), count in sorted(self._tokens.items()):
+                    if token_kind == kind:
+                        lines.append(f"{name}{_labels(provider=provider, model=model, call_site=site)} {count}")
+            lines += ["# HELP helmbot_llm_estimated_token_calls_total Calls whose token counts were estimated locally",
+                      "# TYPE helmbot_llm_estimated_token_calls_total counter"]
+            for (provider, model, site), count in sorted(self._estimated_calls.items()):
+                lines.append(f"helmbot_llm_estimated_token_calls_total{_labels(provider=provider, model=model, call_site=site)} {count}")
+            for name, help_text, table in (
+                ("helmbot_llm_call_duration_seconds", "Wall time of model calls, including queueing and retries", self._duration),
+                ("helmbot_llm_time_to_first_token_seconds", "Time until the first streamed chunk", self._first_token),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (provider, model, site), histogram in sorted(table.items()):
+                    base = dict(provider=provider, model=model, call_site=site)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{_labels(**base, le=bound)} {count}")
+                    lines.append(f"{name}_sum{_labels(**base)} {round(histogram.sum, 6)}")
+                    lines.append(f"{name}_count{_labels(**base)} {histogram.count}")
+            lines += ["# HELP helmbot_generation_cache_total How values.yaml generations were served (merged, cache, peer, model)",
+                      "# TYPE helmbot_generation_cache_total counter"]
+            for (site, status), count in sorted(self._cache.items()):
+                lines.append(f"helmbot_generation_cache_total{_labels(call_site=site, status=status)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by the CLI, the API and every LLM manager
+metrics = LLMMetrics()
+
+
+class InstrumentedLLM:
+    """
+    Wraps a model (or pool) so every invoke, ainvoke and astream records tokens,
+    wall time, time-to-first-token, provider, model and call site
+    """
+
+    def __init__(self, llm: Any, provider: str, model: str, registry: LLMMetrics = metrics):
+        self._llm = llm
+        self.provider = provider
+        self.model = model
+        self._metrics = registry
+
+    def __getattr__(self, name: str) -> Any:
+        # Private names never delegate, so a half-built instance (copy, pickle) cannot recurse
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._llm, name)
+
+    def _record(self, prompt: Any, response: Any, outcome: str, seconds: float,
+                first_token_seconds: Optional[float] = None, usage: Optional[Dict[str, int]] = None) -> None:
+        estimated = False
+        if outcome == 'ok' and not usage:
+            # Providers (or the fake provider) that report no usage: estimate like the rate limiter does
+            usage = {'prompt': estimate_tokens(str(prompt)), 'completion': estimate_tokens(_text(response))}
+            estimated = True
+        self._metrics.record_call(self.provider, self.model, current_call_site(), outcome, seconds,
+                                  usage, estimated, first_token_seconds)
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        try:
+            response = self._llm.invoke(prompt, *args, **kwargs)
+        except Exception:
+            self._record(prompt, None, 'error', time.perf_counter() - start)
+            raise
+        self._record(prompt, response, 'ok', time.perf_counter() - start, usage=usage_from_response(response))
+        return response
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        try:
+            response = await self._llm.ainvoke(prompt, *args, **kwargs)
+        except asyncio.CancelledError:
+            # A hedged call that lost the race
+            self._record(prompt, None, 'cancelled', time.perf_counter() - start)
+            raise
+        except Exception:
+            self._record(prompt, None, 'error', time.perf_counter() - start)
+            raise
+        self._record(prompt, response, 'ok', time.perf_counter() - start, usage=usage_from_response(response))
+        return response
+
+    async def astream(self, prompt: Any, *args, **kwargs) -> AsyncIterator[Any]:
+        start = time.perf_counter()
+        first_token, parts, usage, outcome = None, [], {}, 'error'
+        try:
+            async for chunk in self._llm.astream(prompt, *args, **kwargs):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(_text(chunk))
+                # Usage arrives on one (usually the last) chunk; add up whatever is reported
+                for kind, count in usage_from_response(chunk).items():
+                    usage[kind] = usage.get(kind, 0) + count
+                yield chunk
+            outcome = 'ok'
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = 'cancelled'
+            raise
+        finally:
+            self._record(prompt, "".join(parts), outcome, time.perf_counter() - start, first_token, usage)
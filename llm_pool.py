@@ -0,0 +1,204 @@
+"""Bounded pools of LLM client instances shared by concurrent requests"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+def http_limits(pool_size: int, keepalive_seconds: float) -> Any:
+    """httpx connection limits for a client's HTTP pool (None keeps the SDK defaults)"""
+    if pool_size <= 0:
+        return None
+    import httpx
+    return httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                        keepalive_expiry=keepalive_seconds)
+
+
+class InFlightLimiter:
+    """
+    FIFO counting gate usable from worker threads and the event loop alike.
+
+    Threads block on a concurrent.futures.Future while asyncio callers await the
+    same future, so waiting for a slot never ties up the event loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[Future] = deque()
+        self._acquired = 0
+        self._queued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _enter(self) -> Optional[Future]:
+        """Take a free slot, or return a future that resolves when one is handed over"""
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                self._acquired += 1
+                return None
+            waiter: Future = Future()
+            self._waiters.append(waiter)
+            self._queued += 1
+            return waiter
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._acquired += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+
+    def acquire(self) -> None:
+        start = time.perf_counter()
+        waiter = self._enter()
+        if waiter is not None:
+            waiter.result()
+            self._record_wait(time.perf_counter() - start)
+
+    async def acquire_async(self) -> None:
+        start = time.perf_counter()
+        waiter = self._enter()
+        if waiter is None:
+            return
+        try:
+            await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    handed_over = False
+                else:
+                    handed_over = not waiter.cancelled()
+            if handed_over:
+                self.release()
+            raise
+        self._record_wait(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Hand the slot to the oldest live waiter, or free it"""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(None)
+                    return
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued_acquired = self._queued - len(self._waiters)
+            return {
+                "max_in_flight": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "acquired": self._acquired,
+                "queued": self._queued,
+                "avg_queue_wait_ms": round(self._wait_total * 1000 / queued_acquired, 3) if queued_acquired else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+class LLMClientPool:
+    """
+    Up to size client instances for one (provider, model, temperature) behind an in-flight limit.
+
+    invoke, ainvoke and astream go through the limiter and use an idle client when one
+    is available (sharing round-robin once all size clients are busy); other attributes
+    are read from one of the pooled clients so the pool stands in for a LangChain chat model.
+    With a scheduler, each call is first admitted against the provider's rate limits and
+    retried on throttling; the in-flight slot is only held while a request is outstanding.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int, max_in_flight: int, scheduler: Any = None):
+        self._factory = factory
+        self.scheduler = scheduler
+        self.size = max(1, size)
+        self.limiter = InFlightLimiter(max_in_flight)
+        self._lock = threading.Lock()
+        self._clients: List[Any] = [factory()]
+        self._idle: Deque[Any] = deque(self._clients)
+        self._round_robin = itertools.count()
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.popleft(), True
+            if len(self._clients) < self.size:
+                client = self._factory()
+                self._clients.append(client)
+                return client, True
+            return self._clients[next(self._round_robin) % len(self._clients)], False
+
+    def _checkin(self, client: Any, owned: bool) -> None:
+        if owned:
+            with self._lock:
+                self._idle.append(client)
+
+    @contextmanager
+    def lease(self):
+        """Hold an in-flight slot and a client for the duration of one call"""
+        self.limiter.acquire()
+        try:
+            client, owned = self._checkout()
+            try:
+                yield client
+            finally:
+                self._checkin(client, owned)
+        finally:
+            self.limiter.release()
+
+    @asynccontextmanager
+    async def alease(self):
+        """Async variant of lease; waiting for a slot does not block the event loop"""
+        await self.limiter.acquire_async()
+        try:
+            client, owned = self._checkout()
+            try:
+                yield client
+            finally:
+                self._checkin(client, owned)
+        finally:
+            self.limiter.release()
+
+    def invoke(self, prompt: Any, **kwargs) -> Any:
+        def attempt():
+            with self.lease() as client:
+                return client.invoke(prompt, **kwargs)
+        if self.scheduler is None:
+            return attempt()
+        return self.scheduler.run(attempt, prompt)
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> Any:
+        async def attempt():
+            async with self.alease() as client:
+                return await client.ainvoke(prompt, **kwargs)
+        if self.scheduler is None:
+            return await attempt()
+        return await self.scheduler.arun(attempt, prompt)
+
+    async def astream(self, prompt: Any, **kwargs):
+        async def stream():
+            async with self.alease() as client:
+                async for chunk in client.astream(prompt, **kwargs):
+                    yield chunk
+        chunks = stream() if self.scheduler is None else self.scheduler.astream(stream, prompt)
+        async for chunk in chunks:
+            yield chunk
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._clients[0], name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients, idle = len(self._clients), len(self._idle)
+        stats = self.limiter.stats()
+        stats.update({"pool_size": self.size, "clients": clients, "idle_clients": idle})
+        return stats
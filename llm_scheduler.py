@@ -0,0 +1,289 @@
+"""Rate-limit-aware admission, retry and backoff for provider calls"""
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from prompt_slimmer import estimate_tokens
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+_priority: ContextVar[str] = ContextVar('helmbot_llm_priority', default=INTERACTIVE)
+
+# 503 and Anthropic's 529 mean the provider is overloaded; treat them like 429
+_THROTTLE_STATUS = {429, 503, 529}
+_TRANSIENT_STATUS = {500, 502, 504}
+_THROTTLE_CODES = {'ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException',
+                   'ModelNotReadyException', 'rate_limit_error', 'overloaded_error'}
+_TRANSIENT_CLASS_NAMES = {'APIConnectionError', 'APITimeoutError', 'ConnectError', 'ReadTimeout',
+                          'EndpointConnectionError', 'ReadTimeoutError', 'TimeoutError'}
+
+
+class ProviderThrottledError(RuntimeError):
+    """Raised when the provider is still rate limiting us after the retry budget is spent"""
+
+    def __init__(self, provider: str, retry_after: Optional[float] = None):
+        super().__init__(f"{provider} is rate limiting requests; retry later")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+@contextmanager
+def llm_priority(level: str):
+    """Run the enclosed model calls at the given priority (INTERACTIVE or BATCH)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def _error_chain(error: BaseException):
+    """The error and its causes (integrations often wrap the SDK exception)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if status is None and isinstance(response, dict):
+            status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return status if isinstance(status, int) else None
+
+
+def _error_code(error: BaseException) -> Optional[str]:
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    body = getattr(error, 'body', None)
+    if isinstance(body, dict):
+        return (body.get('error') or {}).get('type')
+    return None
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """'throttled' for rate limit/overload errors, 'transient' for retryable failures, else None"""
+    for cause in _error_chain(error):
+        status, code = _status_code(cause), _error_code(cause)
+        if status in _THROTTLE_STATUS or code in _THROTTLE_CODES or type(cause).__name__ in ('RateLimitError', 'OverloadedError'):
+            return 'throttled'
+        if status in _TRANSIENT_STATUS or type(cause).__name__ in _TRANSIENT_CLASS_NAMES:
+            return 'transient'
+    if any(code in str(error) for code in ('ThrottlingException', 'Too many requests')):
+        return 'throttled'
+    return None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the provider via retry-after-ms or Retry-After (seconds or HTTP date)"""
+    for cause in _error_chain(error):
+        headers = getattr(getattr(cause, 'response', None), 'headers', None)
+        if not headers:
+            continue
+        milliseconds = headers.get('retry-after-ms')
+        if milliseconds:
+            try:
+                return float(milliseconds) / 1000
+            except ValueError:
+                pass
+        value = headers.get('retry-after')
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+class TokenBucket:
+    """Refills per_minute units per minute up to a burst of one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, floor: float) -> float:
+        """Seconds until amount can be taken while leaving floor in the bucket"""
+        amount = min(amount, self.capacity - floor)
+        missing = floor + amount - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float, floor: float) -> None:
+        self.level -= min(amount, self.capacity - floor)
+
+
+class RateLimitScheduler:
+    """
+    Admits provider calls through request and token buckets and retries throttled ones.
+
+    Batch callers leave batch_reserve of each bucket for interactive callers. A throttled
+    response pauses admission for everyone until the provider's Retry-After (or the jittered
+    exponential backoff) has passed, so one 429 does not turn into a burst of them.
+    """
+
+    def __init__(self, provider: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_retries: int = 4, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 batch_reserve: float = 0.25):
+        self.provider = provider
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_reserve = batch_reserve
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._counters = {"calls": 0, "throttled": 0, "transient_errors": 0, "retries": 0,
+                          "gave_up": 0, "admission_waits": 0, "admission_wait_seconds": 0.0}
+        self._by_priority = {INTERACTIVE: 0, BATCH: 0}
+
+    def _admit(self, cost: int, priority: str) -> float:
+        """Take capacity for one call, or return how long to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            buckets = [(bucket, amount) for bucket, amount in ((self._requests, 1), (self._tokens, cost)) if bucket]
+            for bucket, amount in buckets:
+                bucket.refill(now)
+                floor = bucket.capacity * self.batch_reserve if priority == BATCH else 0.0
+                wait = max(wait, bucket.wait_time(amount, floor))
+            if wait > 0:
+                return wait
+            for bucket, amount in buckets:
+                bucket.take(amount, bucket.capacity * self.batch_reserve if priority == BATCH else 0.0)
+            self._counters["calls"] += 1
+            self._by_priority[priority] = self._by_priority.get(priority, 0) + 1
+            return 0.0
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._counters["admission_waits"] += 1
+            self._counters["admission_wait_seconds"] += seconds
+
+    def _retry_delay(self, error: Exception, retry: int) -> Optional[float]:
+        """
+        Delay before retrying after error, or None when the error should propagate.
+
+        Raises ProviderThrottledError once a throttled call has used up its retries.
+        """
+        kind = classify_error(error)
+        if kind is None:
+            return None
+        retry_after = retry_after_seconds(error) if kind == 'throttled' else None
+        with self._lock:
+            self._counters["throttled" if kind == 'throttled' else "transient_errors"] += 1
+            if retry >= self.max_retries:
+                self._counters["gave_up"] += 1
+                if kind == 'throttled':
+                    raise ProviderThrottledError(self.provider, retry_after) from error
+                return None
+            self._counters["retries"] += 1
+            # Full jitter spreads retries from concurrent callers apart
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+            if retry_after is not None:
+                delay = min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+            if kind == 'throttled':
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay
+
+    def run(self, attempt: Callable[[], Any], prompt: Any) -> Any:
+        """Call attempt() once admitted, retrying throttled and transient failures"""
+        cost, priority = estimate_tokens(str(prompt)), current_priority()
+        retry = 0
+        while True:
+            wait = self._admit(cost, priority)
+            if wait > 0:
+                self._record_wait(wait)
+                time.sleep(wait)
+                continue
+            try:
+                return attempt()
+            except Exception as e:
+                delay = self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+            retry += 1
+            time.sleep(delay)
+
+    async def arun(self, attempt: Callable[[], Any], prompt: Any) -> Any:
+        """Async variant of run; attempt returns an awaitable"""
+        cost, priority = estimate_tokens(str(prompt)), current_priority()
+        retry = 0
+        while True:
+            wait = self._admit(cost, priority)
+            if wait > 0:
+                self._record_wait(wait)
+                await asyncio.sleep(wait)
+                continue
+            try:
+                return await attempt()
+            except Exception as e:
+                delay = self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+            retry += 1
+            await asyncio.sleep(delay)
+
+    async def astream(self, stream: Callable[[], AsyncIterator[Any]], prompt: Any) -> AsyncIterator[Any]:
+        """Stream chunks once admitted; a failure is only retried before the first chunk"""
+        cost, priority = estimate_tokens(str(prompt)), current_priority()
+        retry = 0
+        while True:
+            wait = self._admit(cost, priority)
+            if wait > 0:
+                self._record_wait(wait)
+                await asyncio.sleep(wait)
+                continue
+            started = False
+            try:
+                async for chunk in stream():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+            retry += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["admission_wait_seconds"] = round(stats["admission_wait_seconds"], 3)
+            stats["calls_by_priority"] = dict(self._by_priority)
+            stats["paused_for_seconds"] = round(max(0.0, self._paused_until - now), 3)
+            for name, bucket in (("requests", self._requests), ("tokens", self._tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    stats[f"{name}_per_minute"] = bucket.capacity
+                    stats[f"{name}_available"] = round(bucket.level, 1)
+            return stats
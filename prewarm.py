@@ -0,0 +1,113 @@
+"""Pre-generates question sets for every chart so /questions never waits on the model"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import PREWARM_WORKERS
+from llm_scheduler import BATCH, llm_priority
+from structured_logging import get_logger, span
+
+logger = get_logger(__name__)
+
+_STATUS_ICONS = {'current': '✅', 'generated': '♻️ ', 'failed': '❌'}
+
+
+class QuestionPrewarmer:
+    """
+    Checks many charts at once and regenerates only the question sets that are missing
+    or stale. Model calls run at BATCH priority, so the provider rate limit still leaves
+    room for interactive requests arriving while a deployment warms up.
+    """
+
+    def __init__(self, question_manager, workers: int = PREWARM_WORKERS):
+        self.question_manager = question_manager
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._state = 'not_started'
+        self._progress: Dict[str, int] = {}
+        self._report: Optional[Dict[str, Any]] = None
+
+    def run(self, registry, chart_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Bring the questions of chart_ids (default: every chart in the registry, plus the
+        default chart) up to date. Returns a report with counts and per-chart results.
+        """
+        targets = list(chart_ids) if chart_ids is not None else self._all_charts(registry)
+        with self._lock:
+            self._state = 'running'
+            self._progress = {'total': len(targets), 'completed': 0, 'current': 0, 'generated': 0, 'failed': 0}
+        logger.info("🔥 Pre-warming questions for %d chart(s) with %d worker(s)", len(targets), self.workers)
+
+        start = time.perf_counter()
+        results: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="helmbot-prewarm") as executor:
+            # Each job copies the caller's context so request IDs and BATCH priority reach the workers
+            futures = [executor.submit(contextvars.copy_context().run, self._prewarm_chart, registry, chart_id)
+                       for chart_id in targets]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                with self._lock:
+                    self._progress['completed'] += 1
+                    self._progress[result['status']] += 1
+                    completed = self._progress['completed']
+                logger.log(logging.WARNING if result['status'] == 'failed' else logging.INFO,
+                           "%s [%d/%d] %s: %s (%.2fs)", _STATUS_ICONS[result['status']], completed, len(targets),
+                           result['chart'], result.get('error') or result['status'], result['seconds'])
+
+        results.sort(key=lambda result: result['chart'])
+        report = {
+            "total": len(results),
+            "current": sum(1 for result in results if result['status'] == 'current'),
+            "generated": sum(1 for result in results if result['status'] == 'generated'),
+            "failed": sum(1 for result in results if result['status'] == 'failed'),
+            "seconds": round(time.perf_counter() - start, 3),
+            "charts": results,
+        }
+        with self._lock:
+            self._state, self._report = 'done', report
+        logger.info("🔥 Pre-warm finished in %.2fs: %d generated, %d already current, %d failed",
+                    report['seconds'], report['generated'], report['current'], report['failed'])
+        return report
+
+    def status(self) -> Dict[str, Any]:
+        """Progress of the current run, or the counts of the last one"""
+        with self._lock:
+            return {"state": self._state, **self._progress}
+
+    def last_report(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._report
+
+    @staticmethod
+    def _all_charts(registry) -> List[Optional[str]]:
+        """Every registry chart; None (the default chart) too when it lives outside the charts directory"""
+        charts: List[Optional[str]] = list(registry.list_charts())
+        if registry.get(None).name not in charts:
+            charts.insert(0, None)
+        return charts
+
+    def _prewarm_chart(self, registry, chart_id: Optional[str]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result: Dict[str, Any] = {"chart": chart_id}
+        try:
+            chart = registry.get(chart_id)
+            result["chart"] = chart.name
+            if not self.question_manager.questions_stale(chart):
+                chart.mark_checked('questions')
+                result["status"] = 'current'
+            else:
+                with llm_priority(BATCH), span('prewarm_questions', logger, chart=chart.name):
+                    # Skip the re-check interval: the templates were inspected just now
+                    chart.invalidate('questions')
+                    self.question_manager.ensure_questions_exist(chart)
+                if self.question_manager.questions_stale(chart):
+                    raise RuntimeError("the model returned no usable questions")
+                result["status"] = 'generated'
+        except Exception as e:
+            result.update(status='failed', error=f"{type(e).__name__}: {e}")
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
@@ -0,0 +1,183 @@
+"""Send only the values.yaml subtrees an answer set touches to the model"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import yaml
+
+from config import PROMPT_SLIM_MAX_RATIO
+from question_schema import FAST_SAFE_LOADER, Question, parse_values, split_path
+from template_analyzer import LIST_ITEM
+from values_merger import dump_values
+
+# Key words that appear all over real charts and say nothing about which section is meant
+_GENERIC_WORDS = {
+    'enabled', 'enable', 'name', 'type', 'value', 'count', 'annotation', 'label', 'port', 'path',
+    'size', 'mode', 'class', 'key', 'config', 'default', 'create', 'target', 'min', 'max', 'initial',
+    'delay', 'second', 'period', 'timeout', 'threshold', 'extra', 'existing', 'override', 'policy',
+    'spec', 'list', 'the', 'and', 'for', 'with', 'use', 'set',
+}
+# A word matching more keys than this (e.g. "resources" in every component) is too ambiguous to select by
+_MAX_MATCHES_PER_WORD = 3
+_ACRONYM_RE = re.compile(r'([A-Z]+)([A-Z][a-z])')
+_CAMEL_RE = re.compile(r'([a-z0-9])([A-Z])')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+Path = Tuple[str, ...]
+
+
+def _words(text: str) -> Set[str]:
+    """Lowercase words with camelCase split and a naive plural strip"""
+    text = _CAMEL_RE.sub(r'\1 \2', _ACRONYM_RE.sub(r'\1 \2', text))
+    words = set()
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+@lru_cache(maxsize=16)
+def _index_values(base_yaml_content: str) -> Tuple[Dict[str, Any], Dict[str, Tuple[Path, ...]]]:
+    """Parse values.yaml once per distinct content and map each distinctive key word to its keys"""
+    values = parse_values(base_yaml_content)
+    index: Dict[str, List[Path]] = {}
+    stack: List[Tuple[Path, Any]] = [((), values)]
+    while stack:
+        prefix, node = stack.pop()
+        for key, child in node.items():
+            path = prefix + (str(key),)
+            for word in _words(str(key)):
+                if len(word) > 2 and word not in _GENERIC_WORDS:
+                    index.setdefault(word, []).append(path)
+            if isinstance(child, dict):
+                stack.append((path, child))
+    return values, {word: tuple(paths) for word, paths in index.items()}
+
+
+class SlimPrompt:
+    """The values excerpt to send to the model and how to put its answer back"""
+
+    def __init__(self, base_yaml_content: str, values: Dict[str, Any], selected: List[Path]):
+        self.values = values
+        self.selected = selected
+        self.is_excerpt = bool(selected)
+        self.prompt_yaml = dump_values(extract_subtrees(values, selected)) if selected else base_yaml_content
+
+    def splice(self, model_output: str) -> str:
+        """Put the model's (excerpt) output back into the full values document"""
+        if not self.is_excerpt:
+            return model_output
+        try:
+            updated = yaml.load(model_output, Loader=FAST_SAFE_LOADER)
+        except yaml.YAMLError:
+            return model_output
+        if not isinstance(updated, dict):
+            return model_output
+        return dump_values(deep_merge(self.values, updated))
+
+
+class PromptSlimmer:
+    """Works out which values.yaml subtrees a set of answers touches"""
+
+    def __init__(self, max_ratio: float = PROMPT_SLIM_MAX_RATIO):
+        self.max_ratio = max_ratio
+
+    def slim(self, base_yaml_content: str, answers: Iterable[Tuple[str, str]],
+             questions: Iterable[Question] = ()) -> SlimPrompt:
+        """
+        Select the subtrees relevant to answers.
+
+        Falls back to the full document when nothing can be matched or the excerpt
+        would not be meaningfully smaller.
+        """
+        values, index = _index_values(base_yaml_content)
+        answers = list(answers)
+        if not values or not answers:
+            return SlimPrompt(base_yaml_content, values, [])
+
+        by_text = {" ".join(q.text.split()).lower(): q for q in questions}
+        wanted: Set[Path] = set()
+        for question_text, answer in answers:
+            question = by_text.get(" ".join(str(question_text).split()).lower())
+            for path in (question.paths if question else ()):
+                segments = tuple(s for s in split_path(path) if s != LIST_ITEM)
+                wanted.add(_section(values, segments))
+            matches: Dict[str, List[Path]] = {}
+            for word in _words(f"{question_text} {answer}"):
+                for path in index.get(word, ()):
+                    matches.setdefault(word, []).append(path)
+            for word, paths in matches.items():
+                if len(paths) <= _MAX_MATCHES_PER_WORD:
+                    wanted.update(_section(values, path) for path in paths)
+
+        selected = _outermost(p for p in wanted if p)
+        if not selected:
+            return SlimPrompt(base_yaml_content, values, [])
+        slim = SlimPrompt(base_yaml_content, values, selected)
+        if len(slim.prompt_yaml) > self.max_ratio * len(base_yaml_content):
+            return SlimPrompt(base_yaml_content, values, [])
+        return slim
+
+
+def _section(values: Dict[str, Any], path: Path) -> Path:
+    """
+    The subtree to send for a matched key: the key itself at the top level, otherwise
+    its parent so the model sees the sibling settings it belongs with.
+    """
+    existing: List[str] = []
+    node: Any = values
+    for segment in path:
+        if not isinstance(node, dict) or segment not in node:
+            break
+        existing.append(segment)
+        node = node[segment]
+    if not existing:
+        # Answers may introduce new top-level sections; the model adds those itself
+        return ()
+    if len(existing) == 1:
+        return tuple(existing)
+    return tuple(existing[:-1])
+
+
+def _outermost(paths: Iterable[Path]) -> List[Path]:
+    """Drop paths that lie inside another selected path"""
+    result: List[Path] = []
+    for path in sorted(set(paths), key=len):
+        if not any(path[:len(kept)] == kept for kept in result):
+            result.append(path)
+    return sorted(result)
+
+
+def extract_subtrees(values: Dict[str, Any], paths: List[Path]) -> Dict[str, Any]:
+    """Pruned copy of values containing only the given subtrees, in document order"""
+    wanted = set(paths)
+    prefixes = {path[:i] for path in paths for i in range(1, len(path))}
+
+    def walk(node: Dict[str, Any], prefix: Path) -> Dict[str, Any]:
+        pruned = {}
+        for key, child in node.items():
+            path = prefix + (str(key),)
+            if path in wanted:
+                pruned[key] = child
+            elif path in prefixes and isinstance(child, dict):
+                pruned[key] = walk(child, path)
+        return pruned
+
+    return walk(values, ())
+
+
+def deep_merge(base: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively overlay updates on base without mutating either (lists and scalars replace)"""
+    merged = dict(base)
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and YAML)"""
+    return (len(text) + 3) // 4
@@ -1,60 +1,192 @@
 """Question generator and answer collector"""
+import hashlib
+import json
+import logging
 import os
-from langchain.prompts import PromptTemplate
-from config import TEMPLATE_DIR, GENERATED_QUESTIONS_FILE
+import time
+from config import (
+    GENERATED_QUESTIONS_FILE, VALUES_FILE, DEFAULT_MODEL,
+    QUESTION_PROMPT_VERSION, QUESTIONS_CHECK_INTERVAL_SECONDS
+)
+from chart_registry import default_chart
+from llm_metrics import llm_call_site
+from single_flight import SingleFlight, FileLock
+from structured_logging import get_logger, span
+from question_schema import (
+    annotate_defaults, dump_questions, load_question_set, load_questions_json,
+    parse_llm_questions, parse_values
+)
+
+logger = get_logger(__name__)
+
+
+class QuestionsNotReadyError(RuntimeError):
+    """Raised when a chart's questions have not been generated and generating them is not allowed"""
+
+    def __init__(self, chart_name):
+        super().__init__(chart_name)
+        self.chart_name = chart_name
+
+    def __str__(self):
+        return f"Questions for chart '{self.chart_name}' have not been generated yet"
 
 
 class QuestionManager:
     def __init__(self, llm_manager, helm_parser):
         self.llm_manager = llm_manager
         self.helm_parser = helm_parser
+        self._flights = SingleFlight()
     
     def create_prompt_template(self):
         """Create prompt template for question generation"""
+        # LangChain is heavy; load it only when questions are actually generated
+        from langchain.prompts import PromptTemplate
         prompt = PromptTemplate(
             input_variables=['variables'],
             template="""Given the following Helm chart variables: {variables}
                         Generate the minimum set of user-friendly questions needed to configure all these values.
                         Group related variables together where possible to minimize the number of questions.
                         Make the questions clear and understandable for users who may not be Kubernetes experts.
-                        Format your response as a numbered list of questions.
-                        For each question, briefly explain what the variable controls in parentheses.
+                        Respond with only a JSON array, one object per question, with these fields:
+                        "question": the question text,
+                        "help": a short explanation of what the answer controls,
+                        "paths": the variables from the list above that the answer sets.
                         Example format:
-                        1. What is the name of your application? (Sets the app name used in labels and resources)
-                        2. How many replicas do you want to run? (Controls horizontal scaling)
+                        [
+                          {{"question": "What is the name of your application?", "help": "Sets the app name used in labels and resources", "paths": ["nameOverride"]}},
+                          {{"question": "How many replicas do you want to run?", "help": "Controls horizontal scaling", "paths": ["replicaCount"]}}
+                        ]
                         """
         )
         return prompt
     
-    def ensure_questions_exist(self):
-        """Check if questions exist, generate if not"""
-        gen_q_path = os.path.join(TEMPLATE_DIR, GENERATED_QUESTIONS_FILE)
-        if not os.path.exists(gen_q_path):
-            print(f"❌ Question file '{gen_q_path}' does not exist. Hence generating the questions.")
-            self._generate_questions()
+    def questions_fingerprint(self, variables):
+        """Fingerprint of everything that determines the generated questions"""
+        payload = json.dumps({
+            "variables": sorted(variables),
+            "prompt_version": QUESTION_PROMPT_VERSION,
+            "model": DEFAULT_MODEL,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def ensure_questions_exist(self, chart=None):
+        """Check if questions exist and match the chart's variables, generate if not"""
+        chart = chart or default_chart()
+        gen_q_path = chart.questions_path
+        if os.path.exists(gen_q_path) and chart.recently_checked('questions', QUESTIONS_CHECK_INTERVAL_SECONDS):
+            return gen_q_path
+        
+        # Concurrent callers for the same chart share a single check and generation
+        self._flights.do(('questions', os.path.abspath(chart.root_dir)), self._refresh_questions, chart)
         return gen_q_path
     
-    def _generate_questions(self):
+    def _refresh_questions(self, chart):
+        """Regenerate the chart's questions if they are missing or stale"""
+        variables = self.helm_parser.get_variables(chart)
+        fingerprint = self.questions_fingerprint(variables)
+        if not self._questions_current(chart, variables, fingerprint):
+            # Other worker processes may be generating the same questions right now
+            with FileLock(chart.questions_path + '.lock'):
+                if not self._questions_current(chart, variables, fingerprint):
+                    if not os.path.exists(chart.questions_path):
+                        logger.info("❌ Question file '%s' does not exist. Hence generating the questions.", chart.questions_path)
+                    else:
+                        logger.info("♻️  Chart variables changed since '%s' was generated. Regenerating the questions.",
+                                    chart.questions_path)
+                    with span('generate_questions', logger, chart=chart.name):
+                        self._generate_questions(chart, variables, fingerprint)
+        chart.mark_checked('questions')
+    
+    def questions_stale(self, chart=None):
+        """Whether the chart's questions are missing or were generated for different variables"""
+        chart = chart or default_chart()
+        variables = self.helm_parser.get_variables(chart)
+        return not self._questions_current(chart, variables, self.questions_fingerprint(variables))
+    
+    def _questions_current(self, chart, variables, fingerprint):
+        """Whether the chart's questions exist and were generated for fingerprint"""
+        if not os.path.exists(chart.questions_path):
+            return False
+        if not chart.load_files((chart.questions_path,), load_questions_json):
+            # Truncated, malformed, empty or from another schema version: regenerate rather than serve nothing
+            return False
+        stored = self._read_fingerprint(chart)
+        if stored is None:
+            # Usable questions whose meta file is missing or unreadable: adopt them rather than regenerate
+            self._write_fingerprint(chart, variables, fingerprint)
+            return True
+        return stored == fingerprint
+    
+    def _read_fingerprint(self, chart):
+        """Fingerprint stored alongside the chart's questions, or None"""
+        try:
+            with open(chart.questions_meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('fingerprint')
+        except (OSError, ValueError):
+            return None
+    
+    def _write_fingerprint(self, chart, variables, fingerprint):
+        """Store the fingerprint the chart's questions were generated for"""
+        meta = {
+            "fingerprint": fingerprint,
+            "prompt_version": QUESTION_PROMPT_VERSION,
+            "model": DEFAULT_MODEL,
+            "variables": sorted(variables),
+            "generated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+        _write_atomic(chart.questions_meta_path, json.dumps(meta, indent=2))
+    
+    def load_questions(self, chart=None):
+        """Load the text of the chart's questions, generating them first if needed"""
+        return [q.text for q in self.load_question_set(chart)]
+    
+    def load_question_set(self, chart=None, generate=True):
+        """
+        Load the chart's structured questions, generating them first if needed.
+        
+        Parsed once per chart and kept in memory until the questions file or
+        values.yaml changes (defaults always reflect the current values.yaml).
+        With generate=False the model is never called: questions that were never
+        generated raise QuestionsNotReadyError.
+        """
+        chart = chart or default_chart()
+        if generate:
+            self.ensure_questions_exist(chart)
+        elif not os.path.exists(chart.questions_path):
+            raise QuestionsNotReadyError(chart.name)
+        return chart.load_files((chart.questions_path, chart.values_path), load_question_set)
+    
+    def _generate_questions(self, chart=None, variables=None, fingerprint=None):
         """Internal method to generate questions"""
-        files = self.helm_parser.list_template_files()
-        variables = self.helm_parser.extract_variables(files)
+        chart = chart or default_chart()
+        if variables is None:
+            variables = self.helm_parser.get_variables(chart)
         llm = self.llm_manager.get_gpt35_llm()
         prompt = self.create_prompt_template()
-        self.generate_questions_for_variables(llm, prompt, variables)
+        if self.generate_questions_for_variables(llm, prompt, variables, chart) is not None:
+            self._write_fingerprint(chart, variables, fingerprint or self.questions_fingerprint(variables))
     
-    def generate_questions_for_variables(self, llm, prompt, variables_list):
+    def generate_questions_for_variables(self, llm, prompt, variables_list, chart=None):
         """Generate user-friendly questions for Helm chart variables"""
+        chart = chart or default_chart()
         if not variables_list:
-            print("❌ No variables found to generate questions for.")
+            logger.warning("❌ No variables found to generate questions for.")
             return None
         formatted_prompt = prompt.format(variables=', '.join(sorted(variables_list)))
-        response = llm.invoke(formatted_prompt)
-        print("🎯 Generated Questions:")
-        print(response.content)
-        with open(os.path.join(TEMPLATE_DIR, GENERATED_QUESTIONS_FILE), 'w', encoding='utf-8') as file:
-            file.write(response.content)
-        print(f"\n💾 Questions saved to '{GENERATED_QUESTIONS_FILE}'")
-        return response.content
+        with llm_call_site('questions'), span('llm_questions', logger):
+            response = llm.invoke(formatted_prompt)
+        questions = parse_llm_questions(response.content, variables_list)
+        if not questions:
+            logger.warning("❌ Could not find any questions in the model response.")
+            return None
+        annotate_defaults(questions, parse_values(chart.read_file(chart.values_path)))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🎯 Generated Questions:\n%s", "\n".join(
+                f"{idx}. {question.text}" + (f" ({question.help})" if question.help else "")
+                for idx, question in enumerate(questions, 1)))
+        _write_atomic(chart.questions_path, dump_questions(questions))
+        logger.info("💾 Questions saved to '%s'", GENERATED_QUESTIONS_FILE)
+        return questions
     
     def collect_answers(self, questions_path):
         """Collect answers from user for generated questions"""
@@ -62,11 +194,39 @@ class QuestionManager:
             print(f"❌ {questions_path} not found. Please run the previous steps to generate questions.")
             return None
         with open(questions_path, 'r', encoding='utf-8') as f:
-            questions = [q.strip() for q in f.readlines() if q.strip()]
+            questions = load_questions_json(f.read())
+        values_path = os.path.join(os.path.dirname(questions_path), VALUES_FILE)
+        if os.path.exists(values_path):
+            with open(values_path, 'r', encoding='utf-8') as f:
+                annotate_defaults(questions, parse_values(f.read()))
         print(f"✅ Loaded {len(questions)} questions from {GENERATED_QUESTIONS_FILE}\n")
         answers = []
         print("Please answer the following questions to generate your values.yaml:")
+        print("(Press Enter to keep the value shown in brackets)")
         for idx, question in enumerate(questions, 1):
-            answer = input(f"\nQ{idx}: {question}\nYour answer: ")
-            answers.append((question, answer))
+            prompt = f"\nQ{idx}: {question.text}"
+            if question.help:
+                prompt += f" ({question.help})"
+            default = _format_default(question.default)
+            answer = input(f"{prompt}\nYour answer" + (f" [{default}]" if default else "") + ": ")
+            answers.append((question.text, answer.strip() or default))
         return answers
+
+
+def _format_default(value):
+    """Render a default the way a user would type it"""
+    if value is None or value == '' or value == {} or value == []:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _write_atomic(path, content):
+    """Write a file so concurrent readers never see it half-written"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,250 @@
+"""Structured question records and parsing of the model's question output"""
+import json
+import re
+import yaml
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from structured_logging import get_logger
+from template_analyzer import LIST_ITEM
+
+logger = get_logger(__name__)
+
+SCHEMA_VERSION = 1
+# Type of a question whose path values.yaml does not define (or leaves null); its answers go to the model
+UNKNOWN_TYPE = 'unknown'
+# libyaml-backed loader/dumper when PyYAML was built with it (several times faster)
+FAST_SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+FAST_SAFE_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+_FENCE_RE = re.compile(r'^```[A-Za-z]*\s*|\s*```$')
+_NUMBERED_RE = re.compile(r'^\s*(?:\d+[.)]|[-*•])\s+(.*)$')
+_HELP_RE = re.compile(r'^(.*?)\s*\(([^()]*)\)\s*$')
+_ID_RE = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class Question:
+    """One configuration question and the .Values paths its answer sets"""
+
+    def __init__(self, id: str, text: str, help: str = '', paths: Optional[List[str]] = None,
+                 type: str = 'string', default: Any = None):
+        self.id = id
+        self.text = text
+        self.help = help
+        self.paths = list(paths or [])
+        self.type = type
+        self.default = default
+
+    def __repr__(self):
+        return f"Question(id={self.id!r}, text={self.text!r}, paths={self.paths!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "help": self.help,
+            "paths": self.paths,
+            "type": self.type,
+            "default": self.default,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Question":
+        return cls(
+            id=data['id'], text=data['text'], help=data.get('help', ''),
+            paths=data.get('paths'), type=data.get('type', 'string'), default=data.get('default')
+        )
+
+
+def parse_llm_questions(content: str, variables: Iterable[str]) -> List[Question]:
+    """
+    Turn the model's response into questions.
+
+    The prompt asks for a JSON array; numbered free-text lists are still accepted so a
+    model that ignores the format does not produce preamble or blank-line "questions".
+    """
+    known = set(variables)
+    records = _parse_json_records(content)
+    if records is None:
+        records = _parse_numbered_records(content)
+
+    questions: List[Question] = []
+    used_ids = set()
+    for index, (text, help_text, paths) in enumerate(records, 1):
+        paths = [p for p in dict.fromkeys(paths) if p in known]
+        questions.append(Question(_unique_id(paths[0] if paths else f"q{index}", used_ids), text, help_text, paths))
+    return questions
+
+
+def _parse_json_records(content: str) -> Optional[List[Tuple[str, str, List[str]]]]:
+    text = _FENCE_RE.sub('', content.strip())
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end <= start:
+        return None
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    records = []
+    for item in items:
+        if isinstance(item, str):
+            item = {'question': item}
+        if not isinstance(item, dict):
+            continue
+        question = str(item.get('question') or item.get('text') or '').strip()
+        if not question:
+            continue
+        paths = item.get('paths') or item.get('variables') or []
+        if isinstance(paths, str):
+            paths = [paths]
+        records.append((question, str(item.get('help') or '').strip(), [_strip_values(str(p)) for p in paths]))
+    return records
+
+
+def _parse_numbered_records(content: str) -> List[Tuple[str, str, List[str]]]:
+    """Numbered or bulleted items; wrapped lines are joined and preambles dropped"""
+    items: List[List[str]] = []
+    for line in content.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('```'):
+            continue
+        match = _NUMBERED_RE.match(line)
+        if match:
+            items.append([match.group(1).strip()])
+        elif items:
+            items[-1].append(stripped)
+
+    if not items:
+        # No list markers at all: fall back to lines that read as questions
+        items = [[line.strip()] for line in content.splitlines() if line.strip().endswith(('?', ')'))]
+
+    records = []
+    for parts in items:
+        text = ' '.join(parts)
+        help_text = ''
+        match = _HELP_RE.match(text)
+        if match and match.group(1):
+            text, help_text = match.group(1), match.group(2).strip()
+        records.append((text, help_text, []))
+    return records
+
+
+def _strip_values(path: str) -> str:
+    path = path.strip()
+    for prefix in ('.Values.', 'Values.'):
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return path
+
+
+def _unique_id(candidate: str, used: set) -> str:
+    base = _ID_RE.sub('-', candidate).strip('-') or 'q'
+    qid, suffix = base, 2
+    while qid in used:
+        qid = f"{base}-{suffix}"
+        suffix += 1
+    used.add(qid)
+    return qid
+
+
+def split_path(path: str) -> List[str]:
+    """Split a dotted values path into segments, e.g. 'ingress.hosts[].host' -> ['ingress', 'hosts', '[]', 'host']"""
+    segments: List[str] = []
+    for part in path.split('.'):
+        while part.endswith(LIST_ITEM):
+            part = part[:-len(LIST_ITEM)]
+            if part:
+                segments.append(part)
+                part = ''
+            segments.append(LIST_ITEM)
+        if part:
+            segments.append(part)
+    return segments
+
+
+def lookup_value(values: Any, path: str) -> Tuple[bool, Any]:
+    """Find a dotted path in parsed values.yaml; list items resolve to the first element"""
+    node = values
+    for segment in split_path(path):
+        if segment == LIST_ITEM:
+            if not isinstance(node, list) or not node:
+                return False, None
+            node = node[0]
+        elif isinstance(node, dict) and segment in node:
+            node = node[segment]
+        else:
+            return False, None
+    return True, node
+
+
+def value_type(value: Any) -> str:
+    """Schema type name for a values.yaml value"""
+    if value is None:
+        return UNKNOWN_TYPE
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'number'
+    if isinstance(value, list):
+        return 'list'
+    if isinstance(value, dict):
+        return 'object'
+    return 'string'
+
+
+def annotate_defaults(questions: List[Question], values: Any) -> List[Question]:
+    """Fill in type and default of single-path questions from the chart's values.yaml"""
+    for question in questions:
+        if len(question.paths) != 1:
+            question.type, question.default = UNKNOWN_TYPE, None
+            continue
+        found, value = lookup_value(values, question.paths[0])
+        question.type = value_type(value) if found else UNKNOWN_TYPE
+        question.default = value if found else None
+    return questions
+
+
+def dump_questions(questions: List[Question]) -> str:
+    """Serialize questions for the chart's questions file"""
+    return json.dumps({"version": SCHEMA_VERSION, "questions": [q.to_dict() for q in questions]},
+                      indent=2, ensure_ascii=False)
+
+
+def load_questions_json(content: Optional[str]) -> List[Question]:
+    """Parse a questions file written by dump_questions ([] for missing or unreadable files, with a warning)"""
+    if not content:
+        return []
+    try:
+        data = json.loads(content)
+    except ValueError as e:
+        logger.warning("❌ Questions file is not valid JSON (truncated?): %s", e)
+        return []
+    if not isinstance(data, dict) or data.get('version') != SCHEMA_VERSION:
+        version = data.get('version') if isinstance(data, dict) else None
+        logger.warning("❌ Questions file has schema version %r, expected %d", version, SCHEMA_VERSION)
+        return []
+    try:
+        return [Question.from_dict(item) for item in data.get('questions', [])]
+    except (AttributeError, KeyError, TypeError) as e:
+        logger.warning("❌ Questions file has malformed entries: %s", e)
+        return []
+
+
+def parse_values(content: Optional[str]) -> Dict[str, Any]:
+    """Parsed values.yaml ({} when missing or invalid)"""
+    if not content:
+        return {}
+    try:
+        values = yaml.load(content, Loader=FAST_SAFE_LOADER)
+    except yaml.YAMLError:
+        return {}
+    return values if isinstance(values, dict) else {}
+
+
+def load_question_set(questions_content: Optional[str], values_content: Optional[str]) -> List[Question]:
+    """Parse a chart's questions file and attach defaults from its values.yaml"""
+    return annotate_defaults(load_questions_json(questions_content), parse_values(values_content))
@@ -0,0 +1,188 @@
+"""Content-addressed cache for generated values.yaml responses"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import (
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_DB,
+)
+
+
+def _normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic differences do not change the key"""
+    return " ".join(str(text).split())
+
+
+class ResponseCache:
+    """Two-tier response cache: in-memory LRU with TTL plus an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = RESPONSE_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._db = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        """Open (and create if needed) the persistent SQLite tier"""
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pending (key TEXT PRIMARY KEY, expires REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @property
+    def persistent(self) -> bool:
+        """Whether responses are shared with other processes through SQLite"""
+        return self._db is not None
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, base_yaml: str,
+                 answers: Iterable[Tuple[str, str]]) -> str:
+        """Build a content hash from everything that influences the model output"""
+        qa_pairs = sorted((_normalize_text(q), _normalize_text(a)) for q, a in answers)
+        payload = json.dumps({
+            "provider": provider,
+            "model": model,
+            "temperature": temperature,
+            "base_yaml": base_yaml,
+            "qa_pairs": qa_pairs,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created):
+                        self._store_memory(key, value, created)
+                        self._hits += 1
+                        self._disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._misses += 1
+            return None
+
+    def peek(self, key: str) -> Optional[str]:
+        """Look up key in every tier without touching hit/miss counters"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                return entry[1]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    self._store_memory(key, row[0], row[1])
+                    return row[0]
+        return None
+
+    def try_claim(self, key: str, lease_seconds: float) -> bool:
+        """
+        Claim the right to compute key across processes sharing the SQLite tier.
+
+        Returns True when this caller should compute the value; claims expire after
+        lease_seconds so a crashed worker cannot block others forever.
+        """
+        if self._db is None:
+            return True
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM pending WHERE key = ? AND expires < ?", (key, now))
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO pending (key, expires) VALUES (?, ?)", (key, now + lease_seconds)
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def release_claim(self, key: str) -> None:
+        """Release a claim taken with try_claim"""
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM pending WHERE key = ?", (key,))
+            self._db.commit()
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in every enabled tier"""
+        created = time.time()
+        with self._lock:
+            self._store_memory(key, value, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created)
+                )
+                self._db.commit()
+
+    def _store_memory(self, key: str, value: str, created: float) -> None:
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached responses and reset counters"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+            self._hits = self._disk_hits = self._misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._db is not None,
+            }
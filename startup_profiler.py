@@ -0,0 +1,104 @@
+"""Per-module import timing for the CLI and API entry points"""
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Packages whose presence in a profile means an LLM stack was loaded
+HEAVY_PACKAGES = ('langchain', 'langchain_core', 'langchain_community', 'langchain_anthropic',
+                  'langchain_aws', 'openai', 'anthropic', 'boto3', 'botocore')
+
+
+class _TimingFinder:
+    """Meta path finder that lets the real finders locate a module, then times its loader"""
+
+    def __init__(self, profiler: 'ImportProfiler'):
+        self._profiler = profiler
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in list(sys.meta_path):
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Built-in and frozen modules are loaded by classes shared across modules; they are cheap anyway
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec
+        try:
+            loader.exec_module = self._profiler._timed(name, loader.exec_module)
+        except AttributeError:
+            pass
+        return spec
+
+
+class ImportProfiler:
+    """
+    Record how long each module takes to import while active.
+
+    Self time excludes the module's own imports; cumulative time includes them,
+    matching the columns of `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Tuple[float, float]] = {}
+        self._finder = _TimingFinder(self)
+        self._local = threading.local()
+
+    def start(self) -> 'ImportProfiler':
+        if self._finder not in sys.meta_path:
+            sys.meta_path.insert(0, self._finder)
+        return self
+
+    def stop(self) -> 'ImportProfiler':
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        return self
+
+    def __enter__(self) -> 'ImportProfiler':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _timed(self, name: str, exec_module):
+        def exec_timed(module):
+            stack = self._local.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += cumulative
+                self.records[name] = (cumulative - children, cumulative)
+        return exec_timed
+
+    def total_seconds(self) -> float:
+        """Time spent importing modules (sum of self times)"""
+        return sum(self_time for self_time, _ in self.records.values())
+
+    def loaded_heavy_packages(self) -> List[str]:
+        """Heavy LLM packages that were imported while profiling"""
+        return [name for name in HEAVY_PACKAGES if name in self.records]
+
+    def slowest(self, limit: int = 25) -> List[Tuple[str, Tuple[float, float]]]:
+        """Modules with the highest cumulative import time"""
+        return sorted(self.records.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+
+    def report(self, limit: int = 25) -> str:
+        """Human-readable table of the slowest imports"""
+        lines = [
+            f"⏱️  Startup imports: {len(self.records)} modules, {self.total_seconds() * 1000:.1f} ms importing",
+            f"{'self ms':>10} {'cumul ms':>10}  module",
+        ]
+        for name, (self_time, cumulative) in self.slowest(limit):
+            lines.append(f"{self_time * 1000:>10.1f} {cumulative * 1000:>10.1f}  {name}")
+        heavy = self.loaded_heavy_packages()
+        lines.append(f"📦 LLM packages loaded: {', '.join(heavy)}" if heavy else "📦 LLM packages loaded: none")
+        return "\n".join(lines)
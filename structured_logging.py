@@ -0,0 +1,150 @@
+"""Structured, level-controlled logging with request IDs and per-stage timing spans"""
+import json
+import logging
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config import LOG_FORMAT, LOG_LEVEL
+
+ROOT_LOGGER = 'helmbot'
+LOG_FORMATS = ('text', 'json')
+# Default level per mode: the CLI shows progress, the API server only warnings and errors
+MODE_LEVELS = {'cli': 'INFO', 'server': 'WARNING'}
+
+# Attributes every LogRecord has; anything else was passed with extra= and is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'request_tag'}
+
+
+class RequestTrace:
+    """Request ID and the timing spans recorded while serving one request"""
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def span_summary(self) -> str:
+        """Spans in the order they finished, e.g. 'parse_templates=12.1ms, llm_merge=2301.4ms'"""
+        return ", ".join(f"{span['span']}={span['duration_ms']}ms" for span in self.spans)
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar('helmbot_request_trace', default=None)
+_span_path: ContextVar[str] = ContextVar('helmbot_span_path', default='')
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the 'helmbot' hierarchy, so configure_logging controls it"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def current_request_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def request_scope(request_id: Optional[str] = None):
+    """Tag log lines and spans inside the block (and threads started with its context) with a request ID"""
+    trace = RequestTrace(request_id)
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def span(name: str, logger: Optional[logging.Logger] = None, **fields: Any):
+    """
+    Time one stage of a request. Nested spans are named by path (e.g.
+    'generate_yaml/llm_merge'); each is added to the request's trace and logged at DEBUG.
+    """
+    path = f"{_span_path.get()}/{name}" if _span_path.get() else name
+    token = _span_path.set(path)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _span_path.reset(token)
+        record = {'span': path, 'duration_ms': round((time.perf_counter() - start) * 1000, 2), **fields}
+        if failed:
+            record['failed'] = True
+        trace = _trace.get()
+        if trace is not None:
+            trace.spans.append(record)
+        (logger or get_logger('span')).debug("⏱️  %s took %.2f ms", path, record['duration_ms'], extra=record)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain messages for the CLI; timestamp, level and request ID prefixes for the server"""
+
+    def __init__(self, mode: str):
+        super().__init__('%(message)s' if mode == 'cli' else '%(asctime)s %(levelname)s %(name)s%(request_tag)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        request_id = getattr(record, 'request_id', None)
+        record.request_tag = f" [{request_id}]" if request_id else ""
+        return super().format(record)
+
+
+def configure_logging(mode: str = 'cli', level: Optional[str] = None, fmt: Optional[str] = None,
+                      stream=None) -> logging.Logger:
+    """
+    Configure HelmBot's loggers; the one place output format and level are decided.
+
+    Args:
+        mode: 'cli' (progress on stdout at INFO) or 'server' (warnings and errors on stderr)
+        level: Log level name; defaults to HELMBOT_LOG_LEVEL, then the mode's default
+        fmt: 'text' or 'json'; defaults to HELMBOT_LOG_FORMAT
+        stream: Output stream; defaults to stdout for the CLI and stderr for the server
+    """
+    if mode not in MODE_LEVELS:
+        raise ValueError(f"Unknown logging mode: {mode}. Options: {list(MODE_LEVELS)}")
+    fmt = (fmt or LOG_FORMAT).lower()
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {fmt}. Options: {list(LOG_FORMATS)}")
+    handler = logging.StreamHandler(stream or (sys.stdout if mode == 'cli' else sys.stderr))
+    handler.addFilter(_RequestIdFilter())
+    handler.setFormatter(JSONFormatter() if fmt == 'json' else TextFormatter(mode))
+    logger = logging.getLogger(ROOT_LOGGER)
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel((level or LOG_LEVEL or MODE_LEVELS[mode]).upper())
+    logger.propagate = False
+    return logger
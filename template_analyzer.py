@@ -0,0 +1,289 @@
+"""Analyzer for Go-template actions in Helm charts
+
+Tokenizes every {{ ... }} action once, tracks how `with`/`range` rebind the dot,
+follows `include`/`template` calls into `define`d helpers and reports the full
+dotted `.Values` paths the chart reads.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Comments may contain "}}", so they are matched before ordinary actions
+_ACTION_RE = re.compile(r'\{\{-?\s*/\*.*?\*/\s*-?\}\}|\{\{-?(.*?)\s*-?\}\}', re.S)
+_TOKEN_RE = re.compile(r'''
+    (?P<str>"(?:\\.|[^"\\])*"|`[^`]*`)
+  | (?P<char>'(?:\\.|[^'\\])+')
+  | (?P<num>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+  | (?P<var>\$[A-Za-z0-9_]*)(?P<varfields>(?:\.[A-Za-z0-9_]+)*)
+  | (?P<field>(?:\.[A-Za-z_][A-Za-z0-9_]*)+|\.)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>:=|=|\||\(|\)|,)
+  | (?P<other>\S)
+''', re.X)
+
+_BLOCK_OPENERS = ('if', 'with', 'range', 'define', 'block')
+LIST_ITEM = '[]'
+
+Path = Tuple[str, ...]
+
+
+def tokenize_action(body: str) -> List[list]:
+    """Split the body of one action into JSON-serializable tokens"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(body):
+        kind = match.lastgroup
+        if kind == 'varfields':
+            kind = 'var'
+        text = match.group(kind) if kind != 'var' else match.group('var')
+        if kind == 'str':
+            tokens.append(['str', text[1:-1]])
+        elif kind == 'var':
+            fields = [f for f in (match.group('varfields') or '').split('.') if f]
+            tokens.append(['ref', text, fields])
+        elif kind == 'field':
+            tokens.append(['ref', '.', [f for f in text.split('.') if f]])
+        elif kind in ('ident', 'op'):
+            tokens.append([kind, text])
+    return tokens
+
+
+def parse_template(content: str) -> Dict[str, Any]:
+    """
+    Parse a template file into top-level actions and the helpers it defines.
+
+    The result only contains lists, strings and dicts so it can be cached as JSON.
+    """
+    actions = [tokenize_action(m.group(1)) for m in _ACTION_RE.finditer(content) if m.group(1) is not None]
+    main: List[list] = []
+    defines: Dict[str, list] = {}
+    index = 0
+    while index < len(actions):
+        tokens = actions[index]
+        keyword = _keyword(tokens)
+        if keyword in ('define', 'block') and len(tokens) > 1 and tokens[1][0] == 'str':
+            body, index = _collect_body(actions, index + 1)
+            defines[tokens[1][1]] = body
+            if keyword == 'block':
+                # A block is a define plus an immediate template call
+                main.append([['ident', 'template']] + tokens[1:])
+            continue
+        main.append(tokens)
+        index += 1
+    return {'actions': main, 'defines': defines}
+
+
+def _keyword(tokens: List[list]) -> Optional[str]:
+    if tokens and tokens[0][0] == 'ident':
+        return tokens[0][1]
+    return None
+
+
+def _collect_body(actions: List[list], start: int) -> Tuple[List[list], int]:
+    """Collect actions up to the `end` matching an opened define/block"""
+    depth = 1
+    index = start
+    while index < len(actions):
+        keyword = _keyword(actions[index])
+        if keyword in _BLOCK_OPENERS:
+            depth += 1
+        elif keyword == 'end':
+            depth -= 1
+            if depth == 0:
+                return actions[start:index], index + 1
+        index += 1
+    return actions[start:], index
+
+
+def format_path(path: Path) -> str:
+    """Render a values path as a dotted string, e.g. ingress.hosts[].host"""
+    parts: List[str] = []
+    for segment in path:
+        if segment == LIST_ITEM and parts:
+            parts[-1] += LIST_ITEM
+        else:
+            parts.append(segment)
+    return '.'.join(parts)
+
+
+class TemplateAnalysis:
+    """Result of analyzing a chart's templates"""
+
+    def __init__(self, paths: Set[Path]):
+        self.paths = paths
+
+    @property
+    def variables(self) -> Set[str]:
+        """Dotted paths of the most specific values referenced (no parents of other paths)"""
+        parents = {path[:i] for path in self.paths for i in range(1, len(path))}
+        return {format_path(path) for path in self.paths if path not in parents}
+
+    @property
+    def all_paths(self) -> Set[str]:
+        """Dotted form of every referenced values path, including parents"""
+        return {format_path(path) for path in self.paths}
+
+    @property
+    def top_level_keys(self) -> Set[str]:
+        """Top-level keys of values.yaml the chart reads"""
+        return {path[0] for path in self.paths}
+
+    def value_tree(self) -> Dict[str, Any]:
+        """Nested dict of referenced values; list items appear under the '[]' key"""
+        tree: Dict[str, Any] = {}
+        for path in sorted(self.paths):
+            node = tree
+            for segment in path:
+                node = node.setdefault(segment, {})
+        return tree
+
+
+class TemplateAnalyzer:
+    """Collects parsed templates and resolves their .Values references"""
+
+    def __init__(self):
+        self._templates: List[Tuple[str, Dict[str, Any], Path]] = []
+        self._defines: Dict[str, Tuple[list, Path]] = {}
+
+    def add_template(self, name: str, content: str, values_prefix: Path = ()) -> None:
+        """Parse and add a template file"""
+        self.add_parsed(name, parse_template(content), values_prefix)
+
+    def add_parsed(self, name: str, parsed: Dict[str, Any], values_prefix: Path = ()) -> None:
+        """
+        Add an already parsed template.
+
+        values_prefix places a subchart's .Values under its key in the parent chart.
+        """
+        self._templates.append((name, parsed, tuple(values_prefix)))
+        for define_name, body in parsed['defines'].items():
+            self._defines[define_name] = (body, tuple(values_prefix))
+
+    def analyze(self) -> TemplateAnalysis:
+        """Walk every template from the chart root and collect .Values paths"""
+        self._paths: Set[Path] = set()
+        self._visited: Set[Tuple[str, Optional[Path]]] = set()
+        for _name, parsed, prefix in self._templates:
+            self._run(parsed['actions'], (), (), {}, prefix)
+        return TemplateAnalysis(self._paths)
+
+    def _run(self, actions: List[list], dot: Optional[Path], root: Optional[Path],
+             variables: Dict[str, Optional[Path]], prefix: Path) -> None:
+        """Interpret a sequence of actions, tracking the dot through control blocks"""
+        stack: List[Tuple[Optional[Path], Dict[str, Optional[Path]]]] = []
+        for tokens in actions:
+            keyword = _keyword(tokens)
+            if keyword == 'end':
+                if stack:
+                    dot, variables = stack.pop()
+                continue
+            if keyword == 'else':
+                if stack:
+                    dot, saved = stack[-1]
+                    variables = dict(saved)
+                rest = tokens[1:]
+                nested = _keyword(rest)
+                if nested in ('if', 'with', 'range'):
+                    dot, variables = self._open_block(nested, rest[1:], dot, root, variables, prefix)
+                continue
+            if keyword in ('if', 'with', 'range'):
+                stack.append((dot, dict(variables)))
+                dot, variables = self._open_block(keyword, tokens[1:], dot, root, variables, prefix)
+                continue
+
+            names, pipeline = _split_declaration(tokens)
+            self._scan(pipeline, dot, root, variables, prefix)
+            if names:
+                variables[names[-1]] = self._pipeline_value(pipeline, dot, root, variables)
+
+    def _open_block(self, keyword: str, tokens: List[list], dot: Optional[Path], root: Optional[Path],
+                    variables: Dict[str, Optional[Path]], prefix: Path):
+        """Enter an if/with/range block and return the dot and variables inside it"""
+        variables = dict(variables)
+        names, pipeline = _split_declaration(tokens)
+        self._scan(pipeline, dot, root, variables, prefix)
+        if keyword == 'if':
+            return dot, variables
+
+        value = self._pipeline_value(pipeline, dot, root, variables)
+        if keyword == 'range':
+            value = value + (LIST_ITEM,) if value is not None else None
+            if len(names) == 2:
+                variables[names[0]] = None
+        if names:
+            variables[names[-1]] = value
+        return value, variables
+
+    def _resolve(self, token: list, dot: Optional[Path], root: Optional[Path],
+                 variables: Dict[str, Optional[Path]]) -> Optional[Path]:
+        """Resolve a field/variable chain to a path from the chart root"""
+        _kind, base, fields = token
+        if base == '.':
+            start = dot
+        elif base == '$':
+            start = root
+        else:
+            start = variables.get(base)
+        if start is None:
+            return None
+        return start + tuple(fields)
+
+    def _record(self, path: Optional[Path], prefix: Path) -> None:
+        if path and path[0] == 'Values' and len(path) > 1:
+            # Subcharts share .Values.global with the parent instead of nesting it
+            if path[1] == 'global':
+                prefix = ()
+            self._paths.add(prefix + path[1:])
+
+    def _scan(self, tokens: List[list], dot: Optional[Path], root: Optional[Path],
+              variables: Dict[str, Optional[Path]], prefix: Path) -> None:
+        """Record every values reference in a pipeline and follow template calls"""
+        index = 0
+        while index < len(tokens):
+            kind, value = tokens[index][0], tokens[index][1]
+            if kind == 'ref':
+                after_paren = index > 0 and tokens[index - 1] == ['op', ')']
+                if not after_paren:
+                    self._record(self._resolve(tokens[index], dot, root, variables), prefix)
+            elif kind == 'ident' and value == 'index' and index + 1 < len(tokens) and tokens[index + 1][0] == 'ref':
+                path = self._resolve(tokens[index + 1], dot, root, variables)
+                index += 2
+                while path is not None and index < len(tokens) and tokens[index][0] == 'str':
+                    path = path + (tokens[index][1],)
+                    index += 1
+                self._record(path, prefix)
+                continue
+            elif kind == 'ident' and value in ('include', 'template') \
+                    and index + 1 < len(tokens) and tokens[index + 1][0] == 'str':
+                argument = tokens[index + 2] if index + 2 < len(tokens) else None
+                context = None
+                if argument is not None and argument[0] == 'ref':
+                    context = self._resolve(argument, dot, root, variables)
+                self._invoke(tokens[index + 1][1], context)
+            index += 1
+
+    def _invoke(self, name: str, context: Optional[Path]) -> None:
+        """Analyze a defined helper once per calling context"""
+        key = (name, context)
+        if key in self._visited or name not in self._defines:
+            return
+        self._visited.add(key)
+        body, prefix = self._defines[name]
+        # Inside a helper both the dot and $ refer to the argument it was called with
+        self._run(body, context, context, {}, prefix)
+
+    def _pipeline_value(self, tokens: List[list], dot: Optional[Path], root: Optional[Path],
+                        variables: Dict[str, Optional[Path]]) -> Optional[Path]:
+        """Path a pipeline evaluates to, when it starts with a plain field chain"""
+        if tokens and tokens[0][0] == 'ref':
+            return self._resolve(tokens[0], dot, root, variables)
+        return None
+
+
+def _split_declaration(tokens: List[list]) -> Tuple[List[str], List[list]]:
+    """Split `$a, $b := pipeline` into variable names and the pipeline"""
+    for index, token in enumerate(tokens):
+        if token[0] == 'op' and token[1] in (':=', '='):
+            names = [t[1] for t in tokens[:index] if t[0] == 'ref' and not t[2]]
+            return names, tokens[index + 1:]
+        if token[0] not in ('ref',) and token != ['op', ',']:
+            break
+    return [], tokens
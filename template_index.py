@@ -0,0 +1,313 @@
+"""Recursive template discovery and an incremental, persistent scan index"""
+import hashlib
+import json
+import os
+import tarfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    TEMPLATE_EXTENSIONS, TEMPLATE_INDEX_FILE,
+    TEMPLATE_SCAN_WORKERS, TEMPLATE_SCAN_EXECUTOR
+)
+from structured_logging import get_logger
+from template_analyzer import parse_template
+
+logger = get_logger(__name__)
+
+INDEX_VERSION = 1
+ARCHIVE_SUFFIX = '.tgz'
+# Below this many changed files a worker pool costs more than it saves
+_MIN_PARALLEL_FILES = 8
+
+# Template members of packaged subcharts by archive path, with the (mtime_ns, size) they were listed at
+_archive_members: Dict[str, Tuple[Tuple[int, int], List[str]]] = {}
+_archive_members_lock = threading.Lock()
+
+
+def discover_template_files(root_dir: str) -> List[str]:
+    """
+    List template files of a chart and its subcharts, relative to root_dir.
+
+    Files inside packaged subcharts are listed as '<archive>.tgz/<member path>'.
+    """
+    found: List[str] = []
+    _discover(root_dir, '', found)
+    return sorted(found)
+
+
+def _discover(root_dir: str, rel_base: str, found: List[str]) -> None:
+    templates_dir = os.path.join(root_dir, rel_base, 'templates')
+    for current, dirs, files in os.walk(templates_dir):
+        dirs.sort()
+        for fname in files:
+            if fname.endswith(TEMPLATE_EXTENSIONS):
+                rel = os.path.relpath(os.path.join(current, fname), root_dir)
+                found.append(rel.replace(os.sep, '/'))
+
+    charts_dir = os.path.join(root_dir, rel_base, 'charts')
+    if not os.path.isdir(charts_dir):
+        return
+    for entry in sorted(os.scandir(charts_dir), key=lambda e: e.name):
+        rel = f"{rel_base}charts/{entry.name}"
+        if entry.is_dir():
+            _discover(root_dir, rel + '/', found)
+        elif entry.is_file() and entry.name.endswith(ARCHIVE_SUFFIX):
+            found.extend(f"{rel}/{member}" for member in _archive_templates(entry.path))
+
+
+def _archive_templates(archive_path: str) -> List[str]:
+    """
+    Template members of a packaged (sub)chart, listed again only when the archive's
+    mtime or size changes. Unreadable archives are logged and contribute no templates.
+    """
+    try:
+        stat = os.stat(archive_path)
+    except FileNotFoundError:
+        return []
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(archive_path)
+    with _archive_members_lock:
+        cached = _archive_members.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        with tarfile.open(archive_path, 'r:gz') as tar:
+            members = sorted(
+                m.name for m in tar.getmembers()
+                if m.isfile() and '/templates/' in f"/{m.name}" and m.name.endswith(TEMPLATE_EXTENSIONS)
+            )
+    except (tarfile.TarError, OSError, EOFError) as e:
+        logger.warning('❌ Error reading %s: %s', archive_path, e)
+        members = []
+    with _archive_members_lock:
+        _archive_members[key] = (signature, members)
+    return members
+
+
+def values_prefix(rel_path: str) -> Tuple[str, ...]:
+    """Where a template's .Values live in the parent chart (one key per subchart level)"""
+    parts = rel_path.split('/')
+    prefix: List[str] = []
+    index = 0
+    while index < len(parts) - 1 and parts[index] != 'templates':
+        if parts[index] == 'charts':
+            name = parts[index + 1]
+            if name.endswith(ARCHIVE_SUFFIX) and index + 2 < len(parts):
+                # Packaged charts keep their name as the archive's top-level directory
+                name = parts[index + 2]
+                index += 1
+            prefix.append(name)
+            index += 2
+            continue
+        index += 1
+    return tuple(prefix)
+
+
+def _split_archive_path(rel_path: str) -> Tuple[Optional[str], str]:
+    """Split 'charts/x.tgz/x/templates/a.yaml' into the archive and member paths"""
+    marker = ARCHIVE_SUFFIX + '/'
+    if marker not in rel_path:
+        return None, rel_path
+    archive, member = rel_path.split(marker, 1)
+    return archive + ARCHIVE_SUFFIX, member
+
+
+def _read_and_parse(path: str) -> Tuple[str, Dict[str, Any]]:
+    """Read one template, returning its content hash and parsed form"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return _hash_and_parse(data)
+
+
+def _read_archive_and_parse(archive_path: str, members: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """Read and parse several members of one archive with a single decompression pass"""
+    results = {}
+    wanted = set(members)
+    with tarfile.open(archive_path, 'r:gz') as tar:
+        for member in tar.getmembers():
+            if member.name in wanted:
+                results[member.name] = _hash_and_parse(tar.extractfile(member).read())
+    return results
+
+
+def _hash_and_parse(data: bytes) -> Tuple[str, Dict[str, Any]]:
+    digest = hashlib.sha256(data).hexdigest()
+    return digest, parse_template(data.decode('utf-8'))
+
+
+class ScanStats:
+    """Timing and reuse counters for one scan"""
+
+    def __init__(self, total: int, reused: int, parsed: int, elapsed_ms: float, cold: bool):
+        self.total = total
+        self.reused = reused
+        self.parsed = parsed
+        self.elapsed_ms = elapsed_ms
+        self.cold = cold
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_files": self.total,
+            "reused": self.reused,
+            "parsed": self.parsed,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "cold": self.cold,
+        }
+
+    def __str__(self):
+        kind = "cold" if self.cold else "warm"
+        return (f"{kind} scan of {self.total} template files "
+                f"({self.reused} reused, {self.parsed} parsed) in {self.elapsed_ms:.1f} ms")
+
+
+class TemplateScanIndex:
+    """
+    Per-chart index of parsed templates keyed by path, mtime/size and content hash.
+
+    Unchanged files (same mtime and size) are never re-read; touched files whose
+    content hash is unchanged are not re-parsed. The index is persisted next to the
+    chart so warm scans also survive restarts.
+    """
+
+    def __init__(self, root_dir: str, workers: int = TEMPLATE_SCAN_WORKERS,
+                 executor: str = TEMPLATE_SCAN_EXECUTOR, index_file: Optional[str] = TEMPLATE_INDEX_FILE):
+        self.root_dir = root_dir
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.index_path = os.path.join(root_dir, index_file) if index_file else None
+        self.last_stats: Optional[ScanStats] = None
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def scan(self, files: Optional[List[str]] = None) -> List[Tuple[str, Dict[str, Any], Tuple[str, ...]]]:
+        """Return (relative path, parsed template, values prefix) for every template file"""
+        with self._lock:
+            start = time.perf_counter()
+            cold = self._entries is None and not self._load()
+            if files is None:
+                files = discover_template_files(self.root_dir)
+
+            entries = self._entries
+            fresh: Dict[str, Dict[str, Any]] = {}
+            stale_files: List[Tuple[str, Tuple[int, int]]] = []
+            stale_archives: Dict[str, Tuple[Tuple[int, int], List[str]]] = {}
+            for rel_path in files:
+                archive, member = _split_archive_path(rel_path)
+                stat_path = os.path.join(self.root_dir, *(archive or rel_path).split('/'))
+                try:
+                    stat = os.stat(stat_path)
+                except FileNotFoundError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                entry = entries.get(rel_path)
+                if entry is not None and tuple(entry['signature']) == signature:
+                    fresh[rel_path] = entry
+                elif archive:
+                    stale_archives.setdefault(archive, (signature, []))[1].append(member)
+                else:
+                    stale_files.append((rel_path, signature))
+
+            results = self._parse_stale(stale_files, stale_archives)
+            parsed_count = 0
+            for rel_path, (signature, digest, parsed) in results.items():
+                previous = entries.get(rel_path)
+                if previous is not None and previous['sha256'] == digest:
+                    parsed = previous['parsed']
+                else:
+                    parsed_count += 1
+                fresh[rel_path] = {'signature': list(signature), 'sha256': digest, 'parsed': parsed}
+
+            changed = fresh.keys() != entries.keys() or bool(results)
+            self._entries = fresh
+            if changed:
+                self._save()
+
+            self.last_stats = ScanStats(
+                total=len(fresh), reused=len(fresh) - parsed_count, parsed=parsed_count,
+                elapsed_ms=(time.perf_counter() - start) * 1000, cold=cold
+            )
+            return [(rel, fresh[rel]['parsed'], values_prefix(rel)) for rel in sorted(fresh)]
+
+    def _parse_stale(self, stale_files, stale_archives) -> Dict[str, Tuple[Tuple[int, int], str, Dict[str, Any]]]:
+        """Read, hash and parse changed files, in parallel when there are enough of them"""
+        results = {}
+        jobs = []
+        total = len(stale_files) + sum(len(members) for _, members in stale_archives.values())
+        pool = None
+        if total >= _MIN_PARALLEL_FILES and self.workers > 1:
+            pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+            pool = pool_class(max_workers=self.workers)
+        try:
+            submit = pool.submit if pool else _run_inline
+            for rel_path, signature in stale_files:
+                path = os.path.join(self.root_dir, *rel_path.split('/'))
+                jobs.append(('file', rel_path, signature, submit(_read_and_parse, path)))
+            for archive, (signature, members) in stale_archives.items():
+                path = os.path.join(self.root_dir, *archive.split('/'))
+                jobs.append(('archive', archive, signature, submit(_read_archive_and_parse, path, members)))
+
+            for kind, rel_path, signature, future in jobs:
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    logger.warning('❌ Error reading %s: %s', rel_path, e)
+                    continue
+                if kind == 'file':
+                    results[rel_path] = (signature,) + outcome
+                else:
+                    for member, member_outcome in outcome.items():
+                        results[f"{rel_path}/{member}"] = (signature,) + member_outcome
+        finally:
+            if pool:
+                pool.shutdown()
+        return results
+
+    def _load(self) -> bool:
+        """Load the persisted index; returns False when there is none to reuse"""
+        self._entries = {}
+        if not self.index_path or not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != INDEX_VERSION:
+            return False
+        self._entries = data.get('files', {})
+        return True
+
+    def _save(self) -> None:
+        """Persist the index atomically (best effort: read-only charts just stay in memory)"""
+        if not self.index_path:
+            return
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'files': self._entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class _Done:
+    """Minimal future for work run on the calling thread"""
+
+    def __init__(self, func, *args):
+        try:
+            self._result, self._error = func(*args), None
+        except Exception as e:
+            self._result, self._error = None, e
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def _run_inline(func, *args):
+    return _Done(func, *args)
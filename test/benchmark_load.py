@@ -0,0 +1,219 @@
+"""
+Load-test the API in-process against the offline fake provider
+
+Drives /questions and /generate-yaml through the FastAPI app (no network, no API key)
+at a configurable concurrency and reports p50/p95/p99 latency, throughput and memory,
+so HelmBot's own overhead can be measured without a real model. Results are saved as
+JSON tagged with the git commit; pass --baseline with an earlier result to compare.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(ROOT)
+
+ENDPOINTS = ('questions', 'generate-yaml')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint (default: 200)")
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent clients (default: 16)")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="comma-separated endpoints to drive")
+    parser.add_argument('--latency-ms', type=float, default=50, help="fake model median latency (default: 50)")
+    parser.add_argument('--distribution', default='lognormal', choices=('fixed', 'uniform', 'lognormal'))
+    parser.add_argument('--spread', type=float, default=0.5, help="latency spread (default: 0.5)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of model calls that fail")
+    parser.add_argument('--error-kind', default='throttled', choices=('throttled', 'transient', 'fatal'))
+    parser.add_argument('--distinct', type=int, default=0,
+                        help="distinct answer sets for /generate-yaml; 0 makes every request unique (default: 0)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results JSON here (default: benchmark_load-<commit>.json in the temp dir)")
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    return parser.parse_args(argv)
+
+
+def configure(args):
+    """Point HelmBot at the fake provider and a scratch copy of the sample chart (before importing it)"""
+    os.environ.update({
+        'HELMBOT_PROVIDER': 'fake',
+        'HELMBOT_FAKE_LATENCY_MS': str(args.latency_ms),
+        'HELMBOT_FAKE_LATENCY_DISTRIBUTION': args.distribution,
+        'HELMBOT_FAKE_LATENCY_SPREAD': str(args.spread),
+        'HELMBOT_FAKE_ERROR_RATE': str(args.error_rate),
+        'HELMBOT_FAKE_ERROR_KIND': args.error_kind,
+        'HELMBOT_FAKE_SEED': str(args.seed),
+        'HELMBOT_PERSIST_OUTPUT': '0',
+    })
+    os.environ.pop('HELMBOT_RESPONSE_CACHE_DB', None)
+    os.environ.pop('HELMBOT_FAILOVER_PROVIDERS', None)
+    workdir = tempfile.mkdtemp(prefix='helmbot-bench-')
+    shutil.copytree(os.path.join(ROOT, 'sample_helm'), os.path.join(workdir, 'sample_helm'),
+                    ignore=shutil.ignore_patterns('generated*', '.helmbot*', '*.lock'))
+    os.environ['HELMBOT_CHARTS_DIR'] = workdir
+    os.chdir(workdir)
+    return workdir
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(latencies, statuses, seconds):
+    ordered = sorted(latencies)
+    as_ms = lambda value: round(value * 1000, 2) if value is not None else None
+    codes = {}
+    for status in statuses:
+        codes[str(status)] = codes.get(str(status), 0) + 1
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "status_codes": codes,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(latencies) / seconds, 2) if seconds else None,
+        "latency_ms": {
+            "mean": as_ms(sum(ordered) / len(ordered)) if ordered else None,
+            "p50": as_ms(percentile(ordered, 0.50)),
+            "p95": as_ms(percentile(ordered, 0.95)),
+            "p99": as_ms(percentile(ordered, 0.99)),
+            "max": as_ms(ordered[-1] if ordered else None),
+        },
+    }
+
+
+async def drive(client, requests, concurrency, make_request):
+    """Send `requests` requests from `concurrency` workers; return latencies, statuses and wall time"""
+    latencies, statuses = [], []
+    counter = iter(range(requests))
+
+    async def worker():
+        for index in counter:
+            start = time.perf_counter()
+            response = await make_request(client, index)
+            latencies.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def run_benchmark(args):
+    import httpx
+    from api import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://helmbot", timeout=None) as client:
+        # Cold start: building the service and generating the chart's questions
+        start = time.perf_counter()
+        response = await client.get("/questions")
+        response.raise_for_status()
+        results["cold_start_seconds"] = round(time.perf_counter() - start, 3)
+        known_question = response.json()["questions"][0]
+
+        async def questions(client, index):
+            return await client.get("/questions")
+
+        async def generate_yaml(client, index):
+            variant = index % args.distinct if args.distinct else index
+            qa_pairs = [
+                # Applied locally by the deterministic merger
+                {"question": known_question, "answer": str(variant % 5 + 1)},
+                # Free-form, so it needs a (fake) model call
+                {"question": "Anything else to configure?", "answer": f"Add the label team=payments-{variant}"},
+            ]
+            return await client.post("/generate-yaml", json={"qa_pairs": qa_pairs})
+
+        workloads = {'questions': questions, 'generate-yaml': generate_yaml}
+        for endpoint in [name.strip() for name in args.endpoints.split(',') if name.strip()]:
+            tracemalloc.start()
+            latencies, statuses, seconds = await drive(client, args.requests, args.concurrency, workloads[endpoint])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[endpoint] = summarize(latencies, statuses, seconds)
+            results[endpoint]["peak_traced_memory_mb"] = round(peak / 1024 / 1024, 2)
+            print(f"✅ /{endpoint}: {results[endpoint]['throughput_rps']} req/s, "
+                  f"p50 {results[endpoint]['latency_ms']['p50']} ms, p99 {results[endpoint]['latency_ms']['p99']} ms")
+
+        service = await main.lifecycle.get()
+        results["llm"] = {"pools": service.get_llm_pool_stats(), "cache": service.get_cache_stats()}
+        main.lifecycle.shutdown()
+    return results
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(rss / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print the change of each endpoint's latency percentiles and throughput against a baseline"""
+    print(f"\n📈 Compared with {baseline.get('commit') or 'baseline'}:")
+    for endpoint in ENDPOINTS:
+        if endpoint not in results or endpoint not in baseline:
+            continue
+        current, previous = results[endpoint], baseline[endpoint]
+        changes = []
+        for label, now, before in [
+            *[(q, current['latency_ms'][q], previous['latency_ms'][q]) for q in ('p50', 'p95', 'p99')],
+            ('req/s', current['throughput_rps'], previous['throughput_rps']),
+        ]:
+            if now is not None and before:
+                changes.append(f"{label} {now} ({(now - before) / before * 100:+.1f}%)")
+        print(f"  /{endpoint}: " + ", ".join(changes))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = configure(args)
+    print(f"🏋️  {args.requests} requests per endpoint, concurrency {args.concurrency}, "
+          f"fake model {args.distribution} {args.latency_ms} ms")
+    try:
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        os.chdir(ROOT)
+    results.update({
+        "commit": git_commit(),
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "max_rss_mb": max_rss_mb(),
+        "config": {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+    })
+    output = args.output or os.path.join(workdir, f"benchmark_load-{results['commit'] or 'unknown'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {output} (max RSS {results['max_rss_mb']} MB)")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark merge prompt size before and after prompt slimming
+
+Compares the full-values.yaml prompt with the slimmed prompt for the sample chart and a
+synthetic bitnami-sized chart, and times the local slimming and splice steps.
+Pass --live to also time real model calls with the configured provider.
+"""
+import sys
+import os
+import argparse
+import time
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_slimmer import PromptSlimmer, estimate_tokens
+from yaml_generator import YAMLGenerator
+
+SAMPLE_VALUES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm', 'values.yaml')
+
+SAMPLE_ANSWERS = [
+    ("Should the app scale automatically, and at what CPU usage?", "Yes, between 2 and 6 replicas at 70% CPU"),
+    ("What port should the service expose?", "8080"),
+]
+LARGE_ANSWERS = [
+    ("Do you want Prometheus metrics?", "Yes, with a ServiceMonitor scraping every 15s"),
+    ("How much storage does the primary database need?", "Persistence of 50Gi on the fast storage class"),
+    ("What resources should the primary get?", "1 CPU and 2Gi memory"),
+]
+
+
+def synthetic_values(components=60):
+    """values.yaml shaped like a large bitnami chart (a few thousand lines)"""
+    values = {'global': {'imageRegistry': '', 'imagePullSecrets': [], 'storageClass': ''}}
+    section = {
+        'enabled': False,
+        'replicaCount': 1,
+        'image': {'registry': 'docker.io', 'repository': 'bitnami/app', 'tag': '1.0.0', 'pullPolicy': 'IfNotPresent'},
+        'resources': {'limits': {}, 'requests': {}},
+        'podSecurityContext': {'enabled': True, 'fsGroup': 1001},
+        'containerSecurityContext': {'enabled': True, 'runAsUser': 1001, 'runAsNonRoot': True},
+        'livenessProbe': {'enabled': True, 'initialDelaySeconds': 30, 'periodSeconds': 10,
+                          'timeoutSeconds': 5, 'failureThreshold': 6, 'successThreshold': 1},
+        'readinessProbe': {'enabled': True, 'initialDelaySeconds': 5, 'periodSeconds': 10,
+                           'timeoutSeconds': 5, 'failureThreshold': 6, 'successThreshold': 1},
+        'nodeSelector': {}, 'tolerations': [], 'affinity': {},
+        'extraEnvVars': [], 'extraVolumes': [], 'extraVolumeMounts': [],
+    }
+    for index in range(components):
+        values[f'component{index}'] = dict(section)
+    values['primary'] = dict(section, persistence={'enabled': True, 'storageClass': '', 'size': '8Gi',
+                                                   'accessModes': ['ReadWriteOnce']})
+    values['metrics'] = {'enabled': False, 'serviceMonitor': {'enabled': False, 'interval': '30s'},
+                         'resources': {'limits': {}, 'requests': {}}}
+    return yaml.safe_dump(values, sort_keys=False)
+
+
+def measure(label, base_yaml, answers, generator, runs=50):
+    """Print full versus slimmed prompt size and local slimming overhead"""
+    full_prompt = generator.build_prompt(base_yaml, answers)
+    slimmer = PromptSlimmer()
+    start = time.perf_counter()
+    for _ in range(runs):
+        slim = slimmer.slim(base_yaml, answers)
+        slim_prompt = generator.build_prompt(slim.prompt_yaml, answers, excerpt=slim.is_excerpt)
+    slim_ms = (time.perf_counter() - start) * 1000 / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        slim.splice(slim.prompt_yaml)
+    splice_ms = (time.perf_counter() - start) * 1000 / runs
+
+    full_tokens, slim_tokens = estimate_tokens(full_prompt), estimate_tokens(slim_prompt)
+    print(f"\n📊 {label}: values.yaml {len(base_yaml.splitlines())} lines")
+    print(f"   sections sent: {['.'.join(p) for p in slim.selected] or 'full document'}")
+    print(f"   full prompt:   {len(full_prompt):>7} chars  ~{full_tokens:>6} tokens")
+    print(f"   slim prompt:   {len(slim_prompt):>7} chars  ~{slim_tokens:>6} tokens "
+          f"({100 * (1 - slim_tokens / full_tokens):.0f}% smaller)")
+    print(f"   local cost:    slim {slim_ms:.2f} ms, splice {splice_ms:.2f} ms")
+    return full_prompt, slim_prompt
+
+
+def time_model(llm, prompt):
+    start = time.perf_counter()
+    llm.invoke(prompt)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--live', action='store_true', help='also time model calls with the configured provider')
+    args = parser.parse_args()
+
+    class _NoLLM:
+        provider = None
+
+    generator = YAMLGenerator(_NoLLM(), cache=None)
+    with open(SAMPLE_VALUES, 'r', encoding='utf-8') as f:
+        sample_yaml = f.read()
+    cases = [
+        ("sample_helm", sample_yaml, SAMPLE_ANSWERS),
+        ("synthetic large chart", synthetic_values(), LARGE_ANSWERS),
+    ]
+    prompts = [(label,) + measure(label, base, answers, generator) for label, base, answers in cases]
+
+    if args.live:
+        from llm_manager import LLMManager
+        llm = LLMManager().get_gpt4_llm()
+        for label, full_prompt, slim_prompt in prompts:
+            full_s, slim_s = time_model(llm, full_prompt), time_model(llm, slim_prompt)
+            print(f"\n⏱️  {label}: model latency full {full_s:.2f} s, slim {slim_s:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,26 @@ def main():
         "demo_api_setup.py",
         "test_llm_claude.py",
         "test_service.py",
+        "test_response_cache.py",
+        "test_chart_registry.py",
+        "test_template_analyzer.py",
+        "test_template_index.py",
+        "test_question_cache.py",
+        "test_prewarm.py",
+        "test_question_schema.py",
+        "test_single_flight.py",
+        "test_values_merger.py",
+        "test_answer_normalizer.py",
+        "test_prompt_slimmer.py",
+        "test_yaml_validator.py",
+        "test_llm_pool.py",
+        "test_llm_scheduler.py",
+        "test_llm_failover.py",
+        "test_batch.py",
+        "test_fake_provider.py",
+        "test_llm_metrics.py",
+        "test_structured_logging.py",
+        "test_startup.py",
         "test_complete_flow.py",
         "test_bedrock.py",  # AWS Bedrock tests
         # "test_api_key_prompting.py",  # Skip this as it requires user input
@@ -0,0 +1,175 @@
+"""
+Test answer normalization and its effect on merging and response caching
+"""
+import sys
+import os
+import shutil
+import tempfile
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_normalizer import AnswerNormalizer, answer_kind, normalize_answer
+from chart_registry import ChartContext
+from question_schema import Question, dump_questions
+from response_cache import ResponseCache
+from values_merger import ValuesMerger, split_image_reference
+from yaml_generator import YAMLGenerator
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+
+QUESTIONS = [
+    Question('autoscaling.enabled', 'Do you want to enable autoscaling for this application?',
+             help='Controls whether the application automatically scales', paths=['autoscaling.enabled'], type='boolean'),
+    Question('replicaCount', 'How many replicas of the application do you want to run?', paths=['replicaCount'], type='integer'),
+    Question('image.repository', 'What container image do you want to use?', paths=['image.repository']),
+    Question('resources.limits.memory', 'Memory limit per pod?', paths=['resources.limits.memory']),
+    Question('resources.limits.cpu', 'CPU limit per pod?', paths=['resources.limits.cpu']),
+]
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Provider:
+    def get_provider_name(self):
+        return "fake"
+
+
+class RecordingLLMManager:
+    """Stand-in LLM manager that records merge prompts"""
+
+    def __init__(self, content):
+        self.content = content
+        self.prompts = []
+        self.provider = _Provider()
+
+    def get_gpt4_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return _Response(self.content)
+
+
+def test_canonical_forms():
+    """Booleans, integers, quantities, image references and whitespace have one spelling"""
+    print("🧪 Testing canonical answer forms...")
+    cases = {
+        'boolean': [("Yes", "true"), (" TRUE ", "true"), ("disabled", "false"), ("maybe", "maybe")],
+        'integer': [("3", "3"), (" 3 replicas", "3"), ("three", "3"), ("twenty-five pods", "25")],
+        'memory': [("512 MiB", "512Mi"), ("0.5Gi", "512Mi"), ("1024Mi", "1Gi"), ("1G", "1G"), ("512m", "512m"),
+                   ("512 MB", "512M"), ("2 gigabytes", "2G"), ("1000 bytes", "1000"), ("1.5k", "1500")],
+        'cpu': [("0.5", "500m"), ("500 millicores", "500m"), ("1000m", "1"), ("2 vCPUs", "2")],
+        'image': [("docker.io/library/NGINX:1.25", "nginx:1.25"), ("registry:5000/team/app:V1", "registry:5000/team/app:V1"),
+                  ("book-my-hotel", "book-my-hotel")],
+        'string': [("  my   service\taccount ", "my service account"), ('"quoted"', "quoted")],
+    }
+    for kind, pairs in cases.items():
+        for answer, expected in pairs:
+            assert normalize_answer(answer, kind) == expected, (kind, answer, normalize_answer(answer, kind))
+    assert split_image_reference("registry:5000/app") == ("registry:5000/app", None)
+    assert split_image_reference("not an image") is None
+    print(f"✅ {sum(len(pairs) for pairs in cases.values())} answers canonicalized")
+
+
+def test_question_matching_and_kinds():
+    """UI numbering and help notes are ignored; unknown questions are typed by their wording"""
+    normalized = AnswerNormalizer().normalize([
+        ("1. Do you want to enable autoscaling for this application? (Controls whether the application automatically scales)", "Yes"),
+        ("3.  How many replicas of the application  do you want to run?", "three"),
+        ("How much memory should the worker get?", "2 GiB"),
+        ("Should the worker run as root?", "No."),
+        ("Anything else?", "  add   a team label "),
+    ], QUESTIONS)
+    assert normalized == [
+        ("Do you want to enable autoscaling for this application?", "true"),
+        ("How many replicas of the application do you want to run?", "3"),
+        ("How much memory should the worker get?", "2Gi"),
+        ("Should the worker run as root?", "false"),
+        ("Anything else?", "add a team label"),
+    ]
+    assert answer_kind(QUESTIONS[3], QUESTIONS[3].text) == 'memory'
+    assert answer_kind(QUESTIONS[2], QUESTIONS[2].text) == 'image'
+    # Paths values.yaml does not define are typed by their wording, like unmatched questions
+    undefined = Question('ingress.enabled', 'Do you want an ingress?', paths=['ingress.enabled'], type='unknown')
+    assert answer_kind(undefined, undefined.text) == 'boolean'
+    print("✅ Questions matched to the chart's wording and answers typed")
+
+
+def test_image_wording_does_not_canonicalize():
+    """Only image/repository paths are read as image references; case-sensitive answers are kept"""
+    answers = [
+        ("Which image pull policy should be used?", "IfNotPresent"),
+        ("What image tag should be deployed?", "RC-Build1"),
+        ("Which secret should be used to pull the image?", "MySecret"),
+    ]
+    assert AnswerNormalizer().normalize(answers, QUESTIONS) == answers
+    tag = Question('image.tag', 'Image tag?', paths=['image.tag'])
+    assert AnswerNormalizer().normalize([("Image tag?", "RC-Build1")], [tag]) == [("Image tag?", "RC-Build1")]
+    assert normalize_answer("MyOrg/App:RC-Build1", answer_kind(QUESTIONS[2], QUESTIONS[2].text)) == "myorg/app:RC-Build1"
+    print("✅ Pull policies, tags and secret names keep their case")
+
+
+def test_image_reference_split():
+    """A 'repo:tag' answer for an image repository sets both repository and tag"""
+    base = {'image': {'repository': 'nginx', 'tag': 'latest', 'pullPolicy': 'IfNotPresent'}}
+    questions = [Question('image.repository', 'Image?', paths=['image.repository']),
+                 Question('image', 'Which image object?', paths=['image'], type='object')]
+    result = ValuesMerger().merge(base, [("Image?", "myorg/app:2.1")], questions)
+    assert result.values['image'] == {'repository': 'myorg/app', 'tag': '2.1', 'pullPolicy': 'IfNotPresent'}
+    result = ValuesMerger().merge(base, [("Which image object?", "ghcr.io/team/api:v3")], questions)
+    assert result.values['image']['repository'] == 'ghcr.io/team/api' and result.values['image']['tag'] == 'v3'
+    assert not result.leftovers and base['image']['tag'] == 'latest'
+    print("✅ Image references split into repository and tag")
+
+
+def test_equivalent_answers_share_cache():
+    """Differently phrased but equivalent answer sets cost one model call"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root)
+        chart = ChartContext('chart', root)
+        with open(chart.questions_path, 'w') as f:
+            f.write(dump_questions(QUESTIONS))
+        # Limits are only written locally when values.yaml defines them
+        with open(chart.values_path) as f:
+            values = f.read().replace("resources: {}", "resources:\n  limits:\n    memory: 256Mi\n    cpu: 100m")
+        with open(chart.values_path, 'w') as f:
+            f.write(values)
+
+        llm_manager = RecordingLLMManager("sidecar:\n  memory: 512Mi")
+        generator = YAMLGenerator(llm_manager, cache=ResponseCache(db_path=None))
+        first = generator.generate_values_yaml_with_source([
+            ("2. How many replicas of the application do you want to run?", "three"),
+            ("How much memory should the sidecar get?", "512 MiB"),
+        ], chart=chart)
+        second = generator.generate_values_yaml_with_source([
+            ("How many replicas of the application do you want to run?", " 3 replicas"),
+            ("How much  memory should the sidecar get?", "0.5Gi"),
+        ], chart=chart)
+        assert (first[1], second[1]) == ('model', 'cache') and first[0] == second[0]
+        assert len(llm_manager.prompts) == 1 and "512Mi" in llm_manager.prompts[0]
+        assert yaml.safe_load(first[0])['replicaCount'] == 3
+
+        merged, source = generator.generate_values_yaml_with_source([
+            ("1. Do you want to enable autoscaling for this application? (Controls whether the application automatically scales)", "Yes"),
+            ("Memory limit per pod?", "1 GiB"),
+            ("CPU limit per pod?", "0.5 cores"),
+        ], chart=chart)
+        limits = yaml.safe_load(merged)['resources']['limits']
+        assert source == 'merged' and limits == {'memory': '1Gi', 'cpu': '500m'}
+    print("✅ Equivalent answers hit the cache; typed answers merged without the model")
+
+
+if __name__ == "__main__":
+    test_canonical_forms()
+    test_question_matching_and_kinds()
+    test_image_wording_does_not_canonicalize()
+    test_image_reference_split()
+    test_equivalent_answers_share_cache()
+    print("\n🎉 All answer normalizer tests passed!")
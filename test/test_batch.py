@@ -0,0 +1,199 @@
+"""
+Test batch generation of many values.yaml files with a fake generator
+"""
+import sys
+import os
+import asyncio
+import io
+import json
+import tempfile
+import threading
+import time
+import zipfile
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from api import main
+from api.lifecycle import ServiceLifecycle
+from api.service import HelmBotService
+from batch_runner import BatchItem, BatchRunner, load_batch_items, run_to_directory
+from chart_registry import ChartNotFoundError
+from llm_scheduler import BATCH, current_priority
+
+
+class FakeGenerator:
+    """Records calls, overlap and priority; a chart named 'missing' fails"""
+
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.priorities = set()
+
+    async def __call__(self, qa_pairs, chart, use_cache):
+        self.calls.append((tuple(qa_pairs), chart))
+        self.priorities.add(current_priority())
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            # Longer answers take longer, so completion order differs from request order
+            await asyncio.sleep(0.01 * len(qa_pairs[0][1]))
+            if chart == "missing":
+                raise ChartNotFoundError("Chart 'missing' not found")
+            return f"# {chart or 'default'}\nanswer: {qa_pairs[0][1]}\n", "model"
+        finally:
+            self.active -= 1
+
+
+def test_runner_dedupes_and_bounds_concurrency():
+    """Identical sets run once, at batch priority, at most max_concurrency at a time"""
+    print("🧪 Testing batch runner...")
+    generator = FakeGenerator()
+    items = [
+        BatchItem("slow", [("Name?", "aaaaaaaaaa")]),
+        BatchItem("fast", [("Name?", "a")]),
+        BatchItem("copy", [("Name?", "a")]),
+        BatchItem("other-chart", [("Name?", "a")], chart="web"),
+        BatchItem("broken", [("Name?", "aa")], chart="missing"),
+        BatchItem("empty", []),
+    ]
+
+    async def run():
+        return [result async for result in BatchRunner(generator, max_concurrency=2).arun(items)]
+
+    results = asyncio.run(run())
+    by_id = {result["id"]: result for result in results}
+    assert len(results) == 6 and len(generator.calls) == 4
+    assert generator.peak == 2 and generator.priorities == {BATCH}
+    assert by_id["copy"]["yaml"] == by_id["fast"]["yaml"] and by_id["copy"]["duplicate_of"] == "fast"
+    assert by_id["other-chart"]["yaml"].startswith("# web") and by_id["other-chart"]["source"] == "model"
+    assert not by_id["broken"]["ok"] and by_id["broken"]["error_type"] == "ChartNotFoundError"
+    assert not by_id["empty"]["ok"] and "No question-answer pairs" in by_id["empty"]["error"]
+    assert [r["id"] for r in results].index("slow") > [r["id"] for r in results].index("fast")
+    print(f"✅ {len(items)} items, {len(generator.calls)} generations, peak concurrency {generator.peak}")
+
+
+class _StubService:
+    """Service whose batch path runs the real HelmBotService code over a fake generator"""
+
+    astream_batch = HelmBotService.astream_batch
+
+    def __init__(self):
+        self.generator = FakeGenerator()
+
+    async def _agenerate_batch_item(self, qa_pairs, chart_id, use_cache):
+        return await self.generator(qa_pairs, chart_id, use_cache)
+
+    def shutdown(self):
+        pass
+
+
+def _payload(*answers, **extra):
+    items = [{"id": f"svc-{i}", "qa_pairs": [{"question": "Name?", "answer": a}]} for i, a in enumerate(answers)]
+    return {"items": items, **extra}
+
+
+def test_batch_endpoint_ndjson_and_zip():
+    """Results stream back as NDJSON lines or are bundled as a zip"""
+    stub = _StubService()
+    original = main.lifecycle
+    main.lifecycle = ServiceLifecycle(lambda: stub)
+    try:
+        with TestClient(main.app) as client:
+            response = client.post("/generate-yaml/batch", json=_payload("abc", "a", "abc"))
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            results = [json.loads(line) for line in response.text.splitlines()]
+            assert sorted(r["id"] for r in results) == ["svc-0", "svc-1", "svc-2"]
+            assert all(r["ok"] for r in results) and len(stub.generator.calls) == 2
+
+            response = client.post("/generate-yaml/batch", params={"format": "zip"},
+                                   json=_payload("abc", "a", bypass_cache=True))
+            assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+            archive = zipfile.ZipFile(io.BytesIO(response.content))
+            assert set(archive.namelist()) == {"svc-0.yaml", "svc-1.yaml", "results.json"}
+            assert "answer: abc" in archive.read("svc-0.yaml").decode()
+            manifest = json.loads(archive.read("results.json"))
+            assert {entry["file"] for entry in manifest} == {"svc-0.yaml", "svc-1.yaml"}
+
+            assert client.post("/generate-yaml/batch", json={"items": []}).status_code == 400
+            duplicate_ids = {"items": [{"id": "x", "qa_pairs": []}, {"id": "x", "qa_pairs": []}]}
+            assert client.post("/generate-yaml/batch", json=duplicate_ids).status_code == 400
+            assert client.post("/generate-yaml/batch", params={"format": "tar"}, json=_payload("a")).status_code == 400
+    finally:
+        main.lifecycle = original
+    print("✅ Batch endpoint streamed NDJSON and bundled a zip")
+
+
+def test_load_batch_items():
+    """JSON records, lists, batch request bodies and JSONL lines are all accepted"""
+    sample = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'sampleinput.json')
+    with open(sample, 'r', encoding='utf-8') as f:
+        items = load_batch_items(f.read())
+    assert len(items) == 1 and items[0].id == "0" and len(items[0].qa_pairs) > 1
+
+    jsonl = "\n".join([
+        json.dumps({"id": "web", "chart": "web-chart", "qa_pairs": [{"question": "Replicas?", "answer": "3"}]}),
+        "",
+        json.dumps({"qa_pairs": [["Replicas?", "1"]]}),
+    ])
+    items = load_batch_items(jsonl)
+    assert [(i.id, i.chart, i.qa_pairs) for i in items] == [
+        ("web", "web-chart", [("Replicas?", "3")]),
+        ("1", None, [("Replicas?", "1")]),
+    ]
+    assert [i.id for i in load_batch_items(json.dumps({"items": [{"qa_pairs": []}]}))] == ["0"]
+    try:
+        load_batch_items(json.dumps([{"id": "a", "qa_pairs": []}, {"id": "a", "qa_pairs": []}]))
+        assert False, "duplicate ids should be rejected"
+    except ValueError:
+        pass
+    print("✅ Parsed JSON, JSONL and batch request input")
+
+
+def test_run_to_directory():
+    """A worker pool writes one file per record and a report of latency, sources and failures"""
+    threads = set()
+
+    def generate(qa_pairs, chart, use_cache):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        if chart == "missing":
+            raise ChartNotFoundError("Chart 'missing' not found")
+        source = "cache" if qa_pairs[0][1] == "cached" else "model"
+        return f"answer: {qa_pairs[0][1]}\n", source
+
+    items = [
+        BatchItem("api/web", [("Q?", "one")]),
+        BatchItem("api_web", [("Q?", "three")]),
+        BatchItem("worker", [("Q?", "cached")]),
+        BatchItem("worker-copy", [("Q?", "cached")]),
+        BatchItem("broken", [("Q?", "two")], chart="missing"),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_to_directory(items, generate, tmp, workers=3)
+        assert sorted(os.listdir(tmp)) == ["api_web.yaml", "api_web_.yaml", "worker-copy.yaml", "worker.yaml"]
+        with open(os.path.join(tmp, "worker-copy.yaml")) as f:
+            assert f.read() == "answer: cached\n"
+        # "api/web" and "api_web" sanitize to the same name; neither overwrites the other
+        files = {item["id"]: item.get("file") for item in report["items"]}
+        with open(files["api/web"]) as first, open(files["api_web"]) as second:
+            assert (first.read(), second.read()) == ("answer: one\n", "answer: three\n")
+    assert (report["total"], report["succeeded"], report["failed"]) == (5, 4, 1)
+    assert report["sources"] == {"model": 2, "cache": 1, "duplicate": 1}
+    assert report["latency_seconds"]["p50"] >= 0.02
+    broken = next(item for item in report["items"] if item["id"] == "broken")
+    assert broken["error_type"] == "ChartNotFoundError" and "yaml" not in broken
+    assert len(threads) > 1 and all(name.startswith("helmbot-batch") for name in threads)
+    print(f"✅ Wrote {report['succeeded']} files with {len(threads)} workers")
+
+
+if __name__ == "__main__":
+    test_runner_dedupes_and_bounds_concurrency()
+    test_batch_endpoint_ndjson_and_zip()
+    test_load_batch_items()
+    test_run_to_directory()
+    print("\n🎉 All batch tests passed!")
@@ -0,0 +1,142 @@
+"""
+Test chart discovery, packaged chart extraction and per-chart caching
+"""
+import sys
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_registry import ChartRegistry, ChartNotFoundError
+from config import GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+# Leave out files that live runs may have generated inside sample_helm
+GENERATED_FILES = shutil.ignore_patterns(GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE)
+
+
+def _repackage(tmp, charts_dir, edit):
+    """Rebuild worker.tgz from an edited copy of the sample chart, with a newer mtime"""
+    packaged = os.path.join(tmp, 'worker')
+    shutil.rmtree(packaged, ignore_errors=True)
+    shutil.copytree(SAMPLE_CHART, packaged, ignore=GENERATED_FILES)
+    edit(packaged)
+    archive = os.path.join(charts_dir, 'worker.tgz')
+    stat = os.stat(archive)
+    with tarfile.open(archive, 'w:gz') as tar:
+        tar.add(packaged, arcname='worker')
+    os.utime(archive, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _make_charts_dir(tmp):
+    """Create a charts directory with one chart directory and one packaged chart"""
+    charts_dir = os.path.join(tmp, 'charts')
+    os.makedirs(charts_dir)
+    shutil.copytree(SAMPLE_CHART, os.path.join(charts_dir, 'web'))
+    with tarfile.open(os.path.join(charts_dir, 'worker.tgz'), 'w:gz') as tar:
+        tar.add(SAMPLE_CHART, arcname='worker')
+    return charts_dir
+
+
+def test_discovery_and_extraction():
+    """Registry lists directories and archives and extracts archives lazily"""
+    print("🧪 Testing chart discovery and extraction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        charts_dir = _make_charts_dir(tmp)
+        registry = ChartRegistry(charts_dir, cache_size=4, extract_dir=os.path.join(tmp, 'extracted'))
+        assert registry.list_charts() == ['web', 'worker']
+
+        worker = registry.get('worker')
+        assert os.path.isdir(worker.templates_dir)
+        assert 'replicaCount' in worker.base_values()
+        assert registry.get('worker') is worker
+
+        # A new chart version without one of the templates replaces the old extraction
+        removed = sorted(os.listdir(worker.templates_dir))[0]
+        _repackage(tmp, charts_dir, lambda chart: os.remove(os.path.join(chart, 'templates', removed)))
+        upgraded = ChartRegistry(charts_dir, extract_dir=os.path.join(tmp, 'extracted')).get('worker')
+        assert upgraded.root_dir == worker.root_dir
+        assert removed not in os.listdir(upgraded.templates_dir)
+        assert sorted(os.listdir(os.path.join(tmp, 'extracted'))) == ['worker', 'worker.lock']
+    print("✅ Charts discovered and packaged chart extracted (stale files removed on upgrade)")
+
+
+def test_cached_archive_reloaded_on_change():
+    """A cached packaged chart is re-extracted when its archive changes, keeping generated questions"""
+    print("🧪 Testing packaged chart upgrades...")
+    with tempfile.TemporaryDirectory() as tmp:
+        charts_dir = _make_charts_dir(tmp)
+        registry = ChartRegistry(charts_dir, extract_dir=os.path.join(tmp, 'extracted'))
+        worker = registry.get('worker')
+        for name in (GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE):
+            with open(os.path.join(worker.root_dir, name), 'w', encoding='utf-8') as f:
+                f.write(name)
+
+        def add_values(chart):
+            with open(os.path.join(chart, 'values.yaml'), 'a', encoding='utf-8') as f:
+                f.write('upgraded: true\n')
+
+        _repackage(tmp, charts_dir, add_values)
+        # Workers racing to load the new version take turns; none of them fails mid-swap
+        registries = [ChartRegistry(charts_dir, extract_dir=os.path.join(tmp, 'extracted')) for _ in range(4)]
+        errors = []
+
+        def load(other):
+            try:
+                assert 'upgraded' in other.get('worker').base_values()
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=load, args=(other,)) for other in registries]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+
+        upgraded = registry.get('worker')
+        assert upgraded is not worker and 'upgraded' in upgraded.base_values()
+        assert registry.get('worker') is upgraded
+        for name in (GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE):
+            with open(os.path.join(upgraded.root_dir, name), encoding='utf-8') as f:
+                assert f.read() == name
+        assert sorted(os.listdir(os.path.join(tmp, 'extracted'))) == ['worker', 'worker.lock']
+    print("✅ Archive change picked up by a cached registry; generated questions carried over")
+
+
+def test_unknown_and_unsafe_ids():
+    """Unknown charts and path-like identifiers are rejected"""
+    print("🧪 Testing unknown chart identifiers...")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ChartRegistry(_make_charts_dir(tmp), extract_dir=os.path.join(tmp, 'extracted'))
+        for chart_id in ('missing', '../web', 'web/templates'):
+            try:
+                registry.get(chart_id)
+            except ChartNotFoundError:
+                continue
+            raise AssertionError(f"{chart_id} should not resolve")
+    print("✅ Unknown chart identifiers rejected")
+
+
+def test_lru_eviction():
+    """Least recently used chart contexts are evicted beyond the cache size"""
+    print("🧪 Testing chart context LRU eviction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ChartRegistry(_make_charts_dir(tmp), cache_size=1,
+                                 extract_dir=os.path.join(tmp, 'extracted'))
+        web = registry.get('web')
+        registry.get('worker')
+        assert registry.get('web') is not web
+    print("✅ Chart contexts evicted in LRU order")
+
+
+if __name__ == "__main__":
+    test_discovery_and_extraction()
+    test_cached_archive_reloaded_on_change()
+    test_unknown_and_unsafe_ids()
+    test_lru_eviction()
+    print("\n🎉 All chart registry tests passed!")
@@ -0,0 +1,116 @@
+"""
+Test the offline fake provider used by benchmarks and CI
+"""
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_manager
+from chart_registry import ChartContext
+from config import GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE
+from fake_llm import FakeChatModel, FakeProviderError, LatencyModel, fake_completion
+from helm_parser import HelmTemplateParser
+from llm_scheduler import classify_error, retry_after_seconds
+from question_manager import QuestionManager
+from response_cache import ResponseCache
+from yaml_generator import YAMLGenerator
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+
+
+def test_latency_distributions():
+    """Seeded latency streams are reproducible and follow the configured distribution"""
+    print("🧪 Testing fake latency distributions...")
+    assert LatencyModel(100, 'fixed').sample() == 0.1
+    models = [LatencyModel(100, 'lognormal', 0.5, seed=7) for _ in range(2)]
+    runs = [[model.sample() for _ in range(2000)] for model in models]
+    assert runs[0] == runs[1]
+    samples = sorted(runs[0])
+    assert 0.09 < samples[1000] < 0.11 and samples[1900] > 0.18
+    model = LatencyModel(100, 'uniform', 0.2, seed=1)
+    uniform = [model.sample() for _ in range(50)]
+    assert all(0.08 <= value <= 0.12 for value in uniform)
+    try:
+        LatencyModel(100, 'pareto')
+        assert False, "unknown distribution should raise"
+    except ValueError:
+        pass
+    print(f"✅ lognormal p50 {samples[1000] * 1000:.0f} ms, p95 {samples[1900] * 1000:.0f} ms")
+
+
+def test_error_injection_looks_like_provider_errors():
+    """Injected errors are classified and honoured like real SDK errors"""
+    throttled = FakeChatModel(latency=LatencyModel(0, 'fixed'), error_rate=1.0, error_kind='throttled')
+    try:
+        throttled.invoke("hi")
+        assert False, "error_rate=1 should always fail"
+    except FakeProviderError as e:
+        assert classify_error(e) == 'throttled' and retry_after_seconds(e) == 1.0
+    assert classify_error(FakeProviderError('transient')) == 'transient'
+    assert classify_error(FakeProviderError('fatal')) is None
+    assert (throttled.calls, throttled.errors) == (1, 1)
+    print("✅ Injected errors classified as throttled/transient/fatal")
+
+
+def test_answers_helmbot_prompts():
+    """Question, merge and streaming responses are well-formed for HelmBot's prompts"""
+    manager = QuestionManager(None, None)
+    prompt = manager.create_prompt_template().format(variables="image.tag, replicaCount")
+    questions = yaml.safe_load(fake_completion(prompt))
+    assert [q["paths"] for q in questions] == [["image.tag"], ["replicaCount"]]
+
+    base_yaml = "replicaCount: 1\nimage:\n  tag: latest\n"
+    merge_prompt = YAMLGenerator(None, cache=ResponseCache()).build_prompt(base_yaml, [("Anything else?", "no")])
+    assert yaml.safe_load(fake_completion(merge_prompt)) == yaml.safe_load(base_yaml)
+
+    model = FakeChatModel(latency=LatencyModel(10, 'fixed'))
+
+    async def stream():
+        return [chunk.content async for chunk in model.astream(merge_prompt)]
+
+    chunks = asyncio.run(stream())
+    assert len(chunks) > 1 and "".join(chunks) == fake_completion(merge_prompt)
+    print(f"✅ Fake model answered question and merge prompts ({len(chunks)} stream chunks)")
+
+
+def test_registered_provider_runs_full_flow():
+    """PROVIDER='fake' generates questions and values.yaml end to end without a network"""
+    assert 'fake' in llm_manager.ModelProviderFactory.get_supported_providers()
+    original_provider, original_latency = llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS
+    llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS = 'fake', 0
+    try:
+        manager = llm_manager.LLMManager(interactive=False)
+    finally:
+        llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS = original_provider, original_latency
+    assert manager.get_provider_info()['provider'] == "Fake"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root, ignore=shutil.ignore_patterns(
+            GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE))
+        chart = ChartContext('chart', root)
+        parser = HelmTemplateParser()
+        questions = QuestionManager(manager, parser).load_question_set(chart)
+        assert questions and all(q.paths for q in questions)
+
+        generator = YAMLGenerator(manager, cache=ResponseCache(), helm_parser=parser)
+        merged, source = generator.generate_values_yaml_with_source(
+            [(questions[0].text, "2"), ("Anything else to configure?", "Add a team label")], chart=chart)
+        assert source == 'model' and isinstance(yaml.safe_load(merged), dict)
+    manager.shutdown()
+    print(f"✅ Generated {len(questions)} questions and values.yaml with the fake provider")
+
+
+if __name__ == "__main__":
+    test_latency_distributions()
+    test_error_injection_looks_like_provider_errors()
+    test_answers_helmbot_prompts()
+    test_registered_provider_runs_full_flow()
+    print("\n🎉 All fake provider tests passed!")
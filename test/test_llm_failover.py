@@ -0,0 +1,242 @@
+"""
+Test provider failover, health tracking and hedged requests with fake providers
+"""
+import sys
+import os
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_manager
+from llm_failover import FailoverLLM, FailoverMember, LatencyHistogram, ProviderHealth
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class ProviderError(Exception):
+    """Shaped like an SDK status error"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeLLM:
+    """Fake provider model with a fixed delay that can be switched to failing"""
+
+    def __init__(self, name, delay=0.0, fail=False, status_code=500):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.status_code = status_code
+        self.calls = 0
+        self.cancelled = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ProviderError(f"{self.name} is down", self.status_code)
+        return _Response(self.name)
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ProviderError(f"{self.name} is down", self.status_code)
+        return _Response(self.name)
+
+    async def astream(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise ProviderError(f"{self.name} is down", self.status_code)
+        for word in (self.name, "done"):
+            yield _Response(word)
+
+
+def _chain(primary, secondary, **kwargs):
+    members = [FailoverMember(llm.name, llm, ProviderHealth(llm.name, failure_threshold=2, cooldown_seconds=60))
+               for llm in (primary, secondary)]
+    return FailoverLLM(members, **kwargs)
+
+
+def test_latency_histogram():
+    """Quantiles come from bucket upper bounds"""
+    print("🧪 Testing latency histogram...")
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+    for _ in range(90):
+        histogram.observe(0.04)
+    for _ in range(10):
+        histogram.observe(3.0)
+    assert histogram.quantile(0.5) == 0.05
+    assert histogram.quantile(0.95) == 4.325
+    assert histogram.snapshot()['samples'] == 100
+    print("✅ p50/p95 follow the observed latencies")
+
+
+def test_failover_and_health():
+    """Failures fall through to the next provider and unhealthy providers move to the back"""
+    primary, secondary = FakeLLM("primary", fail=True), FakeLLM("secondary")
+    chain = _chain(primary, secondary, order_by_latency=False)
+    assert chain.invoke("hi").content == "secondary"
+    assert chain.invoke("hi").content == "secondary"
+    assert primary.calls == 2
+    assert [m.name for m in chain.ranked()] == ["secondary", "primary"]
+    assert chain.invoke("hi").content == "secondary" and primary.calls == 2
+    assert chain.stats()['failovers'] == 2
+
+    secondary.fail = True
+    try:
+        chain.invoke("hi")
+        assert False, "all providers down should raise"
+    except ProviderError:
+        pass
+    # Unhealthy providers are still tried last rather than dropped
+    health = chain.members[0].health.stats()
+    assert not health['healthy'] and health['consecutive_failures'] == 3 and primary.calls == 3
+    print("✅ Failed over and skipped the unhealthy provider")
+
+
+def test_client_errors_not_failed_over():
+    """A bad request or auth error is raised at once and does not mark the provider unhealthy"""
+    print("🧪 Testing that client errors skip failover...")
+    for status_code in (400, 401):
+        primary, secondary = FakeLLM("primary", fail=True, status_code=status_code), FakeLLM("secondary")
+        chain = _chain(primary, secondary, order_by_latency=False)
+        for call in (lambda: chain.invoke("hi"), lambda: asyncio.run(chain.ainvoke("hi")),
+                     lambda: asyncio.run(_collect(chain.astream("hi")))):
+            try:
+                call()
+                assert False, f"a {status_code} should not fail over"
+            except ProviderError as e:
+                assert e.status_code == status_code
+        assert secondary.calls == 0 and chain.stats()['failovers'] == 0
+        assert chain.members[0].health.stats()['failures'] == 0
+    print("✅ Client errors were raised without trying the next provider")
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_latency_ordering():
+    """Healthy providers are tried fastest first once latency has been observed"""
+    primary, secondary = FakeLLM("primary"), FakeLLM("secondary")
+    chain = _chain(primary, secondary)
+    assert [m.name for m in chain.ranked()] == ["primary", "secondary"]
+    for _ in range(5):
+        chain.members[0].health.record_success(2.0)
+        chain.members[1].health.record_success(0.2)
+    assert [m.name for m in chain.ranked()] == ["secondary", "primary"]
+    print("✅ Ordered providers by median latency")
+
+
+def test_hedged_invoke():
+    """A primary slower than its p95 is hedged and the faster answer wins"""
+    primary, secondary = FakeLLM("primary", delay=0.5), FakeLLM("secondary", delay=0.01)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        chain = _chain(primary, secondary, executor=executor, hedge=True, hedge_min_samples=3,
+                       order_by_latency=False)
+        for _ in range(5):
+            chain.members[0].health.record_success(0.04)
+        start = time.perf_counter()
+        assert chain.invoke("hi").content == "secondary"
+        assert time.perf_counter() - start < 0.3
+        stats = chain.stats()
+        assert (stats['hedges'], stats['hedge_wins']) == (1, 1)
+    print("✅ Hedged request answered by the secondary")
+
+
+def test_async_hedge_and_stream():
+    """Async hedging cancels the loser; streams fail over before the first chunk"""
+    primary, secondary = FakeLLM("primary", delay=0.5), FakeLLM("secondary", delay=0.01)
+    chain = _chain(primary, secondary, executor=ThreadPoolExecutor(max_workers=1), hedge=True,
+                   hedge_min_samples=3, order_by_latency=False)
+    for _ in range(5):
+        chain.members[0].health.record_success(0.04)
+
+    async def run():
+        response = await chain.ainvoke("hi")
+        await asyncio.sleep(0)
+        primary.fail = True
+        chunks = [chunk.content async for chunk in chain.astream("hi")]
+        return response.content, chunks
+
+    assert asyncio.run(run()) == ("secondary", ["secondary", "done"])
+    assert primary.cancelled == 1
+    print("✅ Async hedge cancelled the slow call and the stream failed over")
+
+
+class _FakeProvider(llm_manager.ModelProvider):
+    name = "Fake"
+
+    def setup_api_key(self, interactive=True):
+        pass
+
+    def create_llm(self, model_name, temperature):
+        return FakeLLM(f"{self.name}:{model_name}")
+
+    def get_provider_name(self):
+        return self.name
+
+
+class _BackupProvider(_FakeProvider):
+    name = "Backup"
+
+
+def test_manager_builds_chain():
+    """Configured failover providers wrap each model's pools in a failover chain"""
+    factory = llm_manager.ModelProviderFactory._providers
+    factory.update(stub=_FakeProvider, backup=_BackupProvider)
+    originals = llm_manager.PROVIDER, llm_manager.FAILOVER_PROVIDERS, dict(llm_manager.FAILOVER_MODELS)
+    llm_manager.PROVIDER, llm_manager.FAILOVER_PROVIDERS = 'stub', ['backup']
+    llm_manager.FAILOVER_MODELS['backup'] = 'backup-model'
+    try:
+        manager = llm_manager.LLMManager()
+        chain = manager.get_llm("main-model", 0.3)
+        assert isinstance(chain, FailoverLLM) and manager.get_llm("main-model", 0.3) is chain
+        assert chain.invoke("hi").content == "Fake:main-model"
+        chain.members[0].llm._llm._clients[0].fail = True  # InstrumentedLLM -> LLMClientPool -> client
+        assert chain.invoke("hi").content == "Backup:backup-model"
+        stats = manager.get_failover_stats()
+        assert set(stats['providers']) == {"Fake", "Backup"}
+        assert stats['chains']["main-model@0.3"]['failovers'] == 1
+        assert set(manager.get_scheduler_stats()) == {"Fake", "Backup"}
+
+        # Members fail fast: a throttled primary goes straight to the backup without backing off
+        client = chain.members[0].llm._llm._clients[0]
+        client.fail, client.status_code = True, 429
+        start = time.perf_counter()
+        assert chain.invoke("hi").content == "Backup:backup-model"
+        assert time.perf_counter() - start < 0.5
+        fake = manager.get_scheduler_stats()["Fake"]
+        assert (fake['throttled'], fake['retries']) == (1, 0)
+        manager.shutdown()
+    finally:
+        llm_manager.PROVIDER, llm_manager.FAILOVER_PROVIDERS = originals[0], originals[1]
+        llm_manager.FAILOVER_MODELS.clear()
+        llm_manager.FAILOVER_MODELS.update(originals[2])
+        del factory['stub'], factory['backup']
+    print("✅ LLM manager chained the configured providers")
+
+
+if __name__ == "__main__":
+    test_latency_histogram()
+    test_failover_and_health()
+    test_client_errors_not_failed_over()
+    test_latency_ordering()
+    test_hedged_invoke()
+    test_async_hedge_and_stream()
+    test_manager_builds_chain()
+    print("\n🎉 All LLM failover tests passed!")
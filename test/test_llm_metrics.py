@@ -0,0 +1,132 @@
+"""
+Test per-call token, latency and cache metrics and the Prometheus /metrics endpoint
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import llm_manager
+from api import main
+from fake_llm import FakeChatModel, FakeMessage, FakeProviderError, LatencyModel
+from llm_metrics import InstrumentedLLM, LLMMetrics, llm_call_site, metrics, usage_from_response
+from response_cache import ResponseCache
+from yaml_generator import YAMLGenerator
+
+
+class ReportingMessage(FakeMessage):
+    """Response carrying LangChain usage metadata, as Anthropic and OpenAI responses do"""
+
+    def __init__(self, content, input_tokens, output_tokens, cache_read=0):
+        super().__init__(content)
+        self.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                               "input_token_details": {"cache_read": cache_read}}
+
+
+class ReportingModel:
+    def invoke(self, prompt, **kwargs):
+        return ReportingMessage("replicaCount: 2\n", 120, 8, cache_read=100)
+
+
+def test_usage_from_response():
+    """Usage is read from usage_metadata or the raw OpenAI/Anthropic response metadata"""
+    print("🧪 Testing usage extraction...")
+    assert usage_from_response(ReportingMessage("x", 10, 2, 4)) == {'prompt': 10, 'completion': 2, 'cached_prompt': 4}
+    openai = FakeMessage("x")
+    openai.response_metadata = {"token_usage": {"prompt_tokens": 7, "completion_tokens": 3,
+                                                "prompt_tokens_details": {"cached_tokens": 5}}}
+    assert usage_from_response(openai) == {'prompt': 7, 'completion': 3, 'cached_prompt': 5}
+    anthropic = FakeMessage("x")
+    anthropic.response_metadata = {"usage": {"input_tokens": 9, "output_tokens": 1, "cache_read_input_tokens": 6}}
+    assert usage_from_response(anthropic) == {'prompt': 9, 'completion': 1, 'cached_prompt': 6}
+    assert usage_from_response(FakeMessage("x")) == {}
+    print("✅ Read usage_metadata, token_usage and usage")
+
+
+def test_instrumented_calls():
+    """invoke, ainvoke and astream record tokens, outcome, duration and time-to-first-token per call site"""
+    registry = LLMMetrics()
+    reporting = InstrumentedLLM(ReportingModel(), "Anthropic", "claude", registry)
+    with llm_call_site("yaml_merge"):
+        assert reporting.invoke("prompt").content == "replicaCount: 2\n"
+
+    fake = InstrumentedLLM(FakeChatModel(latency=LatencyModel(30, 'fixed')), "Fake", "fake-model", registry)
+    failing = InstrumentedLLM(FakeChatModel(latency=LatencyModel(0, 'fixed'), error_rate=1.0), "Fake", "fake-model", registry)
+
+    async def run():
+        with llm_call_site("yaml_stream"):
+            chunks = [chunk.content async for chunk in fake.astream("Existing values.yaml:\na: 1\n Questions and Answers:")]
+        with llm_call_site("questions"):
+            await fake.ainvoke("hello")
+            try:
+                await failing.ainvoke("hello")
+                assert False, "error_rate=1 should fail"
+            except FakeProviderError:
+                pass
+        return chunks
+
+    assert "".join(asyncio.run(run())) == "a: 1\n"
+    rows = {row["call_site"]: row for row in registry.summary()["calls"]}
+    assert rows["yaml_merge"]["prompt_tokens"] == 120 and rows["yaml_merge"]["cached_prompt_tokens"] == 100
+    assert "estimated_token_calls" not in rows["yaml_merge"]
+    assert rows["yaml_stream"]["estimated_token_calls"] == 1 and rows["yaml_stream"]["completion_tokens"] > 0
+    assert 0.005 < rows["yaml_stream"]["avg_first_token_seconds"] < rows["yaml_stream"]["avg_seconds"]
+    assert (rows["questions"]["calls"], rows["questions"]["errors"]) == (2, 1)
+    # Delegates everything else to the wrapped model
+    assert fake.calls == 2 and fake.model_name == 'fake'
+    # ...but never private names, so a half-built wrapper raises instead of recursing
+    try:
+        InstrumentedLLM.__new__(InstrumentedLLM).foo
+        assert False, "a wrapper without a model has nothing to delegate to"
+    except AttributeError:
+        pass
+
+    text = registry.render_prometheus()
+    assert 'helmbot_llm_calls_total{provider="Fake",model="fake-model",call_site="questions",outcome="error"} 1' in text
+    assert 'helmbot_llm_prompt_tokens_total{provider="Anthropic",model="claude",call_site="yaml_merge"} 120' in text
+    assert 'helmbot_llm_time_to_first_token_seconds_bucket{provider="Fake",model="fake-model",call_site="yaml_stream",le="+Inf"} 1' in text
+    assert 'helmbot_llm_call_duration_seconds_count{provider="Fake",model="fake-model",call_site="questions"} 2' in text
+    assert "yaml_merge" in registry.summary_text()
+    print("✅ Recorded sync, async, streamed and failed calls")
+
+
+def test_generation_cache_status_and_endpoint():
+    """LLMManager models are instrumented, cache hits skip the model, and /metrics serves the registry"""
+    metrics.reset()
+    original_provider, original_latency = llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS
+    llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS = 'fake', 0
+    try:
+        manager = llm_manager.LLMManager(interactive=False)
+    finally:
+        llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS = original_provider, original_latency
+    assert isinstance(manager.get_gpt4_llm(), InstrumentedLLM)
+
+    generator = YAMLGenerator(manager, cache=ResponseCache())
+    answers = [("Anything else to configure?", "Add a team label")]
+    sources = [generator.generate_values_yaml_with_source(answers)[1] for _ in range(2)]
+    assert sources == ['model', 'cache']
+    summary = metrics.summary()
+    assert summary["cache"] == {"yaml_merge:cache": 1, "yaml_merge:model": 1}
+    [row] = summary["calls"]
+    assert (row["provider"], row["call_site"], row["calls"]) == ("Fake", "yaml_merge", 1)
+    assert row["estimated_token_calls"] == 1 and row["prompt_tokens"] > 0
+    manager.shutdown()
+
+    # Without the context manager the startup hook (which builds the service) does not run
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert 'helmbot_generation_cache_total{call_site="yaml_merge",status="cache"} 1' in response.text
+    assert 'helmbot_llm_calls_total{provider="Fake",model="' in response.text
+    metrics.reset()
+    print("✅ /metrics reported generation cache status and token counts")
+
+
+if __name__ == "__main__":
+    test_usage_from_response()
+    test_instrumented_calls()
+    test_generation_cache_status_and_endpoint()
+    print("\n🎉 All LLM metrics tests passed!")
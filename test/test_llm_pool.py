@@ -0,0 +1,158 @@
+"""
+Test the bounded LLM client pool shared by concurrent requests
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_manager
+from llm_pool import LLMClientPool
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class SlowClient:
+    """Fake chat model that records how many calls overlap"""
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _enter(self):
+        with SlowClient.lock:
+            SlowClient.active += 1
+            SlowClient.peak = max(SlowClient.peak, SlowClient.active)
+
+    def _exit(self):
+        with SlowClient.lock:
+            SlowClient.active -= 1
+
+    def invoke(self, prompt):
+        self._enter()
+        time.sleep(0.05)
+        self._exit()
+        return _Response(prompt)
+
+    async def ainvoke(self, prompt):
+        self._enter()
+        await asyncio.sleep(0.05)
+        self._exit()
+        return _Response(prompt)
+
+    async def astream(self, prompt):
+        for word in prompt.split():
+            yield _Response(word)
+
+
+def _reset():
+    SlowClient.active = SlowClient.peak = 0
+
+
+def test_threads_are_bounded():
+    """Worker threads never exceed max_in_flight and queue waits are recorded"""
+    print("🧪 Testing in-flight limit for threaded callers...")
+    _reset()
+    created = []
+    pool = LLMClientPool(lambda: created.append(1) or SlowClient(), size=2, max_in_flight=2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: pool.invoke(f"prompt {i}").content, range(8)))
+    assert results == [f"prompt {i}" for i in range(8)]
+    assert SlowClient.peak == 2
+    stats = pool.stats()
+    assert len(created) == 2 and stats['clients'] == 2 and stats['idle_clients'] == 2
+    assert stats['acquired'] == 8 and stats['in_flight'] == 0 and stats['waiting'] == 0
+    assert stats['queued'] >= 6 and stats['max_queue_wait_ms'] > 0
+    print(f"✅ Peak concurrency {SlowClient.peak}, {stats['queued']} callers queued")
+
+
+def test_async_callers_do_not_block_loop():
+    """Queued asyncio callers wait without blocking other coroutines"""
+    _reset()
+    pool = LLMClientPool(SlowClient, size=1, max_in_flight=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        calls = [pool.ainvoke(f"p{i}") for i in range(4)]
+        results = await asyncio.gather(ticker(), *calls)
+        chunks = [chunk.content async for chunk in pool.astream("a b c")]
+        return results[1:], chunks
+
+    results, chunks = asyncio.run(run())
+    assert [r.content for r in results] == ["p0", "p1", "p2", "p3"]
+    assert chunks == ["a", "b", "c"]
+    assert SlowClient.peak == 1 and len(ticks) == 10
+    print("✅ Event loop kept running while callers queued")
+
+
+def test_cancelled_waiter_releases_slot():
+    """A cancelled waiter neither holds nor leaks its in-flight slot"""
+    pool = LLMClientPool(SlowClient, size=1, max_in_flight=1)
+
+    async def run():
+        first = asyncio.ensure_future(pool.ainvoke("first"))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(pool.ainvoke("cancelled"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await first
+        return await pool.ainvoke("after")
+
+    assert asyncio.run(run()).content == "after"
+    stats = pool.stats()
+    assert stats['in_flight'] == 0 and stats['waiting'] == 0
+    print("✅ Cancelled waiter left the pool consistent")
+
+
+class FakeProvider(llm_manager.ModelProvider):
+    def setup_api_key(self, interactive=True):
+        pass
+
+    def create_llm(self, model_name, temperature):
+        return SlowClient()
+
+    def get_provider_name(self):
+        return "Fake"
+
+
+def test_manager_shares_pool_per_model():
+    """Concurrent get_llm calls for one model share a pool; other models get their own"""
+    llm_manager.ModelProviderFactory._providers['slow'] = FakeProvider
+    original = llm_manager.PROVIDER
+    llm_manager.PROVIDER = 'slow'
+    try:
+        manager = llm_manager.LLMManager()
+    finally:
+        llm_manager.PROVIDER = original
+        del llm_manager.ModelProviderFactory._providers['slow']
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pools = list(executor.map(lambda _: manager.get_llm("model-a", 0.3), range(16)))
+    assert all(pool is pools[0] for pool in pools)
+    assert manager.get_llm("model-a", 0.7) is not pools[0]
+    pools[0].invoke("hello")
+    stats = manager.get_pool_stats()
+    assert set(stats) == {"Fake/model-a@0.3", "Fake/model-a@0.7"}
+    assert stats["Fake/model-a@0.3"]['acquired'] == 1
+    print("✅ One pool per provider/model/temperature")
+
+
+if __name__ == "__main__":
+    test_threads_are_bounded()
+    test_async_callers_do_not_block_loop()
+    test_cancelled_waiter_releases_slot()
+    test_manager_shares_pool_per_model()
+    print("\n🎉 All LLM pool tests passed!")
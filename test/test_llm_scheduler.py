@@ -0,0 +1,188 @@
+"""
+Test rate-limit admission, retry and backoff against a fake provider that throttles
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_pool import LLMClientPool
+from llm_scheduler import (
+    BATCH, ProviderThrottledError, RateLimitScheduler, classify_error, llm_priority, retry_after_seconds
+)
+
+
+class _Response:
+    def __init__(self, content, headers=None):
+        self.content = content
+        self.headers = headers or {}
+        self.status_code = 429
+
+
+class APIStatusError(Exception):
+    """Shaped like the OpenAI/Anthropic SDK error: status_code plus an HTTP response"""
+
+    def __init__(self, status_code=429, headers=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = _Response("", headers)
+
+
+class ClientError(Exception):
+    """Shaped like botocore's ClientError"""
+
+    def __init__(self, code):
+        super().__init__(f"An error occurred ({code})")
+        self.response = {'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': 400}}
+
+
+class ThrottlingClient:
+    """Fake provider client that rejects the first throttle_calls requests"""
+
+    def __init__(self, throttle_calls, headers=None):
+        self.throttle_calls = throttle_calls
+        self.headers = headers if headers is not None else {'retry-after-ms': '20'}
+        self.calls = 0
+
+    def _call(self, prompt):
+        self.calls += 1
+        if self.calls <= self.throttle_calls:
+            raise APIStatusError(429, self.headers)
+        return _Response(f"ok: {prompt}")
+
+    def invoke(self, prompt):
+        return self._call(prompt)
+
+    async def ainvoke(self, prompt):
+        return self._call(prompt)
+
+    async def astream(self, prompt):
+        self._call(prompt)
+        for word in prompt.split():
+            yield _Response(word)
+
+
+def _scheduler(**kwargs):
+    options = dict(max_retries=3, backoff_base=0.01, backoff_max=0.05)
+    options.update(kwargs)
+    return RateLimitScheduler("Fake", **options)
+
+
+def test_error_classification():
+    """Throttling is recognised from SDK, wrapped and Bedrock-style errors"""
+    print("🧪 Testing provider error classification...")
+    assert classify_error(APIStatusError(429)) == 'throttled'
+    assert classify_error(APIStatusError(529)) == 'throttled'
+    assert classify_error(APIStatusError(502)) == 'transient'
+    assert classify_error(ValueError("bad prompt")) is None
+    try:
+        try:
+            raise ClientError('ThrottlingException')
+        except ClientError as e:
+            raise ValueError(f"Error raised by bedrock service: {e}")
+    except ValueError as wrapped:
+        assert classify_error(wrapped) == 'throttled'
+
+    assert retry_after_seconds(APIStatusError(429, {'retry-after': '7'})) == 7.0
+    assert retry_after_seconds(APIStatusError(429, {'retry-after-ms': '250'})) == 0.25
+    assert retry_after_seconds(APIStatusError(429, {'retry-after': 'Thu, 01 Jan 1970 00:00:00 GMT'})) == 0.0
+    assert retry_after_seconds(APIStatusError(429)) is None
+    print("✅ 429, 529, 5xx and Bedrock throttling classified")
+
+
+def test_throttled_calls_are_retried():
+    """A throttled call waits for Retry-After and succeeds on a later attempt"""
+    client = ThrottlingClient(throttle_calls=2)
+    scheduler = _scheduler()
+    pool = LLMClientPool(lambda: client, size=1, max_in_flight=1, scheduler=scheduler)
+
+    start = time.perf_counter()
+    assert pool.invoke("hello").content == "ok: hello"
+    assert time.perf_counter() - start >= 0.04
+    stats = scheduler.stats()
+    assert client.calls == 3
+    assert (stats['throttled'], stats['retries'], stats['gave_up']) == (2, 2, 0)
+    assert pool.stats()['in_flight'] == 0
+    print("✅ Retried after Retry-After and succeeded")
+
+
+def test_gives_up_with_throttled_error():
+    """Throttling beyond the retry budget raises ProviderThrottledError; other errors are not retried"""
+    client = ThrottlingClient(throttle_calls=10, headers={'retry-after': '0.01'})
+    scheduler = _scheduler(max_retries=2)
+    pool = LLMClientPool(lambda: client, size=1, max_in_flight=1, scheduler=scheduler)
+    try:
+        pool.invoke("hello")
+        assert False, "persistent throttling should raise"
+    except ProviderThrottledError as e:
+        assert e.retry_after == 0.01 and e.provider == "Fake"
+    assert client.calls == 3 and scheduler.stats()['gave_up'] == 1
+
+    class Broken:
+        calls = 0
+
+        def invoke(self, prompt):
+            Broken.calls += 1
+            raise ValueError("bad request")
+
+    pool = LLMClientPool(Broken, size=1, max_in_flight=1, scheduler=_scheduler())
+    try:
+        pool.invoke("hello")
+        assert False, "non-retryable errors should propagate"
+    except ValueError:
+        pass
+    assert Broken.calls == 1
+    print("✅ Gave up after the retry budget with a throttled error")
+
+
+def test_token_bucket_and_priority():
+    """Callers wait for token budget, and batch work leaves a reserve for interactive calls"""
+    scheduler = _scheduler(tokens_per_minute=60000, batch_reserve=0.25)
+    pool = LLMClientPool(lambda: ThrottlingClient(0), size=1, max_in_flight=4, scheduler=scheduler)
+
+    with llm_priority(BATCH):
+        pool.invoke("x" * 4 * 45000)
+        start = time.perf_counter()
+        pool.invoke("x" * 4 * 100)
+        batch_wait = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pool.invoke("x" * 4 * 100)
+    interactive_wait = time.perf_counter() - start
+
+    assert batch_wait >= 0.08, batch_wait
+    assert interactive_wait < 0.05, interactive_wait
+    stats = scheduler.stats()
+    assert stats['calls_by_priority'] == {'interactive': 1, 'batch': 2}
+    assert stats['admission_waits'] >= 1 and stats['tokens_per_minute'] == 60000
+    print(f"✅ Batch waited {batch_wait * 1000:.0f} ms, interactive {interactive_wait * 1000:.0f} ms")
+
+
+def test_async_retry_and_stream():
+    """ainvoke and astream retry throttled calls before any output is produced"""
+    scheduler = _scheduler()
+    invoke_client = ThrottlingClient(throttle_calls=1)
+    stream_client = ThrottlingClient(throttle_calls=2)
+    invoke_pool = LLMClientPool(lambda: invoke_client, size=1, max_in_flight=1, scheduler=scheduler)
+    stream_pool = LLMClientPool(lambda: stream_client, size=1, max_in_flight=1, scheduler=scheduler)
+
+    async def run():
+        response = await invoke_pool.ainvoke("hi")
+        chunks = [chunk.content async for chunk in stream_pool.astream("a b")]
+        return response.content, chunks
+
+    assert asyncio.run(run()) == ("ok: hi", ["a", "b"])
+    assert scheduler.stats()['retries'] == 3
+    print("✅ Async calls and streams retried")
+
+
+if __name__ == "__main__":
+    test_error_classification()
+    test_throttled_calls_are_retried()
+    test_gives_up_with_throttled_error()
+    test_token_bucket_and_priority()
+    test_async_retry_and_stream()
+    print("\n🎉 All LLM scheduler tests passed!")
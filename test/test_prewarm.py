@@ -0,0 +1,138 @@
+"""
+Test question pre-warming: only stale charts are regenerated, and /questions can be served without the model
+"""
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import llm_manager
+from api import main
+from api.lifecycle import ServiceLifecycle
+from api.service import HelmBotService
+from chart_registry import ChartRegistry
+from config import GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE
+from helm_parser import HelmTemplateParser
+from llm_metrics import metrics
+from prewarm import QuestionPrewarmer
+from question_manager import QuestionManager, QuestionsNotReadyError
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+# Leave out files that live runs may have generated inside sample_helm
+GENERATED_FILES = shutil.ignore_patterns(GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE)
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class CountingLLMManager:
+    """Stand-in LLM manager that counts question generation calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_gpt35_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        return _Response("1. How many replicas do you want to run? (Controls horizontal scaling)")
+
+
+def _charts(tmp, *names):
+    for name in names:
+        shutil.copytree(SAMPLE_CHART, os.path.join(tmp, name), ignore=GENERATED_FILES)
+    return ChartRegistry(charts_dir=tmp, extract_dir=os.path.join(tmp, '.extracted'))
+
+
+def test_only_stale_charts_regenerated():
+    """A second run costs no model calls; a template edit regenerates just that chart"""
+    print("🧪 Testing question pre-warming...")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = _charts(tmp, 'api', 'web', 'worker')
+        llm = CountingLLMManager()
+        prewarmer = QuestionPrewarmer(QuestionManager(llm, HelmTemplateParser()), workers=3)
+        charts = registry.list_charts()
+
+        report = prewarmer.run(registry, charts)
+        assert (report['generated'], report['current'], report['failed'], llm.calls) == (3, 0, 0, 3)
+        assert all(os.path.exists(registry.get(c).questions_path) for c in charts)
+
+        report = prewarmer.run(registry, charts)
+        assert (report['generated'], report['current'], llm.calls) == (0, 3, 3)
+
+        with open(os.path.join(tmp, 'web', 'templates', 'helm-sample-chart-service.yaml'), 'a') as f:
+            f.write('  sessionAffinity: {{ .Values.service.sessionAffinity }}\n')
+        report = prewarmer.run(registry, charts + ['missing'])
+        statuses = {result['chart']: result['status'] for result in report['charts']}
+        assert statuses == {'api': 'current', 'web': 'generated', 'worker': 'current', 'missing': 'failed'}
+        errors = [result['error'] for result in report['charts'] if 'error' in result]
+        assert llm.calls == 4 and len(errors) == 1 and 'Chart not found' in errors[0]
+        assert prewarmer.status() == {'state': 'done', 'total': 4, 'completed': 4,
+                                      'current': 2, 'generated': 1, 'failed': 1}
+    print("✅ Only missing or stale question sets were generated")
+
+
+def test_cache_only_questions_after_startup_prewarm():
+    """Readiness waits for pre-warming, after which /questions never calls the model"""
+    original_provider, original_latency = llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS
+    llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS = 'fake', 0
+    original_lifecycle = main.lifecycle
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            service = HelmBotService(questions_cache_only=True)
+            service.registry = _charts(tmp, 'web')
+            try:
+                service.get_question_set('web')
+                assert False, "cache-only questions should not be generated on demand"
+            except QuestionsNotReadyError:
+                pass
+
+            release = threading.Event()
+            prewarm = service.prewarm_questions
+
+            def gated_prewarm():
+                release.wait(5)
+                return prewarm(['web'])
+
+            service.prewarm_questions = gated_prewarm
+            main.lifecycle = ServiceLifecycle(lambda: service, prewarm=True)
+            with TestClient(main.app) as client:
+                # The service itself builds instantly; wait for the lifecycle to reach pre-warming
+                response = client.get("/health/ready")
+                for _ in range(100):
+                    if response.json()["status"] != "starting":
+                        break
+                    time.sleep(0.01)
+                    response = client.get("/health/ready")
+                assert response.status_code == 503 and response.json()["status"] == "prewarming"
+                assert response.json()["prewarm"]["state"] == "not_started"
+                release.set()
+                assert client.get("/questions", params={"chart": "web"}).status_code == 200
+                assert client.get("/health/ready").json()["status"] == "ready"
+
+                metrics.reset()
+                response = client.get("/questions", params={"chart": "web"})
+                assert response.status_code == 200 and response.json()["total_questions"] > 0
+                assert metrics.summary()["calls"] == []
+    finally:
+        main.lifecycle = original_lifecycle
+        llm_manager.PROVIDER, llm_manager.FAKE_LLM_LATENCY_MS = original_provider, original_latency
+    print("✅ Ready only after pre-warming; /questions served without a model call")
+
+
+if __name__ == "__main__":
+    test_only_stale_charts_regenerated()
+    test_cache_only_questions_after_startup_prewarm()
+    print("\n🎉 All pre-warm tests passed!")
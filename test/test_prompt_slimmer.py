@@ -0,0 +1,81 @@
+"""
+Test that merge prompts only carry the values.yaml sections the answers touch
+"""
+import sys
+import os
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_slimmer import PromptSlimmer, deep_merge, extract_subtrees
+from question_schema import Question
+
+
+def _large_values():
+    """A bitnami-style values.yaml with many unrelated sections"""
+    values = {'global': {'imageRegistry': '', 'storageClass': ''}}
+    for index in range(40):
+        values[f'component{index}'] = {
+            'enabled': False,
+            'replicaCount': 1,
+            'resources': {'limits': {}, 'requests': {}},
+            'livenessProbe': {'enabled': True, 'initialDelaySeconds': 30, 'periodSeconds': 10},
+        }
+    values['metrics'] = {'enabled': False, 'serviceMonitor': {'enabled': False, 'interval': '30s'}}
+    values['persistence'] = {'enabled': True, 'size': '8Gi', 'accessModes': ['ReadWriteOnce']}
+    return yaml.safe_dump(values, sort_keys=False)
+
+
+def test_selects_relevant_sections():
+    """Only sections named by the answers (or their question paths) are sent"""
+    print("🧪 Testing prompt slimming...")
+    base = _large_values()
+    questions = [Question('metrics', 'Do you want monitoring?', paths=['metrics.serviceMonitor.enabled'])]
+    slim = PromptSlimmer().slim(base, [
+        ("Do you want monitoring?", "yes, scrape every 15s"),
+        ("How big should the volume be?", "persistence of 20Gi"),
+    ], questions)
+    assert slim.is_excerpt
+    assert slim.selected == [('metrics', 'serviceMonitor'), ('persistence',)]
+    excerpt = yaml.safe_load(slim.prompt_yaml)
+    assert list(excerpt) == ['metrics', 'persistence']
+    assert len(slim.prompt_yaml) * 10 < len(base)
+
+    merged = yaml.safe_load(slim.splice("metrics:\n  serviceMonitor:\n    enabled: true\n    interval: 15s\n"
+                                        "persistence:\n  size: 20Gi\n"))
+    assert merged['metrics']['serviceMonitor'] == {'enabled': True, 'interval': '15s'}
+    assert merged['persistence'] == {'enabled': True, 'size': '20Gi', 'accessModes': ['ReadWriteOnce']}
+    assert list(merged) == list(yaml.safe_load(base))
+    print(f"✅ Sent {len(slim.prompt_yaml)} of {len(base)} characters")
+
+
+def test_falls_back_to_full_document():
+    """Unmatched answers and excerpts that are not smaller send the whole file"""
+    base = _large_values()
+    slim = PromptSlimmer().slim(base, [("Anything else?", "no thanks")])
+    assert not slim.is_excerpt and slim.prompt_yaml == base
+    assert slim.splice("whatever: 1") == "whatever: 1"
+
+    small = "replicaCount: 1\nimage:\n  repository: nginx\n"
+    slim = PromptSlimmer().slim(small, [("Which image and how many replicas?", "nginx, 2")])
+    assert not slim.is_excerpt
+    print("✅ Fell back to the full values.yaml when slimming does not help")
+
+
+def test_subtree_helpers():
+    """Extraction keeps document order and merging never mutates its inputs"""
+    values = {'a': {'x': 1, 'y': {'z': 2}}, 'b': 3, 'c': {'d': 4}}
+    assert extract_subtrees(values, [('c',), ('a', 'y')]) == {'a': {'y': {'z': 2}}, 'c': {'d': 4}}
+    merged = deep_merge(values, {'a': {'y': {'z': 5}}, 'e': 6})
+    assert merged == {'a': {'x': 1, 'y': {'z': 5}}, 'b': 3, 'c': {'d': 4}, 'e': 6}
+    assert values['a']['y']['z'] == 2
+    print("✅ Subtree extraction and splicing behave")
+
+
+if __name__ == "__main__":
+    test_selects_relevant_sections()
+    test_falls_back_to_full_document()
+    test_subtree_helpers()
+    print("\n🎉 All prompt slimming tests passed!")
@@ -0,0 +1,112 @@
+"""
+Test that generated questions are only regenerated when chart variables change
+"""
+import sys
+import os
+import shutil
+import tempfile
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE
+from chart_registry import ChartContext
+from helm_parser import HelmTemplateParser
+from question_manager import QuestionManager
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+# Leave out files that live runs may have generated inside sample_helm
+GENERATED_FILES = shutil.ignore_patterns(GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE)
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class CountingLLMManager:
+    """Stand-in LLM manager that counts question generation calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_gpt35_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return _Response("1. How many replicas do you want to run? (Controls horizontal scaling)")
+
+
+def _recheck(chart):
+    """Skip the re-check interval so the next call inspects the templates again"""
+    chart.invalidate('questions')
+
+
+def test_questions_regenerated_only_on_variable_change():
+    """Template edits that do not touch .Values never trigger an LLM call"""
+    print("🧪 Testing question fingerprinting...")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root, ignore=GENERATED_FILES)
+        chart = ChartContext('chart', root)
+        llm_manager = CountingLLMManager()
+        manager = QuestionManager(llm_manager, HelmTemplateParser())
+
+        manager.ensure_questions_exist(chart)
+        assert llm_manager.calls == 1
+        assert os.path.exists(chart.questions_meta_path)
+
+        manager.ensure_questions_exist(chart)
+        assert llm_manager.calls == 1
+
+        service_path = os.path.join(root, 'templates', 'helm-sample-chart-service.yaml')
+        with open(service_path, 'a') as f:
+            f.write('# cosmetic change\n')
+        _recheck(chart)
+        manager.ensure_questions_exist(chart)
+        assert llm_manager.calls == 1
+
+        with open(service_path, 'a') as f:
+            f.write('  sessionAffinity: {{ .Values.service.sessionAffinity }}\n')
+        _recheck(chart)
+        manager.ensure_questions_exist(chart)
+        assert llm_manager.calls == 2
+    print("✅ Questions regenerated only when .Values references change")
+
+
+def test_corrupt_questions_regenerated_not_adopted():
+    """Only a usable questions file is adopted when its meta file is missing or unreadable"""
+    print("🧪 Testing adoption of questions without a fingerprint...")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root, ignore=GENERATED_FILES)
+        chart = ChartContext('chart', root)
+        llm_manager = CountingLLMManager()
+        manager = QuestionManager(llm_manager, HelmTemplateParser())
+        manager.ensure_questions_exist(chart)
+        with open(chart.questions_path) as f:
+            valid = f.read()
+
+        broken = [valid[:len(valid) // 2], '{"version": 0, "questions": []}', '{"version": 1, "questions": []}']
+        for calls, content in enumerate(broken, start=2):
+            with open(chart.questions_path, 'w') as f:
+                f.write(content)
+            os.remove(chart.questions_meta_path)
+            _recheck(chart)
+            assert manager.questions_stale(chart)
+            manager.ensure_questions_exist(chart)
+            assert llm_manager.calls == calls and manager.load_question_set(chart)
+
+        with open(chart.questions_meta_path, 'w') as f:
+            f.write('{"fingerprint": ')
+        _recheck(chart)
+        manager.ensure_questions_exist(chart)
+        assert llm_manager.calls == 4 and not manager.questions_stale(chart)
+    print("✅ Truncated, empty and old-schema files regenerated; valid ones adopted")
+
+
+if __name__ == "__main__":
+    test_questions_regenerated_only_on_variable_change()
+    test_corrupt_questions_regenerated_not_adopted()
+    print("\n🎉 All question cache tests passed!")
@@ -0,0 +1,131 @@
+"""
+Test structured question parsing, defaults and the per-chart in-memory question set
+"""
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE
+from chart_registry import ChartContext
+from helm_parser import HelmTemplateParser
+from question_manager import QuestionManager
+from question_schema import (
+    annotate_defaults, dump_questions, load_questions_json, lookup_value, parse_llm_questions
+)
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+# Leave out files that live runs may have generated inside sample_helm
+GENERATED_FILES = shutil.ignore_patterns(GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE)
+VARIABLES = {'replicaCount', 'image.repository', 'image.tag', 'ingress.hosts[].host', 'service.port'}
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLMManager:
+    """Stand-in LLM manager returning a fenced JSON question list"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_gpt35_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return _Response("```json\n" + json.dumps([
+            {"question": "How many replicas do you want to run?", "help": "Controls horizontal scaling",
+             "paths": ["replicaCount"]},
+            {"question": "Which image should be deployed?", "help": "Repository and tag",
+             "paths": [".Values.image.repository", "image.tag"]},
+        ]) + "\n```")
+
+
+def test_parse_json_questions():
+    """JSON answers keep only known paths and get ids from their first path"""
+    print("🧪 Testing structured question parsing...")
+    content = json.dumps([
+        {"question": "How many replicas?", "help": "Scaling", "paths": ["replicaCount", "bogus.path"]},
+        {"question": "Which port should the service expose?", "paths": [".Values.service.port"]},
+        {"question": "Anything else?"},
+    ])
+    questions = parse_llm_questions("Here you go:\n" + content, VARIABLES)
+    assert [q.id for q in questions] == ['replicaCount', 'service.port', 'q3']
+    assert questions[0].paths == ['replicaCount'] and questions[0].help == 'Scaling'
+    assert questions[2].paths == []
+    print("✅ JSON questions parsed")
+
+
+def test_parse_numbered_fallback():
+    """Free-text lists drop preambles and blank lines and join wrapped questions"""
+    content = """Here are the questions you need:
+
+1. How many replicas do you want
+   to run? (Controls horizontal scaling)
+
+2. What port should the service listen on? (Sets service.port)
+"""
+    questions = parse_llm_questions(content, VARIABLES)
+    assert [q.text for q in questions] == [
+        "How many replicas do you want to run?",
+        "What port should the service listen on?",
+    ]
+    assert questions[0].help == "Controls horizontal scaling"
+    print("✅ Numbered fallback ignored preamble and blank lines")
+
+
+def test_defaults_from_values():
+    """Single-path questions get their type and default from values.yaml"""
+    values = {'replicaCount': 1, 'ingress': {'enabled': False, 'hosts': [{'host': 'chart.local'}]}}
+    assert lookup_value(values, 'ingress.hosts[].host') == (True, 'chart.local')
+    assert lookup_value(values, 'ingress.tls') == (False, None)
+
+    questions = parse_llm_questions(json.dumps([
+        {"question": "Replicas?", "paths": ["replicaCount"]},
+        {"question": "Host?", "paths": ["ingress.hosts[].host"]},
+    ]), VARIABLES)
+    annotate_defaults(questions, values)
+    assert (questions[0].type, questions[0].default) == ('integer', 1)
+    assert (questions[1].type, questions[1].default) == ('string', 'chart.local')
+
+    restored = load_questions_json(dump_questions(questions))
+    assert [q.to_dict() for q in restored] == [q.to_dict() for q in questions]
+    print("✅ Types and defaults taken from values.yaml")
+
+
+def test_question_set_loaded_once():
+    """The chart's questions are parsed once and reused until the file changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root, ignore=GENERATED_FILES)
+        chart = ChartContext('chart', root)
+        llm_manager = FakeLLMManager()
+        manager = QuestionManager(llm_manager, HelmTemplateParser())
+
+        first = manager.load_question_set(chart)
+        assert [q.id for q in first] == ['replicaCount', 'image.repository']
+        assert first[0].default == 1 and first[0].type == 'integer'
+        assert first[1].paths == ['image.repository', 'image.tag']
+        assert manager.load_question_set(chart) is first
+        assert manager.load_questions(chart) == [q.text for q in first]
+
+        with open(chart.values_path, 'a') as f:
+            f.write('\n# touched\n')
+        assert manager.load_question_set(chart) is not first
+        assert llm_manager.calls == 1
+    print("✅ Question set loaded once per chart and refreshed on change")
+
+
+if __name__ == "__main__":
+    test_parse_json_questions()
+    test_parse_numbered_fallback()
+    test_defaults_from_values()
+    test_question_set_loaded_once()
+    print("\n🎉 All question schema tests passed!")
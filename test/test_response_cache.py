@@ -0,0 +1,64 @@
+"""
+Test the content-addressed response cache used by YAMLGenerator
+"""
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+
+def test_cache_key_normalization():
+    """Whitespace and answer order should not change the cache key"""
+    print("🧪 Testing cache key normalization...")
+    key_a = ResponseCache.make_key("Anthropic", "model", 0.3, "replicaCount: 1\n",
+                                   [("How many replicas?", "3"), ("Image?", "nginx")])
+    key_b = ResponseCache.make_key("Anthropic", "model", 0.3, "replicaCount: 1\n",
+                                   [("Image?", " nginx "), ("How many  replicas?", "3")])
+    key_c = ResponseCache.make_key("Anthropic", "model", 0.7, "replicaCount: 1\n",
+                                   [("How many replicas?", "3"), ("Image?", "nginx")])
+    assert key_a == key_b
+    assert key_a != key_c
+    print("✅ Cache keys are content-addressed")
+
+
+def test_lru_eviction_and_ttl():
+    """Memory tier evicts least recently used entries and honours TTL"""
+    print("🧪 Testing LRU eviction and TTL...")
+    cache = ResponseCache(max_entries=2, ttl_seconds=0.2, db_path=None)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    time.sleep(0.3)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    print(f"✅ Cache stats: {stats}")
+
+
+def test_persistent_tier():
+    """SQLite tier survives a new cache instance"""
+    print("🧪 Testing persistent SQLite tier...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        ResponseCache(max_entries=4, ttl_seconds=60, db_path=db_path).set("key", "replicaCount: 3")
+        restarted = ResponseCache(max_entries=4, ttl_seconds=60, db_path=db_path)
+        assert restarted.get("key") == "replicaCount: 3"
+        assert restarted.stats()["disk_hits"] == 1
+        restarted._db.close()
+    print("✅ Persistent tier works across restarts")
+
+
+if __name__ == "__main__":
+    test_cache_key_normalization()
+    test_lru_eviction_and_ttl()
+    test_persistent_tier()
+    print("\n🎉 All response cache tests passed!")
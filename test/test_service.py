@@ -38,7 +38,8 @@ def test_service():
         
         yaml_content, file_path = service.generate_yaml(sample_qa)
         print(f"✅ YAML generated successfully")
-        print(f"📁 Saved to: {file_path}")
+        if file_path:
+            print(f"📁 Saved to: {file_path}")
         print("\n--- Sample YAML Output ---")
         print(yaml_content[:300] + "..." if len(yaml_content) > 300 else yaml_content)
         
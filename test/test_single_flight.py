@@ -0,0 +1,159 @@
+"""
+Test that identical concurrent requests share a single LLM call
+"""
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE
+from chart_registry import ChartContext
+from helm_parser import HelmTemplateParser
+from question_manager import QuestionManager
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from yaml_generator import YAMLGenerator
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+# Leave out files that live runs may have generated inside sample_helm
+GENERATED_FILES = shutil.ignore_patterns(GENERATED_QUESTIONS_FILE, QUESTIONS_META_FILE, TEMPLATE_INDEX_FILE)
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Provider:
+    def get_provider_name(self):
+        return "fake"
+
+
+class SlowLLMManager:
+    """Stand-in LLM manager whose calls are slow enough to overlap"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+        self.provider = _Provider()
+        self._lock = threading.Lock()
+
+    def get_gpt35_llm(self):
+        return self
+
+    def get_gpt4_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return _Response(self.content)
+
+
+def test_threads_and_tasks_share_one_call():
+    """Threads and asyncio tasks waiting on one key get the leader's result"""
+    print("🧪 Testing SingleFlight sharing...")
+    flights = SingleFlight()
+    calls = []
+
+    def work(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: flights.do('key', work, 21), range(8)))
+    assert results == [42] * 8
+    assert len(calls) == 1
+
+    async def run_tasks():
+        loop = asyncio.get_running_loop()
+
+        async def async_work():
+            return await loop.run_in_executor(None, work, 5)
+
+        return await asyncio.gather(*(flights.ado('async-key', async_work) for _ in range(5)))
+
+    assert asyncio.run(run_tasks()) == [10] * 5
+    assert len(calls) == 2
+    print("✅ Concurrent callers shared one execution")
+
+
+def test_errors_propagate_to_every_caller():
+    """A failing leader raises in every waiter and the next call runs again"""
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flights.do('key', fail)
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(lambda _: call(), range(4))) == ["boom"] * 4
+    assert flights.do('key', lambda: "ok") == "ok"
+    print("✅ Errors reached every waiter without poisoning the key")
+
+
+def test_concurrent_question_generation():
+    """Concurrent first requests for a chart generate questions once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root, ignore=GENERATED_FILES)
+        for name in ('generated_questions.txt', 'generated_questions.meta.json'):
+            if os.path.exists(os.path.join(root, name)):
+                os.remove(os.path.join(root, name))
+        chart = ChartContext('chart', root)
+        llm_manager = SlowLLMManager("1. How many replicas? (Scaling)")
+        manager = QuestionManager(llm_manager, HelmTemplateParser())
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda _: manager.ensure_questions_exist(chart), range(6)))
+        assert llm_manager.calls == 1
+    print("✅ Six concurrent question requests made one LLM call")
+
+
+def test_concurrent_yaml_generation():
+    """Identical concurrent payloads make one call, in one process and across cache instances"""
+    chart = ChartContext('sample', SAMPLE_CHART)
+    answers = [("How many replicas?", "3")]
+
+    llm_manager = SlowLLMManager("replicaCount: 3")
+    generator = YAMLGenerator(llm_manager, cache=ResponseCache())
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: generator.generate_values_yaml(answers, chart=chart), range(6)))
+    assert len(set(results)) == 1 and yaml.safe_load(results[0])['replicaCount'] == 3
+    assert llm_manager.calls == 1
+
+    # Separate generators sharing one SQLite file behave like separate worker processes
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'responses.db')
+        llm_manager = SlowLLMManager("replicaCount: 3")
+        generators = [YAMLGenerator(llm_manager, cache=ResponseCache(db_path=db_path)) for _ in range(3)]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(lambda g: g.generate_values_yaml(answers, chart=chart), generators))
+        assert len(set(results)) == 1 and yaml.safe_load(results[0])['replicaCount'] == 3
+        assert llm_manager.calls == 1
+    print("✅ Identical YAML requests shared one LLM call")
+
+
+if __name__ == "__main__":
+    test_threads_and_tasks_share_one_call()
+    test_errors_propagate_to_every_caller()
+    test_concurrent_question_generation()
+    test_concurrent_yaml_generation()
+    print("\n🎉 All single-flight tests passed!")
@@ -0,0 +1,190 @@
+"""
+Test non-interactive credential resolution and background service startup
+"""
+import sys
+import os
+import subprocess
+import tempfile
+import time
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import credentials
+from credentials import MissingCredentialsError, resolve_secret
+from llm_manager import AnthropicProvider, OpenAIProvider
+from api import lifecycle as lifecycle_module
+from api import main
+from api.lifecycle import ServiceLifecycle
+from startup_profiler import ImportProfiler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _clean_env(*names):
+    saved = {name: os.environ.pop(name, None) for name in names}
+    saved.update({f'{name}_FILE': os.environ.pop(f'{name}_FILE', None) for name in names})
+    return saved
+
+
+def _restore_env(saved):
+    for name, value in saved.items():
+        os.environ.pop(name, None)
+        if value is not None:
+            os.environ[name] = value
+
+
+def test_resolve_secret_sources():
+    """Keys come from the environment, a *_FILE path or the secrets directory"""
+    print("🧪 Testing credential resolution...")
+    saved = _clean_env('HELMBOT_TEST_KEY')
+    original_dir = credentials.SECRETS_DIR
+    with tempfile.TemporaryDirectory() as secrets_dir:
+        credentials.SECRETS_DIR = secrets_dir
+        try:
+            assert resolve_secret('HELMBOT_TEST_KEY') is None
+            with open(os.path.join(secrets_dir, 'helmbot_test_key'), 'w') as f:
+                f.write("from-mount\n")
+            assert resolve_secret('HELMBOT_TEST_KEY') == "from-mount"
+
+            key_file = os.path.join(secrets_dir, 'key.txt')
+            with open(key_file, 'w') as f:
+                f.write("  from-file  ")
+            os.environ['HELMBOT_TEST_KEY_FILE'] = key_file
+            assert resolve_secret('HELMBOT_TEST_KEY') == "from-file"
+
+            os.environ['HELMBOT_TEST_KEY'] = "   "
+            assert resolve_secret('HELMBOT_TEST_KEY') == "from-file"
+            os.environ['HELMBOT_TEST_KEY'] = "from-env"
+            assert resolve_secret('HELMBOT_TEST_KEY') == "from-env"
+        finally:
+            credentials.SECRETS_DIR = original_dir
+            _restore_env(saved)
+    print("✅ Environment, *_FILE and secret mount all resolved")
+
+
+def test_providers_never_prompt_when_non_interactive():
+    """A set key is accepted without prompting; a missing key raises instead of blocking"""
+    saved = _clean_env('ANTHROPIC_API_KEY', 'OPENAI_API_KEY')
+    original_dir = credentials.SECRETS_DIR
+    credentials.SECRETS_DIR = tempfile.mkdtemp()
+    try:
+        os.environ['ANTHROPIC_API_KEY'] = "sk-ant-test"
+        AnthropicProvider().setup_api_key(interactive=False)
+        AnthropicProvider().setup_api_key(interactive=True)  # present key: no input() call
+        try:
+            OpenAIProvider().setup_api_key(interactive=False)
+            assert False, "missing key should raise"
+        except MissingCredentialsError as e:
+            assert e.names == ["OPENAI_API_KEY"] and "OPENAI_API_KEY_FILE" in str(e)
+    finally:
+        credentials.SECRETS_DIR = original_dir
+        _restore_env(saved)
+    print("✅ Providers resolve keys without input()")
+
+
+class _StubService:
+    def list_charts(self):
+        return ["sample_helm"]
+
+    def shutdown(self):
+        pass
+
+
+def test_readiness_and_liveness():
+    """Liveness answers during startup; readiness turns 200 once the service is built"""
+    def slow_factory():
+        time.sleep(0.3)
+        return _StubService()
+
+    original = main.lifecycle
+    main.lifecycle = ServiceLifecycle(slow_factory)
+    try:
+        with TestClient(main.app) as client:
+            assert client.get("/health/live").status_code == 200
+            ready = client.get("/health/ready")
+            assert ready.status_code == 503 and ready.json()["status"] == "starting"
+            assert client.get("/charts").json()["charts"] == ["sample_helm"]
+            ready = client.get("/health/ready")
+            assert ready.status_code == 200 and ready.json()["startup_seconds"] >= 0.3
+    finally:
+        main.lifecycle = original
+    print("✅ Readiness reported starting, then ready")
+
+
+def test_failed_start_is_reported_and_retried():
+    """A start failure gives 503 with the reason and is retried after the interval"""
+    attempts = []
+
+    def flaky_factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise MissingCredentialsError("Anthropic", ["ANTHROPIC_API_KEY"])
+        return _StubService()
+
+    original, original_interval = main.lifecycle, lifecycle_module.RETRY_INTERVAL_SECONDS
+    main.lifecycle = ServiceLifecycle(flaky_factory)
+    lifecycle_module.RETRY_INTERVAL_SECONDS = 0.1
+    try:
+        with TestClient(main.app) as client:
+            response = client.get("/charts")
+            assert response.status_code == 503 and "ANTHROPIC_API_KEY" in response.json()["detail"]
+            status = client.get("/health/ready").json()
+            assert status["status"] == "failed" and "MissingCredentialsError" in status["error"]
+            time.sleep(0.15)
+            assert client.get("/charts").status_code == 200
+            assert client.get("/health/ready").json()["attempts"] == 2
+    finally:
+        main.lifecycle = original
+        lifecycle_module.RETRY_INTERVAL_SECONDS = original_interval
+    print("✅ Failed start surfaced and recovered on retry")
+
+
+def test_entry_points_do_not_import_langchain():
+    """Building the CLI and API components loads no LangChain or provider SDK"""
+    code = (
+        "import sys\n"
+        "import api.main, helm_parser, llm_manager, question_manager, yaml_generator\n"
+        "heavy = sorted(m for m in sys.modules if m.split('.')[0] in "
+        "('langchain', 'langchain_core', 'langchain_community', 'langchain_anthropic', 'openai', 'anthropic', 'boto3'))\n"
+        "print(','.join(heavy))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "", f"eagerly imported: {output.stdout.strip()}"
+    print("✅ Entry points import no LLM packages")
+
+
+def test_import_profiler():
+    """Self and cumulative times are recorded for newly imported modules"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'profiled_outer.py'), 'w') as f:
+            f.write("import time\nimport profiled_inner\ntime.sleep(0.02)\n")
+        with open(os.path.join(tmp, 'profiled_inner.py'), 'w') as f:
+            f.write("import time\ntime.sleep(0.05)\n")
+        sys.path.insert(0, tmp)
+        try:
+            with ImportProfiler() as profiler:
+                import profiled_outer  # noqa: F401
+        finally:
+            sys.path.remove(tmp)
+            sys.modules.pop('profiled_outer', None)
+            sys.modules.pop('profiled_inner', None)
+    outer_self, outer_total = profiler.records['profiled_outer']
+    inner_self, inner_total = profiler.records['profiled_inner']
+    assert inner_self >= 0.05 and outer_total >= 0.07
+    assert 0.02 <= outer_self < inner_self
+    assert profiler.slowest(1)[0][0] == 'profiled_outer'
+    assert "profiled_inner" in profiler.report() and "LLM packages loaded: none" in profiler.report()
+    print("✅ Import profiler recorded self and cumulative time")
+
+
+if __name__ == "__main__":
+    test_resolve_secret_sources()
+    test_providers_never_prompt_when_non_interactive()
+    test_readiness_and_liveness()
+    test_failed_start_is_reported_and_retried()
+    test_entry_points_do_not_import_langchain()
+    test_import_profiler()
+    print("\n🎉 All startup tests passed!")
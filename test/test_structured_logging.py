@@ -0,0 +1,111 @@
+"""
+Test structured logging: levels per mode, JSON output, request IDs and timing spans
+"""
+import sys
+import os
+import io
+import contextvars
+import json
+import threading
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from api import main
+from structured_logging import configure_logging, current_request_id, get_logger, request_scope, span
+
+logger = get_logger('test')
+
+
+def test_levels_and_formats():
+    """The server is quiet by default, the CLI shows progress, JSON lines carry extra fields"""
+    print("🧪 Testing log levels and formats...")
+    stream = io.StringIO()
+    configure_logging('server', fmt='text', stream=stream)
+    logger.info("progress")
+    logger.warning("something odd")
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1 and "WARNING helmbot.test: something odd" in lines[0]
+
+    stream = io.StringIO()
+    configure_logging('cli', fmt='text', stream=stream)
+    logger.info("✅ progress %d", 3)
+    logger.debug("hidden")
+    assert stream.getvalue() == "✅ progress 3\n"
+
+    stream = io.StringIO()
+    configure_logging('cli', level='debug', fmt='json', stream=stream)
+    with request_scope("req-1"):
+        logger.info("generated", extra={"chart": "web"})
+    entry = json.loads(stream.getvalue())
+    assert (entry["level"], entry["message"], entry["request_id"], entry["chart"]) == ("INFO", "generated", "req-1", "web")
+    try:
+        configure_logging('daemon')
+        assert False, "unknown mode should raise"
+    except ValueError:
+        pass
+    configure_logging('server')
+    print("✅ Server quiet by default, CLI plain text, JSON with request_id and fields")
+
+
+def test_spans_follow_the_request():
+    """Spans nest by path, reach worker threads that copy the context, and end up on the trace"""
+    stream = io.StringIO()
+    configure_logging('server', level='DEBUG', fmt='json', stream=stream)
+
+    def call_model():
+        with span('llm_merge'):
+            pass
+
+    with request_scope() as trace:
+        with span('generate_yaml'):
+            with span('local_merge'):
+                pass
+            worker = threading.Thread(target=contextvars.copy_context().run, args=(call_model,))
+            worker.start()
+            worker.join()
+            try:
+                with span('validate'):
+                    raise ValueError("bad yaml")
+            except ValueError:
+                pass
+    assert current_request_id() is None
+    names = [s['span'] for s in trace.spans]
+    assert names == ['generate_yaml/local_merge', 'generate_yaml/llm_merge', 'generate_yaml/validate', 'generate_yaml']
+    assert trace.spans[2]['failed'] and 'generate_yaml=' in trace.span_summary()
+    logged = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert {entry['request_id'] for entry in logged} == {trace.request_id}
+    configure_logging('server')
+    print(f"✅ Recorded spans: {trace.span_summary()}")
+
+
+def test_request_ids_and_slow_requests():
+    """The API tags responses with a request ID and logs slow requests with their spans"""
+    stream = io.StringIO()
+    configure_logging('server', fmt='json', stream=stream)
+    client = TestClient(main.app)
+    assert client.get("/health", headers={"X-Request-ID": "abc123"}).headers["X-Request-ID"] == "abc123"
+    generated = client.get("/health").headers["X-Request-ID"]
+    assert generated and generated != "abc123"
+    assert stream.getvalue() == ""
+
+    original = main.SLOW_REQUEST_SECONDS
+    main.SLOW_REQUEST_SECONDS = 0
+    try:
+        client.get("/health/live", headers={"X-Request-ID": "slow-1"})
+    finally:
+        main.SLOW_REQUEST_SECONDS = original
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert (entry["level"], entry["request_id"], entry["path"], entry["status"]) == ("WARNING", "slow-1", "/health/live", 200)
+    assert "spans" in entry and entry["duration_ms"] >= 0
+    configure_logging('server')
+    print("✅ Responses carry X-Request-ID; slow requests logged with spans")
+
+
+if __name__ == "__main__":
+    test_levels_and_formats()
+    test_spans_follow_the_request()
+    test_request_ids_and_slow_requests()
+    print("\n🎉 All structured logging tests passed!")
@@ -0,0 +1,78 @@
+"""
+Test the Go-template analyzer used to extract .Values paths
+"""
+import sys
+import os
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_analyzer import TemplateAnalyzer
+
+HELPERS = '''
+{{/* Expand the name of the chart. {{ .Values.ignored }} */}}
+{{- define "app.name" -}}
+{{- default .Chart.Name .Values.nameOverride | trunc 63 }}
+{{- end }}
+{{- define "app.port" -}}
+{{ .port }}
+{{- end }}
+'''
+
+DEPLOYMENT = '''
+metadata:
+  name: {{ include "app.name" . }}
+spec:
+  {{- if not .Values.autoscaling.enabled }}
+  replicas: {{ .Values.replicaCount }}
+  {{- end }}
+  {{- with .Values.podAnnotations }}
+  annotations: {{- toYaml . | nindent 4 }}
+  {{- end }}
+  {{- with .Values.image }}
+  image: "{{ .repository }}:{{ .tag | default $.Chart.AppVersion }}"
+  {{- else }}
+  image: {{ .Values.defaultImage }}
+  {{- end }}
+  port: {{ include "app.port" .Values.service }}
+  {{- range $name, $host := .Values.ingress.hosts }}
+  - host: {{ $host.name }}
+    port: {{ $.Values.service.port }}
+  {{- end }}
+  {{- $cfg := .Values.config }}
+  level: {{ $cfg.logLevel }}
+  region: {{ index .Values "cloud" "region" }}
+'''
+
+
+def test_analyzer_paths():
+    """Full dotted paths are resolved through with/range/include"""
+    print("🧪 Testing template analyzer...")
+    analyzer = TemplateAnalyzer()
+    analyzer.add_template('_helpers.tpl', HELPERS)
+    analyzer.add_template('deployment.yaml', DEPLOYMENT)
+    analysis = analyzer.analyze()
+    expected = {
+        'nameOverride', 'autoscaling.enabled', 'replicaCount', 'podAnnotations',
+        'image.repository', 'image.tag', 'defaultImage', 'service.port',
+        'ingress.hosts[].name', 'config.logLevel', 'cloud.region',
+    }
+    assert analysis.variables == expected, sorted(analysis.variables)
+    assert 'ignored' not in analysis.all_paths
+    assert analysis.value_tree()['ingress']['hosts']['[]'] == {'name': {}}
+    print(f"✅ Extracted variables: {sorted(analysis.variables)}")
+
+
+def test_subchart_prefix():
+    """Subchart values are nested under the subchart key"""
+    print("🧪 Testing subchart values prefix...")
+    analyzer = TemplateAnalyzer()
+    analyzer.add_template('redis/templates/svc.yaml', '{{ .Values.port }}', values_prefix=('redis',))
+    assert analyzer.analyze().variables == {'redis.port'}
+    print("✅ Subchart values prefixed")
+
+
+if __name__ == "__main__":
+    test_analyzer_paths()
+    test_subchart_prefix()
+    print("\n🎉 All template analyzer tests passed!")
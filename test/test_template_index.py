@@ -0,0 +1,114 @@
+"""
+Test recursive template discovery and the incremental scan index
+"""
+import sys
+import os
+import shutil
+import tarfile
+import tempfile
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TEMPLATE_INDEX_FILE
+from template_analyzer import TemplateAnalyzer
+import template_index
+from template_index import TemplateScanIndex, discover_template_files
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+
+
+def _make_umbrella_chart(tmp):
+    """Copy the sample chart and add one unpacked and one packaged subchart"""
+    root = os.path.join(tmp, 'umbrella')
+    # Leave out an index persisted by earlier runs against the sample chart
+    shutil.copytree(SAMPLE_CHART, root, ignore=shutil.ignore_patterns(TEMPLATE_INDEX_FILE))
+    os.makedirs(os.path.join(root, 'templates', 'extra'))
+    with open(os.path.join(root, 'templates', 'extra', 'configmap.yaml'), 'w') as f:
+        f.write('data: {{ .Values.config.logLevel }}\n')
+    redis_templates = os.path.join(root, 'charts', 'redis', 'templates')
+    os.makedirs(redis_templates)
+    with open(os.path.join(redis_templates, 'svc.yaml'), 'w') as f:
+        f.write('port: {{ .Values.port }}\nregion: {{ .Values.global.region }}\n')
+    packaged = os.path.join(tmp, 'worker')
+    os.makedirs(os.path.join(packaged, 'templates'))
+    with open(os.path.join(packaged, 'templates', 'job.yaml'), 'w') as f:
+        f.write('image: {{ .Values.image.tag }}\n')
+    with tarfile.open(os.path.join(root, 'charts', 'worker-0.1.0.tgz'), 'w:gz') as tar:
+        tar.add(packaged, arcname='worker')
+    return root
+
+
+def test_recursive_discovery_and_prefixes():
+    """Subdirectories and subcharts are discovered and nested under their key"""
+    print("🧪 Testing recursive discovery...")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = _make_umbrella_chart(tmp)
+        files = discover_template_files(root)
+        assert 'templates/extra/configmap.yaml' in files
+        assert 'charts/redis/templates/svc.yaml' in files
+        assert 'charts/worker-0.1.0.tgz/worker/templates/job.yaml' in files
+
+        analyzer = TemplateAnalyzer()
+        for rel_path, parsed, prefix in TemplateScanIndex(root, workers=4).scan(files):
+            analyzer.add_parsed(rel_path, parsed, prefix)
+        variables = analyzer.analyze().variables
+        assert {'config.logLevel', 'redis.port', 'global.region', 'worker.image.tag'} <= variables
+    print("✅ Subchart templates discovered and prefixed")
+
+
+def test_warm_scan_reuses_index():
+    """Unchanged files are reused from the persisted index; edited files are re-parsed"""
+    print("🧪 Testing warm scans...")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = _make_umbrella_chart(tmp)
+        cold = TemplateScanIndex(root)
+        cold.scan()
+        assert cold.last_stats.cold and cold.last_stats.parsed == cold.last_stats.total
+
+        restarted = TemplateScanIndex(root)
+        restarted.scan()
+        assert not restarted.last_stats.cold
+        assert restarted.last_stats.parsed == 0
+
+        with open(os.path.join(root, 'templates', 'extra', 'configmap.yaml'), 'a') as f:
+            f.write('level: {{ .Values.config.verbose }}\n')
+        restarted.scan()
+        assert restarted.last_stats.parsed == 1
+        print(f"✅ {cold.last_stats} / {restarted.last_stats}")
+
+
+def test_archives_listed_once_and_corrupt_ones_skipped():
+    """Packaged subcharts are decompressed only when they change; a corrupt archive is skipped"""
+    print("🧪 Testing packaged subchart listing...")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = _make_umbrella_chart(tmp)
+        opened = []
+        original_open = tarfile.open
+
+        def counting_open(*args, **kwargs):
+            opened.append(args[0])
+            return original_open(*args, **kwargs)
+
+        template_index.tarfile.open = counting_open
+        try:
+            first = discover_template_files(root)
+            second = discover_template_files(root)
+            assert first == second and len(opened) == 1
+
+            with open(os.path.join(root, 'charts', 'broken-1.0.0.tgz'), 'wb') as f:
+                f.write(b'not a gzip archive')
+            files = discover_template_files(root)
+            assert files == first and len(opened) == 2
+            index = TemplateScanIndex(root)
+            assert len(index.scan()) == len(first)
+        finally:
+            template_index.tarfile.open = original_open
+    print("✅ Archive members cached by signature; corrupt archive logged and skipped")
+
+
+if __name__ == "__main__":
+    test_recursive_discovery_and_prefixes()
+    test_warm_scan_reuses_index()
+    test_archives_listed_once_and_corrupt_ones_skipped()
+    print("\n🎉 All template index tests passed!")
@@ -0,0 +1,161 @@
+"""
+Test the deterministic values merger and its use in YAMLGenerator
+"""
+import sys
+import os
+import shutil
+import tempfile
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_registry import ChartContext
+from question_schema import Question, annotate_defaults, dump_questions
+from values_merger import CannotCoerce, ValuesMerger, coerce_answer
+from yaml_generator import YAMLGenerator
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+
+QUESTIONS = [
+    Question('replicaCount', 'How many replicas do you want to run?', paths=['replicaCount'], type='integer'),
+    Question('image.repository', 'Which image repository?', paths=['image.repository']),
+    Question('autoscaling.enabled', 'Enable autoscaling?', paths=['autoscaling.enabled'], type='boolean'),
+    Question('imagePullSecrets', 'Image pull secrets?', paths=['imagePullSecrets'], type='list'),
+    Question('ingress.hosts[].host', 'Ingress hostname?', paths=['ingress.hosts[].host']),
+    Question('resources', 'Describe the resources you need', paths=['resources'], type='object'),
+]
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Provider:
+    def get_provider_name(self):
+        return "fake"
+
+
+class RecordingLLMManager:
+    """Stand-in LLM manager that records merge prompts"""
+
+    def __init__(self, content):
+        self.content = content
+        self.prompts = []
+        self.provider = _Provider()
+
+    def get_gpt4_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return _Response(self.content)
+
+
+def test_coercion():
+    """Answers are converted to the question's type or rejected"""
+    print("🧪 Testing answer coercion...")
+    assert coerce_answer("3 replicas", 'integer') == 3
+    assert coerce_answer("Yes", 'boolean') is True
+    assert coerce_answer("disabled", 'boolean') is False
+    assert coerce_answer("regcred, other", 'list') == ['regcred', 'other']
+    assert coerce_answer('["a", 2]', 'list') == ['a', 2]
+    assert coerce_answer("{cpu: 100m}", 'object') == {'cpu': '100m'}
+    assert coerce_answer('"my-app"', 'string') == 'my-app'
+    for answer, answer_type in (("a few", 'integer'), ("2.5", 'integer'), ("maybe", 'boolean'),
+                                ("small please", 'object')):
+        try:
+            coerce_answer(answer, answer_type)
+            assert False, f"{answer!r} should not coerce to {answer_type}"
+        except CannotCoerce:
+            pass
+    print("✅ Answers coerced by type")
+
+
+def test_merge_known_paths():
+    """Known answers land on their paths; free-form answers are left for the model"""
+    base = {'replicaCount': 1, 'image': {'repository': 'nginx', 'tag': 'latest'},
+            'autoscaling': {'enabled': False}, 'imagePullSecrets': []}
+    answers = [
+        ("How many replicas do you want to run?", "3"),
+        ("Which image repository?", "myorg/app"),
+        ("enable   AUTOSCALING?", "yes"),
+        ("Image pull secrets?", "regcred"),
+        ("Ingress hostname?", "app.example.com"),
+        ("Describe the resources you need", "something small"),
+        ("What else should we know?", "nothing"),
+    ]
+    result = ValuesMerger().merge(base, answers, QUESTIONS)
+    assert result.values['replicaCount'] == 3
+    assert result.values['image'] == {'repository': 'myorg/app', 'tag': 'latest'}
+    assert result.values['autoscaling']['enabled'] is True
+    assert result.values['imagePullSecrets'] == ['regcred']
+    assert result.values['ingress'] == {'hosts': [{'host': 'app.example.com'}]}
+    assert [q for q, _ in result.leftovers] == ["Describe the resources you need", "What else should we know?"]
+    # The parsed base values are shared across requests and must stay untouched
+    assert base['image']['repository'] == 'nginx' and 'ingress' not in base
+    assert list(result.values)[:2] == ['replicaCount', 'image']
+    print(f"✅ Merged {len(result.applied)} answers locally in {result.elapsed_ms:.3f} ms")
+
+
+def test_undefined_paths_and_keep_answers():
+    """Paths values.yaml does not define go to the model; "keep the default" keeps the current value"""
+    print("🧪 Testing undefined paths and keep-current answers...")
+    base = {'replicaCount': 1, 'image': {'repository': 'nginx'}, 'podAnnotations': None}
+    questions = annotate_defaults([
+        Question('replicaCount', 'How many replicas?', paths=['replicaCount']),
+        Question('image.repository', 'Which image repository?', paths=['image.repository']),
+        Question('ingress.enabled', 'Expose the app with an ingress?', paths=['ingress.enabled']),
+        Question('podAnnotations', 'Pod annotations?', paths=['podAnnotations']),
+    ], base)
+    assert [q.type for q in questions] == ['integer', 'string', 'unknown', 'unknown']
+    answers = [
+        ("How many replicas?", "Use the default"),
+        ("Which image repository?", "leave it as is"),
+        ("Expose the app with an ingress?", "yes"),
+        ("Pod annotations?", "team: web"),
+    ]
+    result = ValuesMerger().merge(base, answers, questions)
+    assert result.values == base and 'ingress' not in result.values
+    assert [q for q, _ in result.applied] == ["How many replicas?"]
+    # A string question may really mean "default" (e.g. a namespace), so the model decides
+    assert [q for q, _ in result.leftovers] == ["Which image repository?", "Expose the app with an ingress?",
+                                                "Pod annotations?"]
+    print("✅ Undefined paths left for the model; keep answers did not overwrite values")
+
+
+def test_generator_skips_model_for_known_answers():
+    """YAMLGenerator only calls the model for leftovers, on top of the local merge"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root)
+        chart = ChartContext('chart', root)
+        with open(chart.questions_path, 'w') as f:
+            f.write(dump_questions(QUESTIONS))
+
+        llm_manager = RecordingLLMManager("replicaCount: 4\nresources:\n  limits:\n    cpu: 100m")
+        generator = YAMLGenerator(llm_manager, cache=None)
+        merged = yaml.safe_load(generator.generate_values_yaml(
+            [("How many replicas do you want to run?", "4"), ("Enable autoscaling?", "no")], chart=chart))
+        assert merged['replicaCount'] == 4 and merged['autoscaling']['enabled'] is False
+        assert merged['image']['repository'] == 'nginx'
+        assert llm_manager.prompts == []
+
+        merged = yaml.safe_load(generator.generate_values_yaml(
+            [("How many replicas do you want to run?", "4"), ("Describe the resources you need", "tiny")],
+            chart=chart))
+        assert len(llm_manager.prompts) == 1
+        prompt = llm_manager.prompts[0]
+        assert "Describe the resources you need" in prompt and "How many replicas" not in prompt
+        assert merged['replicaCount'] == 4 and merged['resources'] == {'limits': {'cpu': '100m'}}
+    print("✅ Model called only for free-form answers")
+
+
+if __name__ == "__main__":
+    test_coercion()
+    test_merge_known_paths()
+    test_undefined_paths_and_keep_answers()
+    test_generator_skips_model_for_known_answers()
+    print("\n🎉 All values merger tests passed!")
@@ -0,0 +1,191 @@
+"""
+Test validation and the bounded repair loop for generated values.yaml
+"""
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+
+import yaml
+
+# Add parent directory to Python path to access HelmBot modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_registry import ChartContext
+from helm_parser import HelmTemplateParser
+from question_schema import Question, dump_questions
+from yaml_generator import YAMLGenerator
+from yaml_validator import InvalidYAMLError, strip_fences, validate_values
+
+SAMPLE_CHART = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_helm')
+ANSWERS = [("Anything else to configure?", "use three replicas and the myorg/app image")]
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Provider:
+    def get_provider_name(self):
+        return "fake"
+
+
+class ScriptedLLMManager:
+    """Stand-in LLM manager replying with a fixed sequence of outputs"""
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.prompts = []
+        self.provider = _Provider()
+
+    def get_gpt4_llm(self):
+        return self
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return _Response(self.outputs.pop(0))
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+    async def astream(self, prompt):
+        self.prompts.append(prompt)
+        for line in self.outputs.pop(0).splitlines(keepends=True):
+            await asyncio.sleep(0.01)
+            yield _Response(line)
+
+
+def _document(events):
+    """What a client following the stream contract shows: the tokens since the last reset"""
+    shown = []
+    for kind, data in events:
+        if kind == "reset":
+            shown = []
+        elif kind == "token":
+            shown.append(data)
+    return "".join(shown)
+
+
+def test_strip_and_validate():
+    """Fences are removed and shape or unknown-key problems are reported"""
+    print("🧪 Testing generated YAML validation...")
+    assert strip_fences("```yaml\nreplicaCount: 2\n```") == "replicaCount: 2"
+    assert strip_fences("replicaCount: 2") == "replicaCount: 2"
+
+    base = {'image': {'repository': 'nginx'}, 'imagePullSecrets': [], 'replicaCount': 1}
+    assert validate_values("replicaCount: 2\nimage:\n  repository: app", base, {'image'}).ok
+    result = validate_values("image: app\nimagePullSecrets: regcred\nbogus: 1", base, {'image', 'replicaCount'})
+    assert result.errors == [
+        "'image' must be a mapping, got str",
+        "'imagePullSecrets' must be a list, got str",
+        "Unknown top-level keys not used by the chart's templates: bogus",
+    ]
+    assert not validate_values("image: [unclosed", base).ok
+    assert validate_values("- a\n- b", base).errors == ["Generated output is not a YAML mapping"]
+    print("✅ Validation catches broken structure")
+
+
+def test_repair_loop():
+    """Invalid output triggers a targeted repair; valid first passes are counted"""
+    chart = ChartContext('sample', SAMPLE_CHART)
+    llm_manager = ScriptedLLMManager([
+        "```yaml\nreplicaCount: 3\nimage: myorg/app\n```",
+        "replicaCount: 3\nimage:\n  repository: myorg/app\n  tag: latest",
+        "replicaCount: 2",
+    ])
+    generator = YAMLGenerator(llm_manager, cache=None, helm_parser=HelmTemplateParser())
+
+    merged = yaml.safe_load(generator.generate_values_yaml(ANSWERS, chart=chart))
+    assert merged['image']['repository'] == 'myorg/app'
+    assert len(llm_manager.prompts) == 2
+    assert "'image' must be a mapping" in llm_manager.prompts[1]
+
+    generator.generate_values_yaml([("Anything else?", "two replicas")], chart=chart)
+    stats = generator.validation.stats()
+    assert (stats['first_pass'], stats['repaired'], stats['failed'], stats['repair_calls']) == (1, 1, 0, 1)
+    assert stats['first_pass_rate'] == 0.5
+    print("✅ Repaired invalid output with one extra call")
+
+
+def test_repair_budget_is_capped():
+    """Output that never validates fails after the capped number of repairs"""
+    chart = ChartContext('sample', SAMPLE_CHART)
+    llm_manager = ScriptedLLMManager(["not: [valid"] * 5)
+    generator = YAMLGenerator(llm_manager, cache=None)
+    try:
+        generator.generate_values_yaml(ANSWERS, chart=chart)
+        assert False, "invalid output should raise"
+    except InvalidYAMLError as e:
+        assert "not valid YAML" in str(e)
+    assert len(llm_manager.prompts) == 3
+    assert generator.validation.stats()['failed'] == 1
+    print("✅ Gave up after two repair attempts")
+
+
+def test_streaming_repair():
+    """Streaming generation repairs invalid output before the complete event"""
+    chart = ChartContext('sample', SAMPLE_CHART)
+    llm_manager = ScriptedLLMManager(["replicaCount: 3\nservice: 8080\n", "replicaCount: 3\nservice:\n  port: 8080\n"])
+    generator = YAMLGenerator(llm_manager, cache=None)
+
+    offloaded = []
+
+    async def run_blocking(func, *args):
+        offloaded.append(func.__name__)
+        return await asyncio.to_thread(func, *args)
+
+    async def collect():
+        return [event async for event in generator.astream_values_yaml(ANSWERS, chart=chart, run_blocking=run_blocking)]
+
+    events = asyncio.run(collect())
+    kind, document = events[-1]
+    assert kind == "complete"
+    assert yaml.safe_load(document)['service'] == {'port': 8080}
+    # The invalid first attempt was streamed, so it is retracted before the repaired document
+    assert ("reset", "") in events and _document(events) == document
+    # Preparing the prompt, validating each attempt and caching the result never ran on the event loop
+    assert offloaded[:3] == ['_prepare_stream', '_check_output', '_check_output'] and set(offloaded[3:]) <= {'set'}
+    print("✅ Streaming output repaired before completion; blocking work kept off the event loop")
+
+
+def test_stream_contract_and_dedup():
+    """Identical concurrent streams share one model call; every stream adds up to its complete event"""
+    print("🧪 Testing the stream contract...")
+    chart = ChartContext('sample', SAMPLE_CHART)
+    llm_manager = ScriptedLLMManager(["```yaml\nreplicaCount: 3\n```\n"])
+    generator = YAMLGenerator(llm_manager, cache=None)
+
+    async def collect(answers, target):
+        return [event async for event in generator.astream_values_yaml(answers, chart=target)]
+
+    async def concurrent():
+        return await asyncio.gather(collect(ANSWERS, chart), collect(ANSWERS, chart))
+
+    follower, leader = sorted(asyncio.run(concurrent()), key=len)
+    assert len(llm_manager.prompts) == 1
+    document = leader[-1][1]
+    assert leader[0] == ("token", "```yaml\n") and ("reset", "") in leader and _document(leader) == document
+    assert follower == [("token", document), ("complete", document)]
+
+    # Answers merged without the model arrive as one token too, like a cache hit
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'chart')
+        shutil.copytree(SAMPLE_CHART, root)
+        merged_chart = ChartContext('chart', root)
+        with open(merged_chart.questions_path, 'w') as f:
+            f.write(dump_questions([Question('replicaCount', 'How many replicas?', paths=['replicaCount'])]))
+        events = asyncio.run(collect([("How many replicas?", "4")], merged_chart))
+        assert [kind for kind, _ in events] == ["token", "complete"] and _document(events) == events[-1][1]
+        assert yaml.safe_load(events[-1][1])['replicaCount'] == 4
+    print("✅ Streams shared one generation and always add up to the complete document")
+
+
+if __name__ == "__main__":
+    test_strip_and_validate()
+    test_repair_loop()
+    test_repair_budget_is_capped()
+    test_streaming_repair()
+    test_stream_contract_and_dedup()
+    print("\n🎉 All YAML validation tests passed!")
@@ -0,0 +1,251 @@
+"""Deterministic merge of answers that map to known values.yaml paths"""
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+from question_schema import FAST_SAFE_DUMPER, UNKNOWN_TYPE, Question, lookup_value, split_path
+from template_analyzer import LIST_ITEM
+
+_TRUE = {'true', 'yes', 'y', 'on', 'enable', 'enabled', '1'}
+_FALSE = {'false', 'no', 'n', 'off', 'disable', 'disabled', '0', 'none'}
+# A single number, optionally followed by a unit-like word ("3", "3 replicas", "8080 port")
+_NUMBER_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)(?:\s+[A-Za-z]+)?\s*$')
+_LIST_SPLIT_RE = re.compile(r'\s*[,;\n]\s*')
+# Clients often send questions as displayed: "3. How many replicas? (Controls ...)"
+_NUMBERING_RE = re.compile(r'^\s*\d+[.)]\s+')
+_TRAILING_HELP_RE = re.compile(r'\s*\([^()]*\)\s*$')
+# Answers asking to keep the chart's value ("default", "keep it", "leave it as is", "use the current value")
+_KEEP_CURRENT_RE = re.compile(
+    r'^(?:(?:use|keep|leave)(?: it| the)?(?: (?:default|current|same|as is))?(?: value)?'
+    r'|default|(?:the )?same|current|as is|unchanged|no change)$'
+)
+# [registry[:port]/]name[/name...][:tag]; a port only counts when a path follows it
+_IMAGE_RE = re.compile(
+    r'^(?P<repository>[A-Za-z0-9][A-Za-z0-9._-]*(?::\d+(?=/))?(?:/[A-Za-z0-9][A-Za-z0-9._-]*)*)'
+    r'(?::(?P<tag>\w[\w.-]{0,127}))?$'
+)
+
+
+class CannotCoerce(ValueError):
+    """Raised when an answer cannot be converted to its question's type without the model"""
+
+
+def coerce_answer(answer: str, answer_type: str) -> Any:
+    """Convert a free-text answer to the type recorded for its question"""
+    text = answer.strip()
+    if answer_type == 'boolean':
+        lowered = text.lower().rstrip('.!')
+        if lowered in _TRUE:
+            return True
+        if lowered in _FALSE:
+            return False
+        raise CannotCoerce(answer)
+    if answer_type in ('integer', 'number'):
+        match = _NUMBER_RE.match(text)
+        if not match:
+            raise CannotCoerce(answer)
+        number = float(match.group(1))
+        if answer_type == 'integer':
+            if not number.is_integer():
+                raise CannotCoerce(answer)
+            return int(number)
+        return int(number) if number.is_integer() and '.' not in match.group(1) else number
+    if answer_type == 'list':
+        parsed = _structured(text)
+        if isinstance(parsed, list):
+            return parsed
+        if text.lower() in ('', 'none', '[]'):
+            return []
+        return [_scalar(item) for item in _LIST_SPLIT_RE.split(text) if item]
+    if answer_type == 'object':
+        parsed = _structured(text)
+        if isinstance(parsed, dict):
+            return parsed
+        if text.lower() in ('none', '{}'):
+            return {}
+        raise CannotCoerce(answer)
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        text = text[1:-1]
+    return text
+
+
+def _structured(text: str) -> Any:
+    """Parse JSON or flow-style YAML answers such as '["a", "b"]' or '{cpu: 100m}'"""
+    if not text or text[0] not in '[{':
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError:
+        return None
+
+
+def split_image_reference(reference: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Split 'registry:5000/team/app:1.2' into repository and tag (None when untagged or not an image reference)"""
+    match = _IMAGE_RE.match(reference.strip())
+    if not match:
+        return None
+    return match.group('repository'), match.group('tag')
+
+
+def _scalar(item: str) -> Any:
+    """List items stay strings unless they are plain numbers"""
+    item = item.strip().strip('"\'')
+    match = _NUMBER_RE.match(item)
+    if match and match.group(0).strip() == match.group(1):
+        number = float(item)
+        return int(number) if number.is_integer() and '.' not in item else number
+    return item
+
+
+def set_path(values: Dict[str, Any], path: str, value: Any, copied: set) -> None:
+    """
+    Set a dotted values path, creating missing parents.
+
+    Containers along the path are shallow-copied the first time they are touched
+    (ids of fresh containers go in copied), so the parsed base values are never mutated.
+    """
+    segments = split_path(path)
+    node: Any = values
+    for index, segment in enumerate(segments):
+        key: Any = segment
+        if segment == LIST_ITEM:
+            # List paths address the first item, matching how defaults are looked up
+            if not node:
+                node.append(None)
+            key = 0
+        if index == len(segments) - 1:
+            node[key] = value
+            return
+
+        want_list = segments[index + 1] == LIST_ITEM
+        child = node[key] if (key == 0 or key in node) else None
+        if not isinstance(child, list if want_list else dict):
+            child = [] if want_list else {}
+        elif id(child) not in copied:
+            child = list(child) if want_list else dict(child)
+        copied.add(id(child))
+        node[key] = child
+        node = child
+
+
+def keeps_current(answer: str) -> bool:
+    """Whether an answer asks to keep the chart's current value rather than giving one"""
+    return bool(_KEEP_CURRENT_RE.match(_normalize(answer).rstrip('.!')))
+
+
+class MergeResult:
+    """Outcome of merging answers locally"""
+
+    def __init__(self, values: Dict[str, Any], applied: List[Tuple[str, str]],
+                 leftovers: List[Tuple[str, str]], elapsed_ms: float):
+        self.values = values
+        self.applied = applied
+        self.leftovers = leftovers
+        self.elapsed_ms = elapsed_ms
+
+    def to_yaml(self) -> str:
+        """Render the merged values in their original key order"""
+        return dump_values(self.values)
+
+
+def dump_values(values: Dict[str, Any]) -> str:
+    """Serialize values.yaml content with block style and original key order"""
+    return yaml.dump(values, Dumper=FAST_SAFE_DUMPER, sort_keys=False,
+                     default_flow_style=False, allow_unicode=True).strip()
+
+
+class ValuesMerger:
+    """Applies answers to single-path questions directly onto the parsed base values.yaml"""
+
+    def merge(self, base_values: Dict[str, Any], answers: Iterable[Tuple[str, str]],
+              questions: Iterable[Question]) -> MergeResult:
+        """
+        Merge answers whose question maps to exactly one known path.
+
+        Answers that cannot be matched or coerced, and answers to questions whose path
+        values.yaml does not define, are returned as leftovers for the model. Blank answers
+        and answers such as "keep the default" keep the chart's current value, except on
+        string questions, where "default" may be the value meant and the model decides.
+        """
+        start = time.perf_counter()
+        by_question = index_questions(questions)
+        merged = dict(base_values)
+        copied = {id(merged)}
+        applied: List[Tuple[str, str]] = []
+        leftovers: List[Tuple[str, str]] = []
+        for question_text, answer in answers:
+            question = find_question(by_question, question_text)
+            if question is None or len(question.paths) != 1 or question.type == UNKNOWN_TYPE:
+                leftovers.append((question_text, answer))
+                continue
+            if not str(answer).strip():
+                applied.append((question_text, answer))
+                continue
+            if keeps_current(str(answer)):
+                (leftovers if question.type == 'string' else applied).append((question_text, answer))
+                continue
+            image = _image_assignments(base_values, question, str(answer))
+            if image:
+                for path, value in image:
+                    set_path(merged, path, value, copied)
+                applied.append((question_text, answer))
+                continue
+            try:
+                value = coerce_answer(str(answer), question.type)
+            except CannotCoerce:
+                leftovers.append((question_text, answer))
+                continue
+            set_path(merged, question.paths[0], value, copied)
+            applied.append((question_text, answer))
+        return MergeResult(merged, applied, leftovers, (time.perf_counter() - start) * 1000)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).split()).lower()
+
+
+def _image_assignments(base_values: Dict[str, Any], question: Question, answer: str) -> List[Tuple[str, Any]]:
+    """
+    Split a 'repo:tag' answer for an image repository path (or an image object with a
+    repository key) into its repository and tag paths; [] when the answer is not one
+    """
+    path = question.paths[0]
+    if split_path(path)[-1] == 'repository' and question.type == 'string':
+        prefix = path[:-len('repository')]
+    elif question.type == 'object':
+        found, node = lookup_value(base_values, path)
+        if not (found and isinstance(node, dict) and 'repository' in node):
+            return []
+        prefix = f"{path}."
+    else:
+        return []
+    reference = split_image_reference(answer)
+    if reference is None or (reference[1] is None and question.type == 'string'):
+        return []
+    repository, tag = reference
+    return [(f"{prefix}repository", repository)] + ([(f"{prefix}tag", tag)] if tag is not None else [])
+
+
+def find_question(index: Dict[str, Question], text: str) -> Optional[Question]:
+    """Find the question a client's text refers to, ignoring list numbering and a trailing (help) note"""
+    question = index.get(_normalize(text))
+    if question is None:
+        stripped = _NUMBERING_RE.sub('', str(text))
+        question = index.get(_normalize(stripped)) or index.get(_normalize(_TRAILING_HELP_RE.sub('', stripped)))
+    return question
+
+
+def index_questions(questions: Iterable[Question]) -> Dict[str, Question]:
+    """Look questions up by their text or id (clients may send either)"""
+    index: Dict[str, Question] = {}
+    for question in questions:
+        index.setdefault(_normalize(question.id), question)
+        index[_normalize(question.text)] = question
+    return index
@@ -1,29 +1,391 @@
 """YAML generator for creating values.yaml files"""
+import asyncio
+import contextvars
 import os
-from config import TEMPLATE_DIR, VALUES_FILE, GENERATED_VALUES_FILE
+import time
+import uuid
+from functools import partial
+from config import (
+    GPT4_MODEL, GPT4_TEMPERATURE, RESPONSE_CACHE_ENABLED, YAML_GENERATION_LEASE_SECONDS,
+    DETERMINISTIC_MERGE_ENABLED, PROMPT_SLIMMING_ENABLED, YAML_REPAIR_MAX_ATTEMPTS,
+    ANSWER_NORMALIZATION_ENABLED
+)
+from answer_normalizer import AnswerNormalizer
+from chart_registry import default_chart
+from llm_metrics import llm_call_site, metrics
+from prompt_slimmer import PromptSlimmer, SlimPrompt
+from question_schema import load_question_set, parse_values
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from structured_logging import get_logger, span
+from values_merger import ValuesMerger
+from yaml_validator import InvalidYAMLError, ValidationStats, strip_fences, validate_values
+
+logger = get_logger(__name__)
+
+# How often a worker polls the shared cache while another process generates the same YAML
+_PEER_POLL_SECONDS = 0.2
 
 
 class YAMLGenerator:
-    def __init__(self, llm_manager):
+    def __init__(self, llm_manager, cache=None, helm_parser=None):
         self.llm_manager = llm_manager
+        # Optional: lets validation reject top-level keys the chart's templates never read
+        self.helm_parser = helm_parser
+        if cache is None and RESPONSE_CACHE_ENABLED:
+            cache = ResponseCache()
+        self.cache = cache
+        self.merger = ValuesMerger() if DETERMINISTIC_MERGE_ENABLED else None
+        self.normalizer = AnswerNormalizer() if ANSWER_NORMALIZATION_ENABLED else None
+        self.slimmer = PromptSlimmer() if PROMPT_SLIMMING_ENABLED else None
+        self.validation = ValidationStats()
+        self._flights = SingleFlight()
+    
+    def generate_values_yaml_gpt4(self, answers, use_cache=True, output_path=None, chart=None):
+        """Generate merged values.yaml using GPT-4.1 and save it to disk"""
+        merged_yaml = self.generate_values_yaml(answers, use_cache=use_cache, chart=chart)
+        generated_path = self.save_values_yaml(merged_yaml, output_path, chart=chart)
+        logger.info("💾 Final merged values saved to %s", generated_path)
+        logger.info("--- generated_values.yaml preview ---\n\n%s", merged_yaml)
+        return merged_yaml
+    
+    def generate_values_yaml(self, answers, use_cache=True, chart=None):
+        """Generate merged values.yaml content in memory without touching disk"""
+        return self.generate_values_yaml_with_source(answers, use_cache=use_cache, chart=chart)[0]
+    
+    def generate_values_yaml_with_source(self, answers, use_cache=True, chart=None):
+        """
+        Generate merged values.yaml content and say where it came from: 'merged' (every
+        answer applied locally), 'cache', 'peer' (another worker process generated it) or 'model'
+        """
+        with span('generate_yaml', logger):
+            merged_yaml, source = self._generate_with_source(answers, use_cache, chart or default_chart())
+        metrics.record_cache('yaml_merge', source)
+        return merged_yaml, source
+    
+    def _generate_with_source(self, answers, use_cache, chart):
+        answers = self.normalize_answers(answers, chart)
+        base_yaml_content, answers = self.merge_known_answers(answers, chart)
+        if not answers:
+            return base_yaml_content, 'merged'
+        request_key = self._request_key(base_yaml_content, answers)
+        if use_cache and self.cache is not None:
+            merged_yaml = self.cache.get(request_key)
+            if merged_yaml is not None:
+                logger.info("⚡ Using cached values.yaml for identical chart and answers")
+                return merged_yaml, 'cache'
+        
+        # Identical concurrent requests share one model call
+        return self._flights.do(
+            (request_key, use_cache), self._generate_uncached,
+            base_yaml_content, answers, request_key, use_cache, chart
+        )
+    
+    def _generate_uncached(self, base_yaml_content, answers, request_key, use_cache, chart=None):
+        """Call the model once for this request, coordinating with other processes via the cache"""
+        claimed = False
+        if use_cache and self.cache is not None and self.cache.persistent:
+            merged_yaml, claimed = self._wait_for_peer(request_key)
+            if merged_yaml is not None:
+                return merged_yaml, 'peer'
+        try:
+            merged_yaml = self._invoke_llm(base_yaml_content, answers, chart)
+            if self.cache is not None:
+                self.cache.set(request_key, merged_yaml)
+            return merged_yaml, 'model'
+        finally:
+            if claimed:
+                self.cache.release_claim(request_key)
+    
+    def _wait_for_peer(self, request_key):
+        """
+        Wait while another worker process generates the same response.
+        
+        Returns (cached_yaml, claimed): the peer's result if it finished, otherwise
+        whether this process now holds the claim to generate it.
+        """
+        deadline = time.monotonic() + YAML_GENERATION_LEASE_SECONDS
+        while True:
+            merged_yaml, claimed = self._poll_peer(request_key)
+            if merged_yaml is not None or claimed or time.monotonic() > deadline:
+                return merged_yaml, claimed
+            time.sleep(_PEER_POLL_SECONDS)
+    
+    async def _await_peer(self, request_key, run_blocking):
+        """Async variant of _wait_for_peer that polls the cache through run_blocking"""
+        deadline = time.monotonic() + YAML_GENERATION_LEASE_SECONDS
+        while True:
+            merged_yaml, claimed = await run_blocking(self._poll_peer, request_key)
+            if merged_yaml is not None or claimed or time.monotonic() > deadline:
+                return merged_yaml, claimed
+            await asyncio.sleep(_PEER_POLL_SECONDS)
     
-    def generate_values_yaml_gpt4(self, answers):
-        """Generate merged values.yaml using GPT-4.1"""
+    def _poll_peer(self, request_key):
+        """One look at the shared cache: (peer's yaml or None, whether this process took the claim)"""
+        if self.cache.try_claim(request_key, YAML_GENERATION_LEASE_SECONDS):
+            merged_yaml = self.cache.peek(request_key)
+            if merged_yaml is not None:
+                self.cache.release_claim(request_key)
+                return merged_yaml, False
+            return None, True
+        return self.cache.peek(request_key), False
+    
+    async def astream_values_yaml(self, answers, use_cache=True, chart=None, run_blocking=None):
+        """
+        Stream merged values.yaml as the model produces it.
+        
+        Yields ("token", text) events, then a single ("complete", yaml) event with the
+        validated document, or ("error", message) if validation fails. The complete event
+        is authoritative: the tokens since the last ("reset", "") event always add up to
+        it. When the streamed output is not the final document (an excerpt spliced back
+        into values.yaml, fenced or repaired output) a reset is sent, followed by the final
+        document as one token. Local merges, cache hits and requests that joined an
+        identical generation (in this process, or another worker's via the cache claim)
+        get the document as one token.
+        
+        Blocking work (normalizing, the cache, building the prompt, validation) runs
+        through run_blocking(func, *args), e.g. the API service's bounded worker pool, so
+        it never stalls the event loop.
+        """
+        chart = chart or default_chart()
+        run_blocking = run_blocking or _run_in_default_executor
+        source, ready_yaml, plan = await run_blocking(self._prepare_stream, answers, use_cache, chart)
+        if ready_yaml is not None:
+            metrics.record_cache('yaml_stream', source)
+            yield ("token", ready_yaml)
+            yield ("complete", ready_yaml)
+            return
+        
+        # Identical concurrent requests, streamed or not, share one generation; only the
+        # caller that runs it receives the model's tokens. It finishes even if its client
+        # goes away, so the callers waiting on it and the cache still get the result.
+        request_key = plan[3]
+        tokens = asyncio.Queue()
+        generation = asyncio.ensure_future(self._flights.ado(
+            (request_key, use_cache), self._astream_uncached, plan, use_cache, tokens, run_blocking
+        ))
+        streamed = []
+        while not generation.done():
+            waiter = asyncio.ensure_future(tokens.get())
+            try:
+                await asyncio.wait({waiter, generation}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+            if waiter.done() and not waiter.cancelled():
+                streamed.append(waiter.result())
+                yield ("token", streamed[-1])
+        while not tokens.empty():
+            streamed.append(tokens.get_nowait())
+            yield ("token", streamed[-1])
+        
+        try:
+            merged_yaml, source = await generation
+        except InvalidYAMLError as e:
+            metrics.record_cache('yaml_stream', 'model')
+            yield ("error", "; ".join(e.errors))
+            return
+        metrics.record_cache('yaml_stream', source)
+        if "".join(streamed) != merged_yaml:
+            if streamed:
+                yield ("reset", "")
+            yield ("token", merged_yaml)
+        yield ("complete", merged_yaml)
+    
+    async def _astream_uncached(self, plan, use_cache, tokens, run_blocking):
+        """Stream one model call into tokens, repairing invalid output; returns (yaml, source)"""
+        llm_gpt4, slim, prompt_yaml, request_key, base_yaml_content, known_keys = plan
+        claimed = False
+        if use_cache and self.cache is not None and self.cache.persistent:
+            merged_yaml, claimed = await self._await_peer(request_key, run_blocking)
+            if merged_yaml is not None:
+                return merged_yaml, 'peer'
+        try:
+            parts = []
+            with llm_call_site('yaml_stream'):
+                async for chunk in llm_gpt4.astream(prompt_yaml):
+                    text = _chunk_text(chunk)
+                    if text:
+                        parts.append(text)
+                        tokens.put_nowait(text)
+            
+            output = "".join(parts)
+            attempts = 1
+            while True:
+                merged_yaml, result = await run_blocking(self._check_output, output, slim, base_yaml_content, known_keys)
+                if result.ok or attempts > YAML_REPAIR_MAX_ATTEMPTS:
+                    break
+                attempts += 1
+                with llm_call_site('yaml_repair'):
+                    response = await llm_gpt4.ainvoke(self.build_repair_prompt(output, result.errors, slim.is_excerpt))
+                output = _chunk_text(response)
+            self.validation.record(attempts, result.ok)
+            if not result.ok:
+                raise InvalidYAMLError(result.errors)
+            if self.cache is not None:
+                await run_blocking(self.cache.set, request_key, merged_yaml)
+            return merged_yaml, 'model'
+        finally:
+            if claimed:
+                await run_blocking(self.cache.release_claim, request_key)
+    
+    def _prepare_stream(self, answers, use_cache, chart):
+        """
+        Everything before streaming starts: normalize and merge answers locally, check the
+        cache, get a client and build the prompt.
+        
+        Returns (source, yaml, None) when no model call is needed ('merged' or 'cache'),
+        otherwise ('model', None, (llm, slim, prompt, request_key, base_yaml, known_keys)).
+        """
+        answers = self.normalize_answers(answers, chart)
+        base_yaml_content, answers = self.merge_known_answers(answers, chart)
+        if not answers:
+            return 'merged', base_yaml_content, None
+        request_key = self._request_key(base_yaml_content, answers)
+        if use_cache and self.cache is not None:
+            merged_yaml = self.cache.get(request_key)
+            if merged_yaml is not None:
+                return 'cache', merged_yaml, None
+        
         llm_gpt4 = self.llm_manager.get_gpt4_llm()
+        slim = self.slim_prompt(base_yaml_content, answers, self._chart_questions(chart))
+        prompt_yaml = self.build_prompt(slim.prompt_yaml, answers, excerpt=slim.is_excerpt)
+        return 'model', None, (llm_gpt4, slim, prompt_yaml, request_key, base_yaml_content, self._known_keys(chart))
+    
+    def normalize_answers(self, answers, chart):
+        """
+        Canonical QA pairs (the chart's question wording, typed answers in one form), so
+        equivalent answer sets share a cache entry and send the model the same prompt
+        """
+        if self.normalizer is None:
+            return list(answers)
+        return self.normalizer.normalize(answers, self._chart_questions(chart))
+    
+    def merge_known_answers(self, answers, chart):
+        """
+        Apply answers whose question maps to a single known path without the model.
         
-        # Load base values.yaml
-        values_path = os.path.join(TEMPLATE_DIR, VALUES_FILE)
-        base_yaml_content = ''
-        if os.path.exists(values_path):
-            with open(values_path, 'r', encoding='utf-8') as f:
-                base_yaml_content = f.read()
-        else:
-            print(f"Warning: {values_path} not found. Proceeding with user answers only.")
+        Returns the base values.yaml to hand to the model (with local answers applied)
+        and the answers it still has to handle; no answers left means the returned
+        YAML is final.
+        """
+        base_yaml_content = chart.base_values()
+        if self.merger is None:
+            return base_yaml_content, answers
+        questions = self._chart_questions(chart)
+        base_values = chart.load_files((chart.values_path,), parse_values)
+        with span('local_merge', logger):
+            result = self.merger.merge(base_values, answers, questions)
+        if not result.leftovers:
+            logger.info("⚡ Merged %d answers locally in %.2f ms (no model call)", len(result.applied), result.elapsed_ms)
+            return result.to_yaml(), []
+        if not result.applied:
+            return base_yaml_content, answers
+        logger.info("⚡ Merged %d answers locally; %d free-form answers go to the model",
+                    len(result.applied), len(result.leftovers))
+        return result.to_yaml(), result.leftovers
+    
+    def slim_prompt(self, base_yaml_content, answers, questions=()):
+        """Values excerpt to send to the model for these answers (the full document when slimming is off)"""
+        if self.slimmer is None:
+            return SlimPrompt(base_yaml_content, {}, [])
+        return self.slimmer.slim(base_yaml_content, answers, questions)
+    
+    def _chart_questions(self, chart):
+        """Structured questions of the chart, from its in-memory copy ([] before generation)"""
+        return chart.load_files((chart.questions_path, chart.values_path), load_question_set)
+    
+    def _check_output(self, output, slim, base_yaml_content, known_keys):
+        """Clean up and splice one model output, returning it with its validation result"""
+        merged_yaml = slim.splice(strip_fences(output))
+        base_values = slim.values if slim.is_excerpt else parse_values(base_yaml_content)
+        return merged_yaml, validate_values(merged_yaml, base_values, known_keys)
+    
+    def _known_keys(self, chart):
+        """Top-level values keys the chart's templates read (None when no parser is available)"""
+        if self.helm_parser is None or chart is None:
+            return None
+        return self.helm_parser.analyze_templates(chart=chart).top_level_keys
+    
+    def _request_key(self, base_yaml_content, answers):
+        """
+        Content-addressed key for this chart and answer set (cache and single-flight key).
+        
+        The key is computed before the call, so it names the configured primary provider,
+        not the provider that served the response: with failover, a fallback's answer
+        (validated like any other) is cached and replayed under the primary's key.
+        """
+        return ResponseCache.make_key(
+            self.llm_manager.provider.get_provider_name(),
+            GPT4_MODEL, GPT4_TEMPERATURE, base_yaml_content, answers
+        )
+    
+    def save_values_yaml(self, merged_yaml, output_path=None, chart=None):
+        """Atomically write generated YAML, defaulting to the chart's generated_values.yaml"""
+        generated_path = output_path or (chart or default_chart()).generated_values_path
+        directory = os.path.dirname(generated_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{generated_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(merged_yaml)
+        os.replace(tmp_path, generated_path)
+        return generated_path
+    
+    def _invoke_llm(self, base_yaml_content, answers, chart=None):
+        """Ask the advanced model to merge the answers into values.yaml, repairing invalid output"""
+        llm_gpt4 = self.llm_manager.get_gpt4_llm()
+        questions = self._chart_questions(chart) if chart is not None else ()
+        slim = self.slim_prompt(base_yaml_content, answers, questions)
+        prompt_yaml = self.build_prompt(slim.prompt_yaml, answers, excerpt=slim.is_excerpt)
+        if slim.is_excerpt:
+            logger.info("✂️  Sending %d relevant values.yaml sections (%d of %d characters)",
+                        len(slim.selected), len(slim.prompt_yaml), len(base_yaml_content))
+        logger.info("🚀 Sending values.yaml and user answers to GPT-4.1 to generate merged YAML...")
+        with llm_call_site('yaml_merge'), span('llm_merge', logger):
+            output = llm_gpt4.invoke(prompt_yaml).content
         
+        known_keys = self._known_keys(chart)
+        attempts = 1
+        while True:
+            merged_yaml, result = self._check_output(output, slim, base_yaml_content, known_keys)
+            if result.ok or attempts > YAML_REPAIR_MAX_ATTEMPTS:
+                break
+            attempts += 1
+            logger.warning("🔧 Generated YAML failed validation (%s). Asking the model to repair it...",
+                           '; '.join(result.errors))
+            with llm_call_site('yaml_repair'), span('llm_repair', logger):
+                output = llm_gpt4.invoke(self.build_repair_prompt(output, result.errors, slim.is_excerpt)).content
+        self.validation.record(attempts, result.ok)
+        if not result.ok:
+            raise InvalidYAMLError(result.errors)
+        return merged_yaml
+    
+    def build_repair_prompt(self, output, errors, excerpt=False):
+        """Build a prompt asking the model to fix only the listed problems in its output"""
+        problems = "\n".join(f"- {error}" for error in errors)
+        scope = "values.yaml excerpt" if excerpt else "values.yaml"
+        return f"""
+                        The following {scope} you generated has problems:
+                        {problems}
+
+                        Fix only these problems and keep every other value unchanged.
+                        Output only the corrected YAML, without code fences, explanation or extra text.
+
+                        {output}
+                        """
+    
+    def build_prompt(self, base_yaml_content, answers, excerpt=False):
+        """Build the merge prompt for the advanced model"""
         qa_pairs = "\n".join([f"Q: {q}\nA: {a}" for q, a in answers])
+        scope = ""
+        if excerpt:
+            scope = ("The values.yaml below is an excerpt with only the sections these answers affect. "
+                     "Output only the updated excerpt: the sections shown plus any new keys the answers require.")
         prompt_yaml = f"""
                         Given the following Helm chart configuration questions and user answers, and the existing values.yaml content below, replace the user answers into the values.yaml in appropriate places. Do not copy any old values from the existing values.yaml file.
                         Output only the final merged YAML, suitable for use as values.yaml. Do not include any explanation or extra text.
+                        {scope}
 
                         Existing values.yaml:
                         {base_yaml_content}
@@ -38,14 +400,23 @@ class YAMLGenerator:
                             tag: v1.0
                             pullPolicy: IfNotPresent
                         """
-        print("\n🚀 Sending values.yaml and user answers to GPT-4.1 to generate merged YAML...")
-        response = llm_gpt4.invoke(prompt_yaml)
-        merged_yaml = response.content.strip()
-        
-        generated_path = os.path.join(TEMPLATE_DIR, GENERATED_VALUES_FILE)
-        with open(generated_path, 'w', encoding='utf-8') as f:
-            f.write(merged_yaml)
-        print(f"\n💾 Final merged values saved to {generated_path}\n")
-        print("--- generated_values.yaml preview ---\n")
-        print(merged_yaml)
-        return merged_yaml
+        return prompt_yaml
+
+
+def _chunk_text(chunk):
+    """Extract text from a streamed message chunk (providers may send content blocks)"""
+    content = getattr(chunk, 'content', chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get('text', '') if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return ''
+
+
+async def _run_in_default_executor(func, *args):
+    """Run blocking work on the loop's default executor, keeping the caller's context"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, partial(context.run, func, *args))
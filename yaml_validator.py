@@ -0,0 +1,116 @@
+"""Post-processing and structural validation of model-generated values.yaml"""
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import yaml
+
+from question_schema import FAST_SAFE_LOADER
+
+_FENCE_RE = re.compile(r'^\s*```[A-Za-z0-9_-]*[ \t]*\n(.*?)\n?```\s*$', re.S)
+# Nested mismatches below this depth are left to Helm; the top of the tree is what breaks templates
+_MAX_CHECK_DEPTH = 4
+
+
+class InvalidYAMLError(ValueError):
+    """Raised when generated YAML is still invalid after the repair budget is spent"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def strip_fences(text: str) -> str:
+    """Remove a surrounding Markdown code fence (```yaml ... ```) if the model added one"""
+    text = text.strip()
+    match = _FENCE_RE.match(text)
+    if match:
+        return match.group(1).strip()
+    return text
+
+
+class ValidationResult:
+    """Parsed document and the problems found in it"""
+
+    def __init__(self, document: Any, errors: List[str]):
+        self.document = document
+        self.errors = errors
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def validate_values(text: str, base_values: Optional[Dict[str, Any]] = None,
+                    known_keys: Optional[Iterable[str]] = None) -> ValidationResult:
+    """
+    Parse generated values.yaml and check it against the chart.
+
+    Sections that are mappings (or lists) in the base values.yaml must keep that shape,
+    and new top-level keys must be ones the chart's templates actually read.
+    """
+    try:
+        document = yaml.load(text, Loader=FAST_SAFE_LOADER)
+    except yaml.YAMLError as e:
+        return ValidationResult(None, [f"Generated output is not valid YAML: {e}"])
+    if not isinstance(document, dict):
+        return ValidationResult(document, ["Generated output is not a YAML mapping"])
+
+    errors: List[str] = []
+    base_values = base_values or {}
+    _check_shape(base_values, document, (), errors)
+    if known_keys is not None:
+        known = set(known_keys) | set(base_values)
+        unknown = [str(key) for key in document if key not in known]
+        if unknown:
+            errors.append(f"Unknown top-level keys not used by the chart's templates: {', '.join(unknown)}")
+    return ValidationResult(document, errors)
+
+
+def _check_shape(base: Dict[str, Any], document: Dict[str, Any], prefix: tuple, errors: List[str]) -> None:
+    for key, expected in base.items():
+        if key not in document or document[key] is None:
+            continue
+        actual = document[key]
+        path = '.'.join(prefix + (str(key),))
+        if isinstance(expected, dict):
+            if not isinstance(actual, dict):
+                errors.append(f"'{path}' must be a mapping, got {type(actual).__name__}")
+            elif len(prefix) + 1 < _MAX_CHECK_DEPTH:
+                _check_shape(expected, actual, prefix + (str(key),), errors)
+        elif isinstance(expected, list) and not isinstance(actual, list):
+            errors.append(f"'{path}' must be a list, got {type(actual).__name__}")
+
+
+class ValidationStats:
+    """Thread-safe counters for how often generated YAML passes on the first try"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first_pass = 0
+        self._repaired = 0
+        self._failed = 0
+        self._repair_calls = 0
+
+    def record(self, attempts: int, ok: bool) -> None:
+        """Record one generation that needed attempts model calls in total"""
+        with self._lock:
+            self._repair_calls += attempts - 1
+            if not ok:
+                self._failed += 1
+            elif attempts == 1:
+                self._first_pass += 1
+            else:
+                self._repaired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._first_pass + self._repaired + self._failed
+            return {
+                "generations": total,
+                "first_pass": self._first_pass,
+                "repaired": self._repaired,
+                "failed": self._failed,
+                "repair_calls": self._repair_calls,
+                "first_pass_rate": round(self._first_pass / total, 4) if total else 0.0,
+            }